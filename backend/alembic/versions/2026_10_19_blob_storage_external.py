@@ -0,0 +1,30 @@
+"""Store attachment blobs uncompressed out of line
+
+feedback_files.data / referral_files.data switch to STORAGE EXTERNAL so the
+mail dispatcher's substring() chunk reads fetch only the requested slice
+instead of decompressing the whole value per chunk. Metadata-only change;
+applies to rows written afterwards (uploads are mostly already compressed).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "blob_storage_external_20261019"
+down_revision = "email_outbox_20261019"
+branch_labels = None
+depends_on = None
+
+def table_exists(bind, name: str) -> bool:
+    insp = sa.inspect(bind)
+    return name in insp.get_table_names()
+
+def upgrade():
+    bind = op.get_bind()
+    for table in ("feedback_files", "referral_files"):
+        if table_exists(bind, table):
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN data SET STORAGE EXTERNAL")
+
+def downgrade():
+    bind = op.get_bind()
+    for table in ("feedback_files", "referral_files"):
+        if table_exists(bind, table):
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN data SET STORAGE EXTENDED")
@@ -0,0 +1,92 @@
+"""Per-collection version counters for conditional GET (ETag / 304)
+
+- collection_versions (scope, version, updated_at)
+- statement-level AFTER triggers bump them; transition tables give the
+  distinct keys touched, so a COPY or bulk UPDATE costs one bump per key,
+  not one per row:
+    referrals       -> "referrals", "referrals:<agent_id>"
+    users           -> "users", "user:<id>"
+    mfa_credential  -> "users", "user:<user_id>"
+
+app.services.collection_versions reads them before running list queries.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "collection_versions_20261019"
+down_revision = "referral_stats_20261019"
+branch_labels = None
+depends_on = None
+
+# (table, trigger prefix, global scope, per-key scope prefix, key column)
+TRACKED = [
+    ("referrals", "referrals_version", "referrals", "referrals:", "agent_id"),
+    ("users", "users_version", "users", "user:", "id"),
+    ("mfa_credential", "mfa_credential_version", "users", "user:", "user_id"),
+]
+
+def table_exists(bind, name: str) -> bool:
+    return name in sa.inspect(bind).get_table_names()
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS collection_versions (
+            scope text PRIMARY KEY,
+            version bigint NOT NULL DEFAULT 0,
+            updated_at timestamptz NOT NULL DEFAULT now()
+        )""")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION collection_version_bump(s text) RETURNS void AS $$
+            INSERT INTO collection_versions AS v (scope, version, updated_at)
+            VALUES (s, 1, now())
+            ON CONFLICT (scope) DO UPDATE SET version = v.version + 1, updated_at = now()
+        $$ LANGUAGE sql""")
+    # TG_ARGV: global scope, per-key scope prefix, key column
+    op.execute("""
+        CREATE OR REPLACE FUNCTION collection_versions_bump() RETURNS trigger AS $$
+        DECLARE
+            k text;
+        BEGIN
+            PERFORM collection_version_bump(TG_ARGV[0]);
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                FOR k IN EXECUTE format('SELECT DISTINCT %1$I::text FROM new_rows WHERE %1$I IS NOT NULL ORDER BY 1',
+                                        TG_ARGV[2]) LOOP
+                    PERFORM collection_version_bump(TG_ARGV[1] || k);
+                END LOOP;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                FOR k IN EXECUTE format('SELECT DISTINCT %1$I::text FROM old_rows WHERE %1$I IS NOT NULL ORDER BY 1',
+                                        TG_ARGV[2]) LOOP
+                    PERFORM collection_version_bump(TG_ARGV[1] || k);
+                END LOOP;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""")
+
+    bind = op.get_bind()
+    for table, trig, scope, prefix, key in TRACKED:
+        if not table_exists(bind, table):
+            continue
+        args = f"'{scope}', '{prefix}', '{key}'"
+        for suffix, event, refs in (
+            ("ins", "INSERT", "NEW TABLE AS new_rows"),
+            ("upd", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+            ("del", "DELETE", "OLD TABLE AS old_rows"),
+        ):
+            op.execute(f"DROP TRIGGER IF EXISTS {trig}_{suffix} ON {table}")
+            op.execute(f"""
+                CREATE TRIGGER {trig}_{suffix} AFTER {event} ON {table}
+                REFERENCING {refs}
+                FOR EACH STATEMENT EXECUTE FUNCTION collection_versions_bump({args})""")
+
+def downgrade():
+    bind = op.get_bind()
+    for table, trig, *_ in TRACKED:
+        if not table_exists(bind, table):
+            continue
+        for suffix in ("ins", "upd", "del"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trig}_{suffix} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS collection_versions_bump()")
+    op.execute("DROP FUNCTION IF EXISTS collection_version_bump(text)")
+    op.execute("DROP TABLE IF EXISTS collection_versions")
@@ -0,0 +1,53 @@
+"""Transactional email outbox
+
+- email_outbox: one row per queued email, written in the business transaction
+- partial index on next_attempt_at for pending rows (dispatcher claim query)
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+revision = "email_outbox_20261019"
+down_revision = "revoked_token_20261019"
+branch_labels = None
+depends_on = None
+
+def table_exists(bind, name: str) -> bool:
+    insp = sa.inspect(bind)
+    return name in insp.get_table_names()
+
+def index_exists(bind, table: str, index: str) -> bool:
+    insp = sa.inspect(bind)
+    idxs = [i["name"] for i in insp.get_indexes(table)]
+    return index in idxs
+
+def upgrade():
+    bind = op.get_bind()
+    if not table_exists(bind, "email_outbox"):
+        op.create_table(
+            "email_outbox",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("kind", sa.Text(), nullable=False),
+            sa.Column("recipients", psql.JSONB(), nullable=False),
+            sa.Column("subject", sa.Text(), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("attachments", psql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+            sa.Column("status", sa.Text(), nullable=False, server_default=sa.text("'pending'")),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+            sa.Column("next_attempt_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.Column("sent_at", psql.TIMESTAMP(timezone=True), nullable=True),
+            sa.CheckConstraint("status IN ('pending','sent','dead')", name="ck_email_outbox_status"),
+        )
+    if not index_exists(bind, "email_outbox", "ix_email_outbox_due"):
+        op.create_index("ix_email_outbox_due", "email_outbox", ["next_attempt_at"],
+                        postgresql_where=sa.text("status = 'pending'"))
+    if not index_exists(bind, "email_outbox", "ix_email_outbox_sent_at"):
+        op.create_index("ix_email_outbox_sent_at", "email_outbox", ["sent_at"],
+                        postgresql_where=sa.text("status = 'sent'"))
+
+def downgrade():
+    op.drop_index("ix_email_outbox_sent_at", table_name="email_outbox", if_exists=True)
+    op.drop_index("ix_email_outbox_due", table_name="email_outbox", if_exists=True)
+    op.drop_table("email_outbox", if_exists=True)
@@ -0,0 +1,38 @@
+"""Coalesced notification digests in the email outbox
+
+- email_outbox.digest_key: set while a digest row is still collecting changes
+- email_outbox.digest: the coalesced change entries (jsonb array)
+- partial unique index so concurrent changes merge into one pending row
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+revision = "email_outbox_digest_20261019"
+down_revision = "blob_storage_external_20261019"
+branch_labels = None
+depends_on = None
+
+def column_exists(bind, table: str, column: str) -> bool:
+    insp = sa.inspect(bind)
+    return column in [c["name"] for c in insp.get_columns(table)]
+
+def index_exists(bind, table: str, index: str) -> bool:
+    insp = sa.inspect(bind)
+    idxs = [i["name"] for i in insp.get_indexes(table)]
+    return index in idxs
+
+def upgrade():
+    bind = op.get_bind()
+    if not column_exists(bind, "email_outbox", "digest_key"):
+        op.add_column("email_outbox", sa.Column("digest_key", sa.Text(), nullable=True))
+    if not column_exists(bind, "email_outbox", "digest"):
+        op.add_column("email_outbox", sa.Column("digest", psql.JSONB(), nullable=True))
+    if not index_exists(bind, "email_outbox", "ux_email_outbox_digest_key"):
+        op.create_index("ux_email_outbox_digest_key", "email_outbox", ["digest_key"], unique=True,
+                        postgresql_where=sa.text("digest_key IS NOT NULL"))
+
+def downgrade():
+    op.drop_index("ux_email_outbox_digest_key", table_name="email_outbox", if_exists=True)
+    op.drop_column("email_outbox", "digest")
+    op.drop_column("email_outbox", "digest_key")
@@ -0,0 +1,43 @@
+"""MFA recovery codes as HMAC digests
+
+- mfa_recovery_code table: one row per unused code, HMAC-SHA256 digest
+- unique (user_id, code_digest) index so a recovery check is a single probe
+
+Legacy bcrypt hashes in mfa_credential.recovery_codes are left in place and
+consumed by the application on first use.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+revision = "mfa_recovery_code_20261019"
+down_revision = "consolidation_20250929"
+branch_labels = None
+depends_on = None
+
+def table_exists(bind, name: str) -> bool:
+    insp = sa.inspect(bind)
+    return name in insp.get_table_names()
+
+def index_exists(bind, table: str, index: str) -> bool:
+    insp = sa.inspect(bind)
+    idxs = [i["name"] for i in insp.get_indexes(table)]
+    return index in idxs
+
+def upgrade():
+    bind = op.get_bind()
+    if not table_exists(bind, "mfa_recovery_code"):
+        op.create_table(
+            "mfa_recovery_code",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("user_id", psql.UUID(as_uuid=True), nullable=False),
+            sa.Column("code_digest", sa.LargeBinary(), nullable=False),
+            sa.Column("created_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="fk_mfa_recovery_code_user_id_users", ondelete="CASCADE"),
+        )
+    if not index_exists(bind, "mfa_recovery_code", "ux_mfa_recovery_code_user_digest"):
+        op.create_index("ux_mfa_recovery_code_user_digest", "mfa_recovery_code", ["user_id", "code_digest"], unique=True)
+
+def downgrade():
+    op.drop_index("ux_mfa_recovery_code_user_digest", table_name="mfa_recovery_code", if_exists=True)
+    op.drop_table("mfa_recovery_code", if_exists=True)
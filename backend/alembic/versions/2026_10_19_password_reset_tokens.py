@@ -0,0 +1,74 @@
+"""Hashed, indexed password_reset_tokens
+
+- password_reset_tokens stores SHA-256(token) only (token_hash bytea)
+- unique index on token_hash for O(log n) lookups
+- partial index on expires_at for unused tokens (the live set; now() is
+  not allowed in index predicates, so expiry is checked at query time)
+- index on user_id for cascade deletes
+
+Tables created by the old runtime CREATE TABLE IF NOT EXISTS are converted
+in place: dead rows are dropped, live plaintext tokens are hashed with
+pgcrypto, and the plaintext column is removed.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+revision = "password_reset_tokens_20261019"
+down_revision = "mfa_recovery_code_20261019"
+branch_labels = None
+depends_on = None
+
+def table_exists(bind, name: str) -> bool:
+    insp = sa.inspect(bind)
+    return name in insp.get_table_names()
+
+def column_exists(bind, table: str, column: str) -> bool:
+    insp = sa.inspect(bind)
+    cols = [c["name"] for c in insp.get_columns(table)]
+    return column in cols
+
+def index_exists(bind, table: str, index: str) -> bool:
+    insp = sa.inspect(bind)
+    idxs = [i["name"] for i in insp.get_indexes(table)]
+    return index in idxs
+
+def upgrade():
+    bind = op.get_bind()
+    if not table_exists(bind, "password_reset_tokens"):
+        op.create_table(
+            "password_reset_tokens",
+            sa.Column("id", psql.UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+            sa.Column("user_id", psql.UUID(as_uuid=True), nullable=False),
+            sa.Column("token_hash", sa.LargeBinary(), nullable=False),
+            sa.Column("expires_at", psql.TIMESTAMP(timezone=True), nullable=False),
+            sa.Column("used", sa.Boolean(), nullable=False, server_default=sa.text("FALSE")),
+            sa.Column("created_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="fk_password_reset_tokens_user_id_users", ondelete="CASCADE"),
+        )
+    else:
+        # legacy runtime-created table: plaintext `token`, no default on id
+        op.execute("DELETE FROM password_reset_tokens WHERE used OR expires_at < now()")
+        if not column_exists(bind, "password_reset_tokens", "token_hash"):
+            op.add_column("password_reset_tokens", sa.Column("token_hash", sa.LargeBinary(), nullable=True))
+        if column_exists(bind, "password_reset_tokens", "token"):
+            op.execute("UPDATE password_reset_tokens SET token_hash = digest(token, 'sha256') WHERE token_hash IS NULL")
+            op.drop_column("password_reset_tokens", "token")
+        op.alter_column("password_reset_tokens", "token_hash", nullable=False)
+        op.alter_column("password_reset_tokens", "id", server_default=sa.text("gen_random_uuid()"))
+        if not column_exists(bind, "password_reset_tokens", "created_at"):
+            op.add_column("password_reset_tokens", sa.Column("created_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")))
+
+    if not index_exists(bind, "password_reset_tokens", "ux_password_reset_tokens_token_hash"):
+        op.create_index("ux_password_reset_tokens_token_hash", "password_reset_tokens", ["token_hash"], unique=True)
+    if not index_exists(bind, "password_reset_tokens", "ix_password_reset_tokens_live"):
+        op.create_index("ix_password_reset_tokens_live", "password_reset_tokens", ["expires_at"],
+                        postgresql_where=sa.text("NOT used"))
+    if not index_exists(bind, "password_reset_tokens", "ix_password_reset_tokens_user_id"):
+        op.create_index("ix_password_reset_tokens_user_id", "password_reset_tokens", ["user_id"])
+
+def downgrade():
+    op.drop_index("ix_password_reset_tokens_user_id", table_name="password_reset_tokens", if_exists=True)
+    op.drop_index("ix_password_reset_tokens_live", table_name="password_reset_tokens", if_exists=True)
+    op.drop_index("ux_password_reset_tokens_token_hash", table_name="password_reset_tokens", if_exists=True)
+    op.drop_table("password_reset_tokens", if_exists=True)
@@ -0,0 +1,128 @@
+"""Pre-aggregated referral totals for the dashboard overview
+
+- referrals.estimated_commission / commission_paid (the overview reported on
+  them but they never existed)
+- referral_status_totals (agent_id, status): count + estimated commission
+- referral_daily_totals (agent_id, day): created, moved to won, commission paid
+- AFTER triggers on referrals keep both in step; updates that do not touch
+  status/agent/commission skip the trigger entirely (WHEN clause)
+
+Status is stored lower-cased and a NULL agent_id under the zero uuid, so both
+tables can use plain primary keys for the upserts. "won" moves before this
+migration are not known; delta_won_30d counts from here on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "referral_stats_20261019"
+down_revision = "email_outbox_digest_20261019"
+branch_labels = None
+depends_on = None
+
+ZERO = "00000000-0000-0000-0000-000000000000"
+
+def upgrade():
+    op.execute("ALTER TABLE referrals ADD COLUMN IF NOT EXISTS estimated_commission numeric(12,2) NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE referrals ADD COLUMN IF NOT EXISTS commission_paid numeric(12,2) NOT NULL DEFAULT 0")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS referral_status_totals (
+            agent_id uuid NOT NULL,
+            status text NOT NULL,
+            n bigint NOT NULL DEFAULT 0,
+            estimated_commission numeric(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (agent_id, status)
+        )""")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS referral_daily_totals (
+            agent_id uuid NOT NULL,
+            day date NOT NULL,
+            created bigint NOT NULL DEFAULT 0,
+            won bigint NOT NULL DEFAULT 0,
+            commission_paid numeric(14,2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (agent_id, day)
+        )""")
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION referral_status_bump(a uuid, s text, dn bigint, de numeric) RETURNS void AS $$
+            INSERT INTO referral_status_totals AS t (agent_id, status, n, estimated_commission)
+            VALUES (COALESCE(a, '{ZERO}'), lower(COALESCE(s, '')), dn, COALESCE(de, 0))
+            ON CONFLICT (agent_id, status) DO UPDATE
+               SET n = t.n + EXCLUDED.n,
+                   estimated_commission = t.estimated_commission + EXCLUDED.estimated_commission
+        $$ LANGUAGE sql""")
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION referral_daily_bump(a uuid, d date, dc bigint, dw bigint, dp numeric) RETURNS void AS $$
+            INSERT INTO referral_daily_totals AS t (agent_id, day, created, won, commission_paid)
+            VALUES (COALESCE(a, '{ZERO}'), d, dc, dw, COALESCE(dp, 0))
+            ON CONFLICT (agent_id, day) DO UPDATE
+               SET created = t.created + EXCLUDED.created,
+                   won = t.won + EXCLUDED.won,
+                   commission_paid = t.commission_paid + EXCLUDED.commission_paid
+        $$ LANGUAGE sql""")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION referral_totals_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM referral_status_bump(OLD.agent_id, OLD.status, -1, -OLD.estimated_commission);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM referral_status_bump(NEW.agent_id, NEW.status, 1, NEW.estimated_commission);
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                PERFORM referral_daily_bump(NEW.agent_id, NEW.created_at::date, 1, 0, NEW.commission_paid);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM referral_daily_bump(OLD.agent_id, OLD.created_at::date, -1, 0, 0);
+            ELSE
+                IF OLD.agent_id IS DISTINCT FROM NEW.agent_id OR OLD.created_at IS DISTINCT FROM NEW.created_at THEN
+                    PERFORM referral_daily_bump(OLD.agent_id, OLD.created_at::date, -1, 0, 0);
+                    PERFORM referral_daily_bump(NEW.agent_id, NEW.created_at::date, 1, 0, 0);
+                END IF;
+                IF lower(NEW.status) = 'won' AND lower(OLD.status) IS DISTINCT FROM 'won' THEN
+                    PERFORM referral_daily_bump(NEW.agent_id, current_date, 0, 1, 0);
+                END IF;
+                IF NEW.commission_paid IS DISTINCT FROM OLD.commission_paid THEN
+                    PERFORM referral_daily_bump(NEW.agent_id, current_date, 0, 0,
+                                                COALESCE(NEW.commission_paid, 0) - COALESCE(OLD.commission_paid, 0));
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""")
+
+    # block referral writes while the triggers go in and the totals are backfilled
+    op.execute("LOCK TABLE referrals IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_ins_del ON referrals")
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_upd ON referrals")
+    op.execute("""
+        CREATE TRIGGER referral_totals_ins_del AFTER INSERT OR DELETE ON referrals
+        FOR EACH ROW EXECUTE FUNCTION referral_totals_apply()""")
+    op.execute("""
+        CREATE TRIGGER referral_totals_upd
+        AFTER UPDATE OF status, agent_id, created_at, estimated_commission, commission_paid ON referrals
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status
+              OR OLD.agent_id IS DISTINCT FROM NEW.agent_id
+              OR OLD.created_at IS DISTINCT FROM NEW.created_at
+              OR OLD.estimated_commission IS DISTINCT FROM NEW.estimated_commission
+              OR OLD.commission_paid IS DISTINCT FROM NEW.commission_paid)
+        EXECUTE FUNCTION referral_totals_apply()""")
+
+    op.execute("TRUNCATE referral_status_totals, referral_daily_totals")
+    op.execute(f"""
+        INSERT INTO referral_status_totals (agent_id, status, n, estimated_commission)
+        SELECT COALESCE(agent_id, '{ZERO}'), lower(COALESCE(status, '')), count(*), sum(estimated_commission)
+          FROM referrals GROUP BY 1, 2""")
+    op.execute(f"""
+        INSERT INTO referral_daily_totals (agent_id, day, created, commission_paid)
+        SELECT COALESCE(agent_id, '{ZERO}'), created_at::date, count(*), sum(commission_paid)
+          FROM referrals GROUP BY 1, 2""")
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_upd ON referrals")
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_ins_del ON referrals")
+    op.execute("DROP FUNCTION IF EXISTS referral_totals_apply()")
+    op.execute("DROP FUNCTION IF EXISTS referral_daily_bump(uuid, date, bigint, bigint, numeric)")
+    op.execute("DROP FUNCTION IF EXISTS referral_status_bump(uuid, text, bigint, numeric)")
+    op.execute("DROP TABLE IF EXISTS referral_daily_totals")
+    op.execute("DROP TABLE IF EXISTS referral_status_totals")
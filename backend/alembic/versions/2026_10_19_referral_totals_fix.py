@@ -0,0 +1,146 @@
+"""Referral totals: book paid commission on one day, everywhere
+
+referral_totals_apply() from referral_stats_20261019 booked commission_paid
+on different days depending on the path: INSERT and the backfill on the
+created_at day, a change on current_date, and DELETE or an agent/created_at
+change not at all. paid_commissions_ytd drifted after every such write, and
+a referral created last year and paid this year could not be taken back off
+the year it was counted in.
+
+- referrals.commission_paid_on: the day the row's current commission_paid
+  is booked on. A BEFORE UPDATE trigger stamps current_date whenever
+  commission_paid changes (INSERT gets it from the column default);
+  existing rows are backfilled from updated_at where that column exists,
+  created_at otherwise (the old /overview counted by updated_at year).
+- referral_totals_apply() adds, removes and moves the paid amount on that
+  day for INSERT, DELETE and every change of agent, amount or paid-on day.
+  "created" stays on the created_at day.
+- The totals are rebuilt from referrals: referral_status_totals completely,
+  referral_daily_totals for created/commission_paid only, so the "won" moves
+  recorded since are kept.
+
+scripts/check_referral_totals.py compares the totals per agent and day with
+a GROUP BY over referrals.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "referral_totals_fix_20261019"
+down_revision = "collection_versions_20261019"
+branch_labels = None
+depends_on = None
+
+ZERO = "00000000-0000-0000-0000-000000000000"
+
+def upgrade():
+    bind = op.get_bind()
+    has_updated_at = "updated_at" in [c["name"] for c in sa.inspect(bind).get_columns("referrals")]
+
+    # block referral writes until the triggers and the totals agree again
+    op.execute("LOCK TABLE referrals IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_ins_del ON referrals")
+    op.execute("DROP TRIGGER IF EXISTS referral_totals_upd ON referrals")
+
+    op.execute("ALTER TABLE referrals ADD COLUMN IF NOT EXISTS commission_paid_on date")
+    op.execute("UPDATE referrals SET commission_paid_on = {}::date WHERE commission_paid_on IS NULL".format(
+        "COALESCE(updated_at, created_at)" if has_updated_at else "created_at"))
+    op.execute("ALTER TABLE referrals ALTER COLUMN commission_paid_on SET DEFAULT current_date")
+    op.execute("ALTER TABLE referrals ALTER COLUMN commission_paid_on SET NOT NULL")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION referral_paid_on_stamp() RETURNS trigger AS $$
+        BEGIN
+            -- a new amount is booked today, unless the writer set the day itself
+            IF NEW.commission_paid IS DISTINCT FROM OLD.commission_paid
+               AND NEW.commission_paid_on IS NOT DISTINCT FROM OLD.commission_paid_on THEN
+                NEW.commission_paid_on := current_date;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql""")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION referral_totals_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM referral_status_bump(OLD.agent_id, OLD.status, -1, -OLD.estimated_commission);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM referral_status_bump(NEW.agent_id, NEW.status, 1, NEW.estimated_commission);
+            END IF;
+
+            -- created: on the created_at day
+            IF TG_OP = 'INSERT' THEN
+                PERFORM referral_daily_bump(NEW.agent_id, NEW.created_at::date, 1, 0, 0);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM referral_daily_bump(OLD.agent_id, OLD.created_at::date, -1, 0, 0);
+            ELSIF OLD.agent_id IS DISTINCT FROM NEW.agent_id OR OLD.created_at IS DISTINCT FROM NEW.created_at THEN
+                PERFORM referral_daily_bump(OLD.agent_id, OLD.created_at::date, -1, 0, 0);
+                PERFORM referral_daily_bump(NEW.agent_id, NEW.created_at::date, 1, 0, 0);
+            END IF;
+
+            -- paid: on the commission_paid_on day, taken back off the same day
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.commission_paid <> 0
+               AND (TG_OP = 'DELETE'
+                    OR OLD.agent_id IS DISTINCT FROM NEW.agent_id
+                    OR OLD.commission_paid IS DISTINCT FROM NEW.commission_paid
+                    OR OLD.commission_paid_on IS DISTINCT FROM NEW.commission_paid_on) THEN
+                PERFORM referral_daily_bump(OLD.agent_id, OLD.commission_paid_on, 0, 0, -OLD.commission_paid);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.commission_paid <> 0
+               AND (TG_OP = 'INSERT'
+                    OR OLD.agent_id IS DISTINCT FROM NEW.agent_id
+                    OR OLD.commission_paid IS DISTINCT FROM NEW.commission_paid
+                    OR OLD.commission_paid_on IS DISTINCT FROM NEW.commission_paid_on) THEN
+                PERFORM referral_daily_bump(NEW.agent_id, NEW.commission_paid_on, 0, 0, NEW.commission_paid);
+            END IF;
+
+            IF TG_OP = 'UPDATE' AND lower(NEW.status) = 'won' AND lower(OLD.status) IS DISTINCT FROM 'won' THEN
+                PERFORM referral_daily_bump(NEW.agent_id, current_date, 0, 1, 0);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""")
+
+    op.execute("DROP TRIGGER IF EXISTS referral_paid_on_stamp ON referrals")
+    op.execute("""
+        CREATE TRIGGER referral_paid_on_stamp BEFORE UPDATE OF commission_paid ON referrals
+        FOR EACH ROW EXECUTE FUNCTION referral_paid_on_stamp()""")
+    op.execute("""
+        CREATE TRIGGER referral_totals_ins_del AFTER INSERT OR DELETE ON referrals
+        FOR EACH ROW EXECUTE FUNCTION referral_totals_apply()""")
+    op.execute("""
+        CREATE TRIGGER referral_totals_upd
+        AFTER UPDATE OF status, agent_id, created_at, estimated_commission, commission_paid, commission_paid_on
+        ON referrals
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status
+              OR OLD.agent_id IS DISTINCT FROM NEW.agent_id
+              OR OLD.created_at IS DISTINCT FROM NEW.created_at
+              OR OLD.estimated_commission IS DISTINCT FROM NEW.estimated_commission
+              OR OLD.commission_paid IS DISTINCT FROM NEW.commission_paid
+              OR OLD.commission_paid_on IS DISTINCT FROM NEW.commission_paid_on)
+        EXECUTE FUNCTION referral_totals_apply()""")
+
+    op.execute("TRUNCATE referral_status_totals")
+    op.execute("UPDATE referral_daily_totals SET created = 0, commission_paid = 0")
+    op.execute(f"""
+        INSERT INTO referral_status_totals (agent_id, status, n, estimated_commission)
+        SELECT COALESCE(agent_id, '{ZERO}'), lower(COALESCE(status, '')), count(*), sum(estimated_commission)
+          FROM referrals GROUP BY 1, 2""")
+    op.execute(f"""
+        INSERT INTO referral_daily_totals (agent_id, day, created, commission_paid)
+        SELECT agent_id, day, sum(created), sum(paid)
+          FROM (SELECT COALESCE(agent_id, '{ZERO}') AS agent_id, created_at::date AS day,
+                       1 AS created, 0 AS paid
+                  FROM referrals
+                UNION ALL
+                SELECT COALESCE(agent_id, '{ZERO}'), commission_paid_on, 0, commission_paid
+                  FROM referrals WHERE commission_paid <> 0) r
+         GROUP BY 1, 2
+        ON CONFLICT (agent_id, day) DO UPDATE
+           SET created = EXCLUDED.created, commission_paid = EXCLUDED.commission_paid""")
+
+def downgrade():
+    # the corrected functions, their triggers and commission_paid_on are kept:
+    # restoring the old function would only bring the drift back
+    pass
@@ -0,0 +1,46 @@
+"""Server-side JWT revocation list
+
+- revoked_token table keyed by the token's jti (unique)
+- expires_at index so the periodic purge of expired rows is a range scan
+
+Rows are only needed until the token would have expired on its own; the
+application purges them when it rebuilds its in-memory filter.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as psql
+
+revision = "revoked_token_20261019"
+down_revision = "password_reset_tokens_20261019"
+branch_labels = None
+depends_on = None
+
+def table_exists(bind, name: str) -> bool:
+    insp = sa.inspect(bind)
+    return name in insp.get_table_names()
+
+def index_exists(bind, table: str, index: str) -> bool:
+    insp = sa.inspect(bind)
+    idxs = [i["name"] for i in insp.get_indexes(table)]
+    return index in idxs
+
+def upgrade():
+    bind = op.get_bind()
+    if not table_exists(bind, "revoked_token"):
+        op.create_table(
+            "revoked_token",
+            sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+            sa.Column("jti", sa.Text(), nullable=False),
+            sa.Column("user_id", psql.UUID(as_uuid=True), nullable=True),
+            sa.Column("expires_at", psql.TIMESTAMP(timezone=True), nullable=False),
+            sa.Column("revoked_at", psql.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        )
+    if not index_exists(bind, "revoked_token", "ux_revoked_token_jti"):
+        op.create_index("ux_revoked_token_jti", "revoked_token", ["jti"], unique=True)
+    if not index_exists(bind, "revoked_token", "ix_revoked_token_expires_at"):
+        op.create_index("ix_revoked_token_expires_at", "revoked_token", ["expires_at"])
+
+def downgrade():
+    op.drop_index("ix_revoked_token_expires_at", table_name="revoked_token", if_exists=True)
+    op.drop_index("ux_revoked_token_jti", table_name="revoked_token", if_exists=True)
+    op.drop_table("revoked_token", if_exists=True)
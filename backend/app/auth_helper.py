@@ -4,6 +4,7 @@ from typing import Optional, Tuple
 from fastapi import HTTPException, status
 import jwt  # PyJWT
 from .config import settings
+from .security import revocation
 
 def bearer_sub_and_role(authorization: Optional[str]) -> Tuple[str, Optional[str]]:
     """Parse Authorization: Bearer <jwt> and return (sub, role)."""
@@ -18,4 +19,6 @@ def bearer_sub_and_role(authorization: Optional[str]) -> Tuple[str, Optional[str
     role = payload.get("role")
     if not sub:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if revocation.is_revoked(payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
     return sub, role
@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     # MFA settings
     REQUIRE_MFA: bool = True
     MFA_BOOTSTRAP_ALLOW: bool = False
+    # HMAC key for recovery-code digests; falls back to JWT_SECRET when unset
+    MFA_RECOVERY_CODE_KEY: str | None = None
 
     # make this optional so its presence never crashes import
     FRONTEND_ORIGIN: str | None = None
@@ -4,6 +4,8 @@ import os
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
 
+from app.security import revocation
+
 # --- DB session dependency ----------------------------------------------------
 
 SessionLocal = None
@@ -132,6 +134,10 @@ def require_auth(authorization: Optional[str] = Header(None)) -> Tuple[str, str]
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token (no sub)"
         )
+    if revocation.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked"
+        )
     return (str(sub), str(role))
 
 
@@ -8,6 +8,7 @@ import jwt
 
 from app.db import get_session
 from app.config import settings
+from app.security import revocation
 
 def _pick_token(request: Request) -> str | None:
     # 1) Authorization header
@@ -43,6 +44,8 @@ def require_session(request: Request, db: Session = Depends(get_session)):
     uid = payload.get("sub")
     if not uid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if revocation.is_revoked(payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
 
     user = db.execute(
         text("SELECT id, email, role, is_active FROM users WHERE id=:id LIMIT 1"),
@@ -1,45 +1,170 @@
-
 from typing import List, Optional, Dict
-import msal, requests
+import msal
 import base64
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from app.config import settings
+from app.services.http_client import client as http
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl  # POSIX; cross-process lock on the token cache file
+except ImportError:  # Windows dev boxes: in-process lock only
+    fcntl = None
 
 SCOPE = ["https://graph.microsoft.com/Mail.Send"]
+GRAPH_API_BASE = os.getenv("GRAPH_API_BASE", "https://graph.microsoft.com/v1.0")
+# inline (base64-in-JSON) attachments up to this total; the rest are added to a draft
+GRAPH_INLINE_MAX_BYTES = int(os.getenv("GRAPH_INLINE_MAX_BYTES", str(3 * 1024 * 1024)))
+# Graph accepts upload sessions only for files of 3-150 MB; smaller ones are POSTed one by one
+GRAPH_UPLOAD_SESSION_MIN_BYTES = int(os.getenv("GRAPH_UPLOAD_SESSION_MIN_BYTES", str(3 * 1024 * 1024)))
+# upload-session chunks must be multiples of 320 KiB and at most 4 MiB
+GRAPH_UPLOAD_CHUNK_BYTES = max(1, int(os.getenv("GRAPH_UPLOAD_CHUNK_BYTES", str(9 * 327680))) // 327680) * 327680
+# refresh this long before the access token's own expiry
+GRAPH_TOKEN_REFRESH_MARGIN_SECS = int(os.getenv("GRAPH_TOKEN_REFRESH_MARGIN_SECS", "300"))
 
-def _cache():
-    from msal import SerializableTokenCache
-    p = Path(settings.BOT_CACHE_PATH)
-    cache = SerializableTokenCache()
-    if p.exists():
-        cache.deserialize(p.read_text(encoding="utf-8"))
-    return cache, p
+# Process-wide MSAL state: one client (authority discovery happens once), one
+# cache, and the current access token kept in memory until near expiry.
+_lock = threading.Lock()
+_app: Optional[msal.PublicClientApplication] = None
+_cache: Optional[msal.SerializableTokenCache] = None
+_cache_mtime = 0.0
+_access_token: Optional[str] = None
+_expires_at = 0.0
 
-def _token():
-    if not settings.MS_GRAPH_CLIENT_ID or not settings.MS_GRAPH_TENANT_ID:
-        raise RuntimeError("Graph client/tenant not configured")
-    cache, path = _cache()
-    app = msal.PublicClientApplication(
-        client_id=settings.MS_GRAPH_CLIENT_ID,
-        authority=f"https://login.microsoftonline.com/{settings.MS_GRAPH_TENANT_ID}",
-        token_cache=cache
-    )
-    accts = app.get_accounts()
-    print(f"[Graph] Cache file: {path}, exists: {path.exists()}, size: {path.stat().st_size if path.exists() else 0}")
-    print(f"[Graph] Found {len(accts)} accounts in cache")
-    if accts:
-        print(f"[Graph] Account: {accts[0].get('username', 'unknown')}")
-
-    res = app.acquire_token_silent(SCOPE, account=accts[0] if accts else None)
-    if not res or "access_token" not in res:
-        error_detail = res.get("error_description") if res else "No response from MSAL"
-        print(f"[Graph] Token acquisition failed: {error_detail}")
-        raise RuntimeError(f"Graph token unavailable. Reseat device-code cache. Detail: {error_detail}")
-
-    print(f"[Graph] Token acquired successfully")
+@contextmanager
+def _file_lock(path: Path):
+    """Exclusive lock on <cache>.lock so workers don't interleave cache reads/writes."""
+    if fcntl is None:
+        yield
+        return
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(cache.serialize(), encoding="utf-8")
-    return res["access_token"]
+    with open(str(path) + ".lock", "a+") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+def _load_cache(path: Path) -> None:
+    """(Re)load the on-disk cache if another process has written it since we last looked."""
+    global _cache_mtime
+    mtime = path.stat().st_mtime if path.exists() else 0.0
+    if mtime and mtime != _cache_mtime:
+        with _file_lock(path):
+            _cache.deserialize(path.read_text(encoding="utf-8"))
+        _cache_mtime = mtime
+
+def _persist_cache(path: Path) -> None:
+    global _cache_mtime
+    if not _cache.has_state_changed:
+        return
+    with _file_lock(path):
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(_cache.serialize(), encoding="utf-8")
+        os.replace(tmp, path)
+        _cache_mtime = path.stat().st_mtime
+    _cache.has_state_changed = False
+
+def _client() -> msal.PublicClientApplication:
+    global _app, _cache
+    if _app is None:
+        if not settings.MS_GRAPH_CLIENT_ID or not settings.MS_GRAPH_TENANT_ID:
+            raise RuntimeError("Graph client/tenant not configured")
+        _cache = msal.SerializableTokenCache()
+        _app = msal.PublicClientApplication(
+            client_id=settings.MS_GRAPH_CLIENT_ID,
+            authority=f"https://login.microsoftonline.com/{settings.MS_GRAPH_TENANT_ID}",
+            token_cache=_cache
+        )
+    return _app
+
+def _token():
+    global _access_token, _expires_at
+    if _access_token and time.time() < _expires_at:
+        return _access_token
+    with _lock:
+        if _access_token and time.time() < _expires_at:
+            return _access_token
+        app = _client()
+        path = Path(settings.BOT_CACHE_PATH)
+        _load_cache(path)
+        accts = app.get_accounts()
+        res = app.acquire_token_silent(SCOPE, account=accts[0] if accts else None)
+        if not res or "access_token" not in res:
+            error_detail = res.get("error_description") if res else "No response from MSAL"
+            logger.error("Graph token acquisition failed (cache %s, %d accounts): %s", path, len(accts), error_detail)
+            raise RuntimeError(f"Graph token unavailable. Reseat device-code cache. Detail: {error_detail}")
+
+        _persist_cache(path)  # only when MSAL actually refreshed something
+        _access_token = res["access_token"]
+        _expires_at = time.time() + int(res.get("expires_in", 0)) - GRAPH_TOKEN_REFRESH_MARGIN_SECS
+        return _access_token
+
+def _invalidate_token() -> None:
+    global _access_token, _expires_at
+    _access_token, _expires_at = None, 0.0
+
+def _size(att: Dict) -> int:
+    if att.get("size") is not None:
+        return int(att["size"])
+    return len(att.get("content") or b"")
+
+def _read_all(att: Dict):
+    if att.get("content") is not None:
+        return att["content"]
+    return att["read"](0, _size(att))
+
+def _inline(att: Dict) -> Dict:
+    # b64encode takes any bytes-like (memoryview from psycopg2 included): no bytes() copy
+    return {
+        "@odata.type": "#microsoft.graph.fileAttachment",
+        "name": att.get("name", "attachment"),
+        "contentType": att.get("content_type", "application/octet-stream"),
+        "contentBytes": base64.b64encode(_read_all(att)).decode("ascii"),
+    }
+
+def _check(r, what: str):
+    if r.status_code == 401:
+        _invalidate_token()  # revoked/rotated early; next send re-acquires
+    if r.status_code not in (200, 201, 202, 204):
+        raise RuntimeError(f"Graph {what} failed: {r.status_code} {r.text}")
+    return r
+
+def _upload_large(message_id: str, h: Dict, att: Dict) -> None:
+    """Stream one attachment into the draft via an upload session, chunk by chunk."""
+    size = _size(att)
+    r = _check(http.post(
+        f"{GRAPH_API_BASE}/me/messages/{message_id}/attachments/createUploadSession",
+        headers=h,
+        json={"AttachmentItem": {
+            "attachmentType": "file",
+            "name": att.get("name", "attachment"),
+            "size": size,
+            "contentType": att.get("content_type", "application/octet-stream"),
+        }},
+        timeout=20,
+    ), "createUploadSession")
+    upload_url = r.json()["uploadUrl"]
+    read = att.get("read") or (lambda off, n: memoryview(att["content"])[off:off + n])
+    offset = 0
+    while offset < size:
+        chunk = read(offset, min(GRAPH_UPLOAD_CHUNK_BYTES, size - offset))
+        end = offset + len(chunk) - 1
+        # uploadUrl is pre-authorised: no bearer token on these PUTs
+        _check(http.put(
+            upload_url,
+            headers={"Content-Range": f"bytes {offset}-{end}/{size}",
+                     "Content-Type": "application/octet-stream"},
+            data=bytes(chunk) if isinstance(chunk, memoryview) else chunk,
+            timeout=60,
+        ), "attachment upload")
+        offset = end + 1
 
 def send_mail(to: List[str], subject: str, body_text: str, attachments: Optional[List[Dict]] = None):
     """
@@ -52,37 +177,54 @@ def send_mail(to: List[str], subject: str, body_text: str, attachments: Optional
         attachments: Optional list of attachments, each dict with:
             - name: filename
             - content_type: MIME type
-            - content: bytes content
+            - content: bytes-like content, or
+            - size + read(offset, length) -> bytes, to stream from the blob store
+
+    Attachments are inlined while their total stays under GRAPH_INLINE_MAX_BYTES
+    (Graph rejects inline bodies over ~4 MB). Otherwise a draft is created: files
+    of GRAPH_UPLOAD_SESSION_MIN_BYTES and up stream in through createUploadSession
+    in GRAPH_UPLOAD_CHUNK_BYTES chunks, smaller overflow files are POSTed to the
+    draft's attachments one at a time, then the draft is sent.
     """
     tok = _token()
     h = {"Authorization": f"Bearer {tok}", "Content-Type": "application/json"}
 
-    payload = {
-        "message": {
-            "subject": subject,
-            "body": {"contentType": "Text", "content": body_text},
-            "toRecipients": [{"emailAddress": {"address": a}} for a in to],
-        },
-        "saveToSentItems": "true",
+    message = {
+        "subject": subject,
+        "body": {"contentType": "Text", "content": body_text},
+        "toRecipients": [{"emailAddress": {"address": a}} for a in to],
     }
 
-    # Add attachments if provided
-    if attachments:
-        payload["message"]["attachments"] = []
-        for att in attachments:
-            # Encode file content as base64
-            content_bytes = att.get("content", b"")
-            if isinstance(content_bytes, memoryview):
-                content_bytes = bytes(content_bytes)
-            content_b64 = base64.b64encode(content_bytes).decode('utf-8')
-
-            payload["message"]["attachments"].append({
-                "@odata.type": "#microsoft.graph.fileAttachment",
-                "name": att.get("name", "attachment"),
-                "contentType": att.get("content_type", "application/octet-stream"),
-                "contentBytes": content_b64
-            })
-
-    r = requests.post("https://graph.microsoft.com/v1.0/me/sendMail", headers=h, json=payload, timeout=20)
-    if r.status_code not in (200, 202):
-        raise RuntimeError(f"Graph sendMail failed: {r.status_code} {r.text}")
+    inline, overflow, large, budget = [], [], [], GRAPH_INLINE_MAX_BYTES
+    for att in sorted(attachments or [], key=_size):
+        if _size(att) >= GRAPH_UPLOAD_SESSION_MIN_BYTES:
+            large.append(att)
+        elif _size(att) <= budget:
+            inline.append(att)
+            budget -= _size(att)
+        else:
+            overflow.append(att)
+    if inline:
+        message["attachments"] = [_inline(a) for a in inline]
+
+    if not large and not overflow:
+        _check(http.post(f"{GRAPH_API_BASE}/me/sendMail", headers=h,
+                         json={"message": message, "saveToSentItems": "true"}, timeout=20), "sendMail")
+        return
+
+    draft = _check(http.post(f"{GRAPH_API_BASE}/me/messages", headers=h, json=message, timeout=20),
+                   "create draft").json()["id"]
+    message.pop("attachments", None)  # drop the base64 strings before streaming the big ones
+    try:
+        for att in overflow:
+            _check(http.post(f"{GRAPH_API_BASE}/me/messages/{draft}/attachments", headers=h,
+                             json=_inline(att), timeout=20), "add attachment")
+        for att in large:
+            _upload_large(draft, h, att)
+        _check(http.post(f"{GRAPH_API_BASE}/me/messages/{draft}/send", headers=h, timeout=20), "send draft")
+    except Exception:
+        try:
+            http.request("DELETE", f"{GRAPH_API_BASE}/me/messages/{draft}", headers=h, timeout=20, retries=0)
+        except Exception:
+            pass
+        raise
@@ -0,0 +1,132 @@
+# backend/app/logs.py
+"""
+Process-wide logging: JSON lines written off the request path.
+
+configure() routes the root logger through a bounded queue. A QueueListener
+thread formats and writes to stdout, so callers pay for building the record
+and a put_nowait(); JSON encoding and the write syscall happen on the
+listener.
+If the queue is full, the record is dropped and counted in
+log_records_dropped; it does not block the event loop.
+
+Every line has the same top-level keys for Promtail: ts, level, logger,
+message, plus whatever the caller passes as extra={"fields": {...}}.
+Access lines add type="access", request_id, method, path, route, status
+and duration_ms.
+
+orjson is used when installed (optional), stdlib json otherwise.
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app import telemetry
+
+try:
+    import orjson
+
+    ENCODER = "orjson"
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+except ImportError:  # optional speed-up
+    ENCODER = "json"
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, default=str, separators=(",", ":"))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# share of successful health/probe requests that still get an access line
+LOG_SAMPLE_PROBES = float(os.getenv("LOG_SAMPLE_PROBES", "0.01"))
+LOG_PROBE_PATHS = set(filter(None, os.getenv(
+    "LOG_PROBE_PATHS", "/healthz,/health,/health/ready,/ready,/ping,/metrics").split(",")))
+# uvicorn's own access log duplicates ours
+LOG_UVICORN_ACCESS = os.getenv("LOG_UVICORN_ACCESS", "0").lower() in ("1", "true", "yes")
+
+_dropped = telemetry.counter("log_records_dropped", "Log records dropped because the log queue was full")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            out.update(fields)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        elif record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return dumps(out)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # cheap part only: resolve %-args (they may be mutated later) and the
+        # traceback (it pins frames); JSON encoding is left to the listener.
+        # Work on a copy: other handlers (caplog, ...) still get the original.
+        record = copy.copy(record)
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.inc()
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def configure() -> None:
+    """Install the queue handler on the root logger (idempotent)."""
+    global _listener, _handler
+    if _handler is not None:
+        return
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JsonFormatter() if LOG_FORMAT == "json"
+                     else logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = _NonBlockingQueueHandler(q)
+    _listener = QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+    for name in ("uvicorn", "uvicorn.error"):
+        lg = logging.getLogger(name)
+        lg.handlers = []
+        lg.propagate = True
+    logging.getLogger("uvicorn.access").disabled = not LOG_UVICORN_ACCESS
+
+
+def sample_access(path: str, status: int) -> bool:
+    """False for the successful probe requests that sampling drops."""
+    if status >= 400 or path not in LOG_PROBE_PATHS:
+        return True
+    return random.random() < LOG_SAMPLE_PROBES
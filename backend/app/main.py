@@ -1,27 +1,51 @@
 from __future__ import annotations
+import logging
 import os
+from app import logs
+logs.configure()  # before anything else logs
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from fastapi.routing import APIRoute
 from app.routers import me as me_router
 from app.routers import users
 
+logger = logging.getLogger("app.main")
+
 app = FastAPI(title="Azor API")
 app.include_router(me_router.router, prefix="/users", include_in_schema=False)
 app.include_router(users.router)
 
+# inside CORS, so 429s carry Access-Control-* headers and preflights are answered first
+if os.getenv("RATE_LIMIT_ENABLED", "0").lower() in ("1", "true", "yes"):
+    from app.middleware.rate_limit import RateLimitMiddleware
+    app.add_middleware(RateLimitMiddleware)
+
 FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
 app.add_middleware(CORSMiddleware,
     allow_origins=[FRONTEND_ORIGIN, "http://127.0.0.1:3000"],
     allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    # let the frontend read when to retry
+    expose_headers=["Retry-After", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"],
 )
 
+if os.getenv("COMPRESS_ENABLED", "1").lower() in ("1", "true", "yes"):
+    from app.middleware.compression import CompressionMiddleware
+    app.add_middleware(CompressionMiddleware)
+
 try:
     from app.middleware.log_json import LogJSONMiddleware
     app.add_middleware(LogJSONMiddleware)
 except Exception:
-    print("[main] log_json middleware not loaded")
+    logger.warning("log_json middleware not loaded")
+
+from app.middleware.profile import ProfileMiddleware
+app.add_middleware(ProfileMiddleware)
+
+# outermost, so rate-limited and failed requests are measured too
+from app.middleware.metrics import MetricsMiddleware
+app.add_middleware(MetricsMiddleware)
 
 def _include_router(module_path: str) -> None:
     try:
@@ -29,9 +53,9 @@ def _include_router(module_path: str) -> None:
         r = getattr(mod, "router", None)
         if r is not None:
             app.include_router(r)  # avoid extra prefix
-            print(f"[main] Router loaded: {module_path}")
+            logger.info("router loaded: %s", module_path)
     except Exception as ex:
-        print(f"[main] Router skipped {module_path}: {ex}")
+        logger.warning("router skipped %s: %s", module_path, ex)
 
 for path in [
     "app.routers.auth",
@@ -46,6 +70,9 @@ for path in [
     "app.routers.announcements",
     "app.routers.admin_announcements",
     "app.routers.feedback",
+    "app.routers.metrics",
+    "app.routers.admin_profile",
+    "app.routers.events",
 ]:
     _include_router(path)
 
@@ -72,7 +99,7 @@ def _ensure_alias(path: str, method: str, candidates: list[str]):
             src = find(c)
             if src is not None:
                 app.add_api_route(path, src.endpoint, methods=[method], include_in_schema=False, name=f"alias:{path}")
-                print(f"[main] Added alias {path} -> {c}")
+                logger.info("added alias %s -> %s", path, c)
                 break
 
 # make sure frontend-required auth endpoints exist
@@ -84,9 +111,9 @@ _ensure_alias("/auth/password-reset", "POST", ["/password-reset", "/api/auth/pas
 def _ensure_schema():
     url = os.getenv("DATABASE_URL")
     if not url:
-        print("[DB] No DATABASE_URL; skipping ensure_schema")
+        logger.info("no DATABASE_URL; skipping ensure_schema")
         return
-    print(f"[DB] Using DATABASE_URL={url}")
+    logger.info("ensure_schema on %s", make_url(url).render_as_string(hide_password=True))
     eng = create_engine(url, future=True)
     stmts = [
         "ALTER TABLE IF EXISTS users ADD COLUMN IF NOT EXISTS first_name text",
@@ -105,6 +132,8 @@ def _ensure_schema():
         "ALTER TABLE IF EXISTS referrals ADD COLUMN IF NOT EXISTS environment text",
         "ALTER TABLE IF EXISTS referrals ADD COLUMN IF NOT EXISTS reason text",
         "ALTER TABLE IF EXISTS referrals ADD COLUMN IF NOT EXISTS ref_no text",
+        "ALTER TABLE IF EXISTS referrals ADD COLUMN IF NOT EXISTS estimated_commission numeric(12,2) NOT NULL DEFAULT 0",
+        "ALTER TABLE IF EXISTS referrals ADD COLUMN IF NOT EXISTS commission_paid numeric(12,2) NOT NULL DEFAULT 0",
         "CREATE UNIQUE INDEX IF NOT EXISTS referrals_ref_no_idx ON referrals(ref_no)",
         "UPDATE referrals SET ref_no = UPPER(SUBSTRING(id::text,1,8)) WHERE ref_no IS NULL",
         """CREATE TABLE IF NOT EXISTS feedback_files (
@@ -123,10 +152,33 @@ def _ensure_schema():
         with eng.begin() as conn:
             for s in stmts:
                 conn.execute(text(s))
-        print("[DB] ensure_schema complete")
+        logger.info("ensure_schema complete")
     except Exception as ex:
-        print(f"[DB] ensure_schema skipped: {ex}")
+        logger.warning("ensure_schema skipped: %s", ex)
 
 @app.on_event("startup")
 def _startup():
     _ensure_schema()
+    from app.security import passwords
+    cost = passwords.calibrate()
+    logger.info("bcrypt cost %d (target %d ms)", cost, passwords.PASSWORD_HASH_TARGET_MS)
+    from app.services import reset_tokens
+    reset_tokens.start_sweeper()
+    from app.security import revocation
+    revocation.store.start()
+    if os.getenv("OUTBOX_DISPATCH_IN_APP", "0").lower() in ("1", "true", "yes"):
+        from app.notifications import dispatcher
+        dispatcher.start_in_process()
+
+@app.on_event("shutdown")
+def _shutdown():
+    from app.security.passwords import pool as hash_pool
+    from app.services import reset_tokens
+    from app.security import revocation
+    revocation.store.stop()
+    from app.services import events
+    events.shutdown()
+    from app.notifications import dispatcher
+    dispatcher.stop_in_process()
+    reset_tokens.stop_sweeper()
+    hash_pool.shutdown()
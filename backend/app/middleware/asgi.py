@@ -0,0 +1,36 @@
+# backend/app/middleware/asgi.py
+"""
+Helpers for the raw ASGI middlewares in this package.
+
+BaseHTTPMiddleware runs every layer in its own task and re-streams the body
+through a memory channel; a plain ASGI wrapper around `send` costs one
+function call per message and leaves streaming responses alone.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+from starlette.types import Message, Send
+
+HeaderBlock = List[Tuple[bytes, bytes]]
+
+
+def header_block(pairs: Iterable[Tuple[str, str]]) -> HeaderBlock:
+    """Encode (name, value) pairs once, at middleware construction."""
+    return [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in pairs]
+
+
+def add_default_headers(message: Message, block: HeaderBlock) -> None:
+    """Append the block's headers to an http.response.start message unless already set."""
+    headers = list(message.get("headers", ()))
+    present = {k.lower() for k, _ in headers}
+    headers.extend(h for h in block if h[0] not in present)
+    message["headers"] = headers
+
+
+def with_default_headers(send: Send, block: HeaderBlock) -> Send:
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            add_default_headers(message, block)
+        await send(message)
+    return wrapped
@@ -0,0 +1,218 @@
+# backend/app/middleware/compression.py
+"""
+Response compression: zstd, br or gzip, whichever the client accepts first
+in COMPRESS_PREFERENCE. zstd needs the optional zstandard package and br
+needs brotli (or brotlicffi); gzip is always available.
+
+A response is compressed only when all of these hold:
+  * its Content-Type starts with an entry in COMPRESS_TYPES (JSON, text,
+    CSV, XML, SVG by default), so PDF, ZIP, images and
+    application/octet-stream downloads pass through untouched,
+  * it has no Content-Encoding yet,
+  * it is not a 204, 206 or 304, and its Cache-Control does not say
+    no-transform,
+  * the whole body is at least COMPRESS_MIN_BYTES. Bodies that stream in
+    several chunks are always compressed.
+
+Streaming responses are compressed chunk by chunk, with a sync flush after
+each chunk. Every chunk reaches the client as soon as the app sends it, so
+a long export does not sit in a buffer until the end. Raw ASGI, like the
+other middlewares here.
+"""
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import telemetry
+
+try:
+    import brotli
+except ImportError:  # optional
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_TYPES = tuple(t.strip() for t in os.getenv(
+    "COMPRESS_TYPES",
+    "application/json,text/,application/javascript,application/xml,application/problem+json,image/svg+xml",
+).split(",") if t.strip())
+COMPRESS_PREFERENCE = [e.strip() for e in os.getenv("COMPRESS_PREFERENCE", "zstd,br,gzip").split(",") if e.strip()]
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", "3"))
+
+_bytes = telemetry.counter("http_compression_bytes", "Response bytes before/after compression",
+                           ["encoding", "stage"])
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._z.compress(data) + self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.process(data) + self._c.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.process(data) + self._c.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=COMPRESS_ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._c.compress(data) + self._c.flush()
+
+
+ENCODERS = {"gzip": _Gzip}
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _Zstd
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best available encoding the client accepts (q > 0), by COMPRESS_PREFERENCE."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for enc in COMPRESS_PREFERENCE:
+        if enc in ENCODERS and accepted.get(enc, accepted.get("*", 0.0)) > 0:
+            return enc
+    return None
+
+
+def _compressible(headers: list) -> bool:
+    ctype = ""
+    for k, v in headers:
+        if k == b"content-encoding":
+            return False
+        if k == b"content-type":
+            ctype = v.decode("latin-1").lower()
+        elif k == b"cache-control" and b"no-transform" in v.lower():
+            return False
+    return ctype.startswith(COMPRESS_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for k, v in scope["headers"]:
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(send, encoding, self.minimum_size).send)
+
+
+class _Responder:
+    """Per-response state: holds http.response.start until the first body chunk decides."""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+        self.raw = self.out = 0
+
+    async def send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = list(message.get("headers", ()))
+            if message["status"] in (204, 206, 304) or not _compressible(headers):
+                self.passthrough = True
+                await self._send(message)
+            else:
+                message["headers"] = headers
+                self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more and len(body) < self.minimum_size:
+                self.passthrough = True
+                _vary(start["headers"])
+                await self._send(start)
+                await self._send(message)
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            _rewrite_headers(start["headers"], self.encoding)
+            await self._send(start)
+
+        self.raw += len(body)
+        data = self.encoder.chunk(body) if more else self.encoder.finish(body)
+        self.out += len(data)
+        if not more:
+            _bytes.inc(self.raw, encoding=self.encoding, stage="in")
+            _bytes.inc(self.out, encoding=self.encoding, stage="out")
+        if data or not more:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more})
+
+
+def _vary(headers: list) -> None:
+    for i, (k, v) in enumerate(headers):
+        if k == b"vary":
+            if b"accept-encoding" not in v.lower():
+                headers[i] = (k, v + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+def _rewrite_headers(headers: list, encoding: str) -> None:
+    headers[:] = [(k, v) for k, v in headers if k != b"content-length"]
+    for i, (k, v) in enumerate(headers):
+        # the compressed bytes differ, so a strong validator must become weak
+        if k == b"etag" and not v.startswith(b"W/"):
+            headers[i] = (k, b"W/" + v)
+    headers.append((b"content-encoding", encoding.encode("latin-1")))
+    _vary(headers)
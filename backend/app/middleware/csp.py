@@ -1,16 +1,32 @@
 # backend/app/middleware/csp.py
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
 import os
 
-# Set CSP and HSTS only when enabled
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response: Response = await call_next(request)
-        if os.getenv("ENABLE_CSP","false").lower() in ("1","true","yes","on"):
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.middleware.asgi import header_block, with_default_headers
+
+CSP = "default-src 'self'; img-src 'self' data: blob:; media-src 'self' data: blob:; script-src 'self'; style-src 'self' 'unsafe-inline'; connect-src 'self'"
+HSTS = "max-age=63072000; includeSubDomains; preload"
+
+
+def _on(name: str) -> bool:
+    return os.getenv(name, "false").lower() in ("1", "true", "yes", "on")
+
+
+# Set CSP and HSTS only when enabled (read once at startup)
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        pairs = []
+        if _on("ENABLE_CSP"):
             # Minimal conservative CSP; adjust as needed
-            response.headers["Content-Security-Policy"] = "default-src 'self'; img-src 'self' data: blob:; media-src 'self' data: blob:; script-src 'self'; style-src 'self' 'unsafe-inline'; connect-src 'self'"
-        if os.getenv("ENABLE_HSTS","false").lower() in ("1","true","yes","on"):
-            response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains; preload"
-        return response
+            pairs.append(("Content-Security-Policy", CSP))
+        if _on("ENABLE_HSTS"):
+            pairs.append(("Strict-Transport-Security", HSTS))
+        self.block = header_block(pairs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.block:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, with_default_headers(send, self.block))
@@ -1,23 +1,55 @@
 from __future__ import annotations
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-import json, time, uuid, logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import time, uuid, logging
+
+from app import logs, sql_stats
 
 logger = logging.getLogger("app.log_json")
 
-class LogJSONMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+class LogJSONMiddleware:
+    """
+    Access log line per request; raw ASGI so streaming bodies pass straight through.
+    Fields go out as a dict; app.logs encodes them on its writer thread.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         start = time.time()
-        req_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        req_id = None
+        for k, v in scope["headers"]:
+            if k == b"x-request-id":
+                req_id = v.decode("latin-1")
+                break
+        req_id = req_id or str(uuid.uuid4())
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = sql_stats.begin(scope["path"])
         try:
-            response: Response = await call_next(request)
-            logger.info(json.dumps({
-                "type": "access","request_id": req_id,"method": request.method,"path": request.url.path,
-                "status": response.status_code,"duration_ms": int((time.time()-start)*1000),
-                "client_ip": request.client.host if request.client else None,
-            }))
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as ex:  # pragma: no cover
-            logger.error(json.dumps({"type": "error","request_id": req_id,"path": request.url.path,"message": str(ex)}))
+            logger.error("unhandled error", exc_info=True, extra={"fields": {
+                "type": "error", "request_id": req_id, "path": scope["path"], "error": str(ex)}})
             raise
+        finally:
+            sql = sql_stats.end(token)
+        if not logs.sample_access(scope["path"], status):
+            return
+        client = scope.get("client")
+        logger.info("access", extra={"fields": {
+            "type": "access", "request_id": req_id, "method": scope["method"], "path": scope["path"],
+            "route": getattr(scope.get("route"), "path", None), "status": status,
+            "duration_ms": int((time.time() - start) * 1000),
+            "client_ip": client[0] if client else None,
+            **sql.as_log(),
+        }})
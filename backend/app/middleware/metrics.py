@@ -0,0 +1,71 @@
+# backend/app/middleware/metrics.py
+"""
+Request metrics for /metrics.
+
+Latency is labelled by route template (/referrals/{referral_id}, not the
+concrete path), so label cardinality stays bounded. The router records the
+matched route in scope["route"]; unmatched paths share "<unmatched>".
+"""
+from __future__ import annotations
+
+import time
+
+from anyio import to_thread
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import telemetry
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_duration = telemetry.histogram("http_request_duration_seconds", "Request latency by route template",
+                                ["method", "route", "status"], buckets=REQUEST_BUCKETS)
+_in_flight = telemetry.gauge("http_requests_in_flight", "Requests currently being handled")
+_tp_busy = telemetry.gauge("http_threadpool_busy", "Threadpool workers running sync endpoints/dependencies")
+_tp_size = telemetry.gauge("http_threadpool_size", "Threadpool capacity (anyio default limiter)")
+_tp_saturated = telemetry.counter("http_threadpool_saturated",
+                                  "Requests that arrived while every threadpool worker was busy")
+
+
+def _limiter():
+    try:
+        return to_thread.current_default_thread_limiter()
+    except Exception:
+        return None  # not on an event loop thread
+
+
+@telemetry.collector
+def _threadpool_stats() -> None:
+    lim = _limiter()
+    if lim is not None:
+        _tp_busy.set(lim.borrowed_tokens)
+        _tp_size.set(lim.total_tokens)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        lim = _limiter()
+        if lim is not None and lim.borrowed_tokens >= lim.total_tokens:
+            _tp_saturated.inc()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        _in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            _duration.observe(time.perf_counter() - start,
+                              method=scope["method"], route=route, status=status)
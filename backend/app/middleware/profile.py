@@ -0,0 +1,24 @@
+# backend/app/middleware/profile.py
+from __future__ import annotations
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import profiling
+
+
+class ProfileMiddleware:
+    """Counts finished requests toward a running profiling session (see app.profiling)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if profiling.active is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        session = profiling.active
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if not scope["path"].startswith("/admin/profile"):
+                session.request_done()
@@ -1,21 +1,21 @@
+import math
 import os
-import time
 from typing import Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
+import jwt
 from starlette.requests import Request
 from starlette.responses import JSONResponse
-from starlette.types import ASGIApp
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-try:
-    import redis.asyncio as redis  # redis>=4.2
-except Exception:
-    redis = None
+from app.config import settings
+from app.deps.session import _pick_token
+from app.middleware.asgi import header_block, with_default_headers
+from app.security import ratelimit
 
 # ---------- ENV / Config ----------
 RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW_SECS", "60"))
 PREFIX = os.getenv("RATE_LIMIT_PREFIX", "rl:")
-AUTH_PER_MIN = int(os.getenv("RATE_LIMIT_AUTH_PER_MIN", "10"))
 WRITE_PER_MIN = int(os.getenv("RATE_LIMIT_WRITE_PER_MIN", "60"))
 READ_PER_MIN = int(os.getenv("RATE_LIMIT_READ_PER_MIN", "120"))
 REDIS_URL = os.getenv("REDIS_URL", "")
@@ -33,84 +33,120 @@ DEFAULT_RELAXED = {"/users/mfa/setup", "/users/mfa/verify"}
 
 BYPASS_ROUTES = _env_bypass.union(DEFAULT_BYPASS)
 RELAXED_ROUTES = _env_relaxed.union(DEFAULT_RELAXED)
-RELAXED_WRITE_PER_MIN = int(os.environ.get("RATE_LIMIT_RELAXED_WRITE_PER_MIN", "300"))
+
+# Token budgets per window. Every request is charged its route's cost against
+# the caller's own budget (per JWT sub, or per IP when anonymous) and against
+# a larger shared per-IP budget, so one NAT'd office doesn't share one user's
+# allowance but a single IP still can't flood the API.
+USER_BUDGET = int(os.getenv("RATE_LIMIT_USER_BUDGET", str(READ_PER_MIN)))
+IP_BUDGET = int(os.getenv("RATE_LIMIT_IP_BUDGET", str(READ_PER_MIN * 10)))
 
 # ---------- Helpers ----------
-def classify(request: Request) -> int:
-    """Return the normal per-minute limit for this request."""
-    path = (request.url.path or "").lower()
-    method = (request.method or "").upper()
-    if path == "/auth/token":
-        return AUTH_PER_MIN
-    if method in ("POST", "PATCH", "DELETE"):
-        return WRITE_PER_MIN
-    return READ_PER_MIN
-
-
-class InProcBucket:
-    """Very simple per-process fallback counter."""
-    def __init__(self):
-        self.store = {}
-
-    def incr(self, key: str, ttl: int) -> int:
-        now = int(time.time())
-        bucket = self.store.get(key)
-        if not bucket or bucket["exp"] <= now:
-            bucket = {"count": 0, "exp": now + ttl}
-        bucket["count"] += 1
-        self.store[key] = bucket
-        return bucket["count"]
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
+def classify(scope: Scope) -> int:
+    """Default token cost for routes that don't declare one (reads 1, writes more)."""
+    method = (scope.get("method") or "").upper()
+    if method in ("POST", "PUT", "PATCH", "DELETE"):
+        return max(1, math.ceil(READ_PER_MIN / max(WRITE_PER_MIN, 1)))
+    return 1
+
+
+def match_route(scope):
+    """The matched route (for its endpoint's declared cost), or None for unmatched paths."""
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    partial = None
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+        if match == Match.PARTIAL and partial is None:
+            partial = route  # path matched, method did not
+    return partial
+
+
+def request_cost(scope: Scope, route) -> int:
+    path = scope.get("path") or ""
+    if path in RELAXED_ROUTES or path.startswith("/users/mfa/"):
+        return 1
+    declared = getattr(getattr(route, "endpoint", None), "rate_limit_cost", None)
+    return declared if declared is not None else classify(scope)
+
+
+def caller_sub(scope: Scope) -> Optional[str]:
+    """JWT sub of the caller if a validly signed token is presented (no DB hit)."""
+    try:
+        tok = _pick_token(Request(scope))
+        if not tok:
+            return None
+        return jwt.decode(tok, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]).get("sub")
+    except Exception:
+        return None
+
+
+class RateLimitMiddleware:
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.r: Optional["redis.Redis"] = None
-        self.inproc = InProcBucket()
-
-    async def _redis_incr(self, key: str, ttl: int) -> int:
-        # Lazy init Redis if configured
-        if REDIS_URL and redis:
-            if not self.r:
-                ssl = REDIS_URL.startswith("rediss://")
-                # Let system trust store handle certs; tighten later if you provide a CA
-                self.r = redis.from_url(REDIS_URL, ssl=ssl)
+        self.app = app
+        self.local = ratelimit.MemoryLimiter()
+        self.shared = ratelimit.from_env(REDIS_URL, PREFIX)
+
+    async def _hit(self, key: str, limit: int, cost: int) -> ratelimit.Decision:
+        if self.shared is not None:
             try:
-                pipe = self.r.pipeline()
-                pipe.incr(key, 1)
-                pipe.expire(key, ttl)
-                count, _ = await pipe.execute()
-                return int(count)
+                return await self.shared.hit(key, limit, RATE_LIMIT_WINDOW, cost)
             except Exception:
                 # fall through to in-proc on any Redis trouble
                 pass
-        return self.inproc.incr(key, ttl)
-
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        ip = request.client.host if request.client else "unknown"
-
-        # Bypass some routes entirely (e.g., QR image)
-        if path in BYPASS_ROUTES or path.startswith("/users/mfa/qrcode"):
-            return await call_next(request)
-
-        # Relax MFA setup / verify; also allow env-specified relaxed routes
-        if path in RELAXED_ROUTES or path.startswith("/users/mfa/"):
-            limit = RELAXED_WRITE_PER_MIN
-            bucket_tag = "relaxed"
-        else:
-            limit = classify(request)
-            bucket_tag = "norm"
-
-        ttl = RATE_LIMIT_WINDOW
-        window_bucket = int(time.time() // ttl)
-        key = f"{PREFIX}{bucket_tag}:{ip}:{path}:{window_bucket}"
-
-        count = await self._redis_incr(key, ttl)
-        if count > limit:
-            return JSONResponse(
+        return self.local.hit(key, limit, RATE_LIMIT_WINDOW, cost)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+
+        # Bypass some routes entirely (e.g., QR image), and CORS preflights,
+        # which a browser sends on its own before the real request
+        if (path in BYPASS_ROUTES or path.startswith("/users/mfa/qrcode")
+                or scope.get("method") == "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        cost = request_cost(scope, match_route(scope))
+        sub = caller_sub(scope)
+        own_key = f"u:{sub}" if sub else f"anon:{ip}"
+
+        # shared IP budget first: a flood from one address is refused before
+        # it can drain individual users' budgets
+        ip_key = f"ip:{ip}"
+        d = await self._hit(ip_key, IP_BUDGET, cost)
+        if d.allowed:
+            own = await self._hit(own_key, USER_BUDGET, cost)
+            if not own.allowed:
+                # refused on the caller's own budget: give the shared IP budget back,
+                # so one throttled user behind a NAT doesn't use it up for everyone
+                await self._hit(ip_key, IP_BUDGET, -cost)
+                d = own
+            elif own.remaining < d.remaining:
+                d = own
+
+        if not d.allowed:
+            response = JSONResponse(
                 {"code": "rate_limited", "message": "Too many requests"},
                 status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(d.retry_after))), **_headers(d)},
             )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, with_default_headers(send, header_block(_headers(d).items())))
+
 
-        return await call_next(request)
+def _headers(d: ratelimit.Decision) -> dict:
+    # draft-ietf-httpapi-ratelimit-headers, values for the tightest budget
+    return {
+        "RateLimit-Limit": str(d.limit),
+        "RateLimit-Remaining": str(max(0, d.remaining)),
+        "RateLimit-Reset": str(max(1, math.ceil(d.reset))),
+    }
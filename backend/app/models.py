@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import uuid as _uuid
-from datetime import datetime
+from datetime import date, datetime
 
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
@@ -47,6 +47,11 @@ class Referral(Base):
     environment: Mapped[dict | None] = mapped_column(postgresql.JSONB, nullable=True)
     reason: Mapped[str | None] = mapped_column(sa.Text, nullable=True)
 
+    estimated_commission: Mapped[float] = mapped_column(sa.Numeric(12, 2), nullable=False, server_default=sa.text("0"))
+    commission_paid: Mapped[float] = mapped_column(sa.Numeric(12, 2), nullable=False, server_default=sa.text("0"))
+    # day commission_paid is booked on in referral_daily_totals; stamped by a trigger
+    commission_paid_on: Mapped[date] = mapped_column(sa.Date, nullable=False, server_default=sa.text("CURRENT_DATE"))
+
     created_at: Mapped[datetime] = mapped_column(sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False)
 
 
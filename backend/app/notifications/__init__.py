@@ -1,2 +1,2 @@
 # backend/app/notifications/__init__.py
-# Notification layer: template rendering + send via existing Graph mail helper.
+# Notification layer: template rendering + transactional outbox; the dispatcher sends via Graph.
@@ -0,0 +1,130 @@
+# backend/app/notifications/dispatcher.py
+"""
+Outbox dispatcher: sends queued email through Graph, outside any request.
+
+    python -m app.notifications.dispatcher          # run forever
+    python -m app.notifications.dispatcher --once   # drain what is due, then exit
+
+Safe to run more than one: rows are leased with FOR UPDATE SKIP LOCKED.
+Reports email_outbox_* metrics (queue depth, oldest pending age, outcomes);
+set OUTBOX_METRICS_PORT to expose them for Prometheus.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from app import logs, telemetry
+from app.notifications import outbox
+
+try:
+    from app.graph_mail import send_mail as graph_send_mail
+except Exception as e:  # graceful fallback placeholder
+    def graph_send_mail(to_list, subject, body_text, attachments=None):
+        raise RuntimeError("Graph mail helper not found; cannot send mail") from e
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_POLL_SECS = float(os.getenv("OUTBOX_POLL_SECS", "2"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "20"))
+# standalone dispatcher: serve Prometheus metrics on this port (0 = off)
+OUTBOX_METRICS_PORT = int(os.getenv("OUTBOX_METRICS_PORT", "0"))
+
+_depth = telemetry.gauge("email_outbox_depth", "Outbox rows by status", ["status"])
+_oldest = telemetry.gauge("email_outbox_oldest_pending_age_seconds", "Age of the oldest unsent email")
+_outcomes = telemetry.counter("email_outbox_deliveries", "Send attempts by outcome", ["kind", "outcome"])
+_send_seconds = telemetry.histogram("email_outbox_send_seconds", "Graph send latency", ["kind"])
+
+
+def dispatch_once(db, send: Callable = None, batch: int = OUTBOX_BATCH) -> int:
+    """Claim and send one batch of due email. Returns rows processed."""
+    send = send or graph_send_mail
+    rows = outbox.claim(db, batch)
+    for row in rows:
+        t0 = time.perf_counter()
+        try:
+            attachments = outbox.load_attachments(db, row["attachments"])
+            send(list(row["recipients"]), row["subject"], row["body"], attachments=attachments or None)
+        except Exception as ex:
+            db.rollback()
+            status = outbox.mark_failed(db, row["id"], row["attempts"], str(ex))
+            _outcomes.inc(kind=row["kind"], outcome="dead" if status == "dead" else "retry")
+            logger.warning("%s #%s attempt %s failed (%s): %s", row["kind"], row["id"], row["attempts"], status, ex)
+            continue
+        finally:
+            _send_seconds.observe(time.perf_counter() - t0, kind=row["kind"])
+        outbox.mark_sent(db, row["id"])
+        _outcomes.inc(kind=row["kind"], outcome="sent")
+    return len(rows)
+
+
+def report(db) -> dict:
+    s = outbox.stats(db)
+    _depth.set(s["pending"], status="pending")
+    _depth.set(s["dead"], status="dead")
+    _oldest.set(s["oldest_age"])
+    return s
+
+
+def run(stop: Optional[threading.Event] = None, once: bool = False) -> None:
+    from app.db import SessionLocal
+
+    stop = stop or threading.Event()
+    last_purge = 0.0
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            while dispatch_once(db) and not stop.is_set():
+                pass  # keep draining while there is a backlog
+            s = report(db)
+            if time.monotonic() - last_purge > 3600:
+                outbox.purge_sent(db)
+                last_purge = time.monotonic()
+            if s["dead"] or s["oldest_age"] > 300:
+                logger.warning("outbox pending=%d dead=%d oldest=%.0fs", s["pending"], s["dead"], s["oldest_age"])
+        except Exception as ex:
+            db.rollback()
+            logger.exception("dispatcher loop error: %s", ex)
+        finally:
+            db.close()
+        if once:
+            return
+        stop.wait(OUTBOX_POLL_SECS)
+
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def start_in_process() -> None:
+    """Run the dispatcher as a daemon thread (single-process/dev deployments)."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=run, args=(_stop,), name="outbox-dispatcher", daemon=True)
+    _thread.start()
+
+
+def stop_in_process() -> None:
+    _stop.set()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Send queued email from email_outbox")
+    ap.add_argument("--once", action="store_true", help="drain due email once and exit")
+    args = ap.parse_args()
+    logs.configure()
+    logger.info("dispatcher started (poll %ss, batch %d)", OUTBOX_POLL_SECS, OUTBOX_BATCH)
+    if OUTBOX_METRICS_PORT:
+        telemetry.serve(OUTBOX_METRICS_PORT)
+        logger.info("metrics on :%d/metrics", OUTBOX_METRICS_PORT)
+    run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
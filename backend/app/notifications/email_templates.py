@@ -20,16 +20,36 @@ def referral_submitted(ref_no: str, company: str, agent_email: str, agent_name:
     lines.append("Visit: https://partner.covenanttechnology.net")
     return subject, "\n".join(lines)
 
-def referral_updated(ref_no: str, company: str, updates: dict, actor_email: str, actor_name: str) -> tuple[str,str]:
+def referral_updated(ref_no: str, company: str, updates: dict, actor_email: str, actor_name: str,
+                     changes: Optional[Sequence[dict]]=None) -> tuple[str,str]:
+    """
+    `changes` turns this into a digest: every coalesced edit in order, each
+    {"at", "actor_email", "actor_name", and "updates" or "note"}; `updates`
+    is then the resulting field values.
+    """
     subject = f"Referral Updated • {ref_no} • {company}"
+    if changes and len(changes) > 1:
+        subject += f" • {len(changes)} changes"
     lines = [
         f"Referral: {ref_no}",
         f"Company:  {company}",
         f"Actor:    {actor_name} <{actor_email}>",
-        "Updates:",
     ]
+    if updates:
+        lines.append("Updates:")
     for k,v in updates.items():
         lines.append(f"  - {k}: {v}")
+    if changes:
+        lines += ["", "Changes:"]
+        for c in changes:
+            who = f"{c.get('actor_name') or c.get('actor_email')}"
+            at = str(c.get("at") or "")[:16].replace("T", " ")
+            if c.get("note"):
+                lines.append(f"  [{at}] {who} added a note:")
+                lines += [f"      {ln}" for ln in str(c["note"]).splitlines()]
+            else:
+                fields = ", ".join(f"{k}: {v}" for k, v in (c.get("updates") or {}).items())
+                lines.append(f"  [{at}] {who}: {fields}")
     lines += ["", "Visit: https://partner.covenanttechnology.net"]
     return subject, "\n".join(lines)
 
@@ -1,16 +1,16 @@
 # backend/app/notifications/notifier.py
 
+from datetime import datetime, timezone
 from typing import Iterable, Optional, Sequence
 import os
+from sqlalchemy.orm import Session
 from app.notifications import email_templates as T
+from app.notifications.outbox import enqueue, enqueue_digest
 
-# Reuse existing Graph mail helper
-# Expected existing helper: app/graph_mail.py with send_mail(to_list, subject, body_text)
-try:
-    from app.graph_mail import send_mail as graph_send_mail
-except Exception as e:  # graceful fallback placeholder
-    def graph_send_mail(to_list: Sequence[str], subject: str, body_text: str):
-        raise RuntimeError("Graph mail helper not found; cannot send mail") from e
+# Every notify_* renders the message and queues it on the caller's session;
+# it is committed with the business change and sent later by
+# app.notifications.dispatcher. Attachments are references, e.g.
+# {"source": "feedback_files", "id": "<uuid>"}.
 
 # Configuration
 DL_NOTIFICATIONS = os.environ.get("NOTIFY_DL", "A-ZReferrals@covenanttechnology.net")
@@ -23,69 +23,89 @@ def _tolist(x: Optional[Sequence[str] | str]) -> list[str]:
         return [x]
     return list(x)
 
-def notify_referral_submitted(to: Optional[Sequence[str] | str],
+def notify_referral_submitted(db: Session, to: Optional[Sequence[str] | str],
                               ref_no: str, company: str, agent_email: str, agent_name: str,
-                              extra: Optional[dict]=None, file_attachments: Optional[Sequence[dict]]=None):
+                              extra: Optional[dict]=None, attachment_refs: Optional[Sequence[dict]]=None):
     recipients = _tolist(to) or [DL_NOTIFICATIONS]
     subject, body = T.referral_submitted(ref_no, company, agent_email, agent_name, extra=extra)
-    graph_send_mail(recipients, subject, body, attachments=file_attachments)
-
-def notify_referral_updated(to: Optional[Sequence[str] | str],
+    enqueue(db, "referral_submitted", recipients, subject, body, attachment_refs)
+
+def _referral_digest(ref_no: str, company: str):
+    def render(entries: list) -> tuple[str, str]:
+        last = entries[-1]
+        if len(entries) == 1 and last.get("note"):
+            return T.referral_note(ref_no, company, last["note"], last["actor_email"], last["actor_name"])
+        merged: dict = {}
+        for e in entries:
+            merged.update(e.get("updates") or {})
+        return T.referral_updated(ref_no, company, merged, last["actor_email"], last["actor_name"],
+                                  changes=entries if len(entries) > 1 else None)
+    return render
+
+def _enqueue_referral_change(db: Session, recipients: list[str], ref_no: str, company: str, entry: dict):
+    # one pending digest per referral and recipient set; edits and notes share it
+    entry["at"] = datetime.now(timezone.utc).isoformat()
+    key = f"referral:{ref_no}:{','.join(sorted(r.lower() for r in recipients))}"
+    enqueue_digest(db, "referral_updated", key, recipients, entry, _referral_digest(ref_no, company))
+
+def notify_referral_updated(db: Session, to: Optional[Sequence[str] | str],
                             ref_no: str, company: str, updates: dict, actor_email: str, actor_name: str):
+    """Queue a referral change; changes within OUTBOX_DIGEST_WINDOW_SECS go out as one digest."""
     recipients = _tolist(to) or [DL_NOTIFICATIONS]
-    subject, body = T.referral_updated(ref_no, company, updates, actor_email, actor_name)
-    graph_send_mail(recipients, subject, body)
+    _enqueue_referral_change(db, recipients, ref_no, company,
+                             {"actor_email": actor_email, "actor_name": actor_name, "updates": updates})
 
-def notify_referral_note(note_to: Optional[Sequence[str] | str],
+def notify_referral_note(db: Session, note_to: Optional[Sequence[str] | str],
                          ref_no: str, company: str, note: str, agent_email: str, agent_name: str):
     recipients = _tolist(note_to) or [DL_NOTIFICATIONS]
-    subject, body = T.referral_note(ref_no, company, note, agent_email, agent_name)
-    graph_send_mail(recipients, subject, body)
+    _enqueue_referral_change(db, recipients, ref_no, company,
+                             {"actor_email": agent_email, "actor_name": agent_name, "note": note})
 
-def notify_admin_outbound(to: Sequence[str] | str, subject: str, body_text: str, footer: Optional[str]=None):
+def notify_admin_outbound(db: Session, to: Sequence[str] | str, subject: str, body_text: str, footer: Optional[str]=None):
     recipients = _tolist(to)
     if not recipients:
         raise ValueError("admin outbound requires recipients")
     subj, body = T.admin_outbound(subject, body_text, footer=footer)
-    graph_send_mail(recipients, subj, body)
+    enqueue(db, "admin_outbound", recipients, subj, body)
 
-def notify_password_reset(to: str, user_name: str, new_password: str):
-    """Send password reset email with new temporary password."""
+def notify_password_reset(db: Session, to: str, user_name: str, new_password: str):
+    """Queue password reset email with new temporary password."""
     subject, body = T.admin_password_reset(to, user_name, new_password)
-    graph_send_mail([to], subject, body)
+    enqueue(db, "password_reset", [to], subject, body)
 
-def notify_mfa_reset(to: str, user_name: str):
-    """Send MFA reset notification email."""
+def notify_mfa_reset(db: Session, to: str, user_name: str):
+    """Queue MFA reset notification email."""
     subject, body = T.admin_mfa_reset(to, user_name)
-    graph_send_mail([to], subject, body)
+    enqueue(db, "mfa_reset", [to], subject, body)
 
-def notify_user_created(to: str, user_name: str, password: str, role: str):
-    """Send welcome email with account credentials to newly created user."""
+def notify_user_created(db: Session, to: str, user_name: str, password: str, role: str):
+    """Queue welcome email with account credentials to newly created user."""
     subject, body = T.user_created(to, user_name, password, role)
-    graph_send_mail([to], subject, body)
+    enqueue(db, "user_created", [to], subject, body)
 
-def notify_support(to: Optional[Sequence[str] | str],
+def notify_support(db: Session, to: Optional[Sequence[str] | str],
                    agent_email: str, agent_name: str, message: str):
     recipients = _tolist(to) or [DL_NOTIFICATIONS]
     subject, body = T.support_contact(agent_email, agent_name, message)
-    graph_send_mail(recipients, subject, body)
+    enqueue(db, "support_contact", recipients, subject, body)
 
 def notify_feedback(
+    db: Session,
     from_email: str,
     from_name: str,
     subject_line: str,
     message_body: str,
     cc: Optional[str] = None,
     attachments: Optional[Sequence[dict]] = None,
-    file_attachments: Optional[Sequence[dict]] = None,
+    attachment_refs: Optional[Sequence[dict]] = None,
     to: Optional[Sequence[str] | str] = None
 ):
     """
-    Send feedback email to designated recipients.
+    Queue feedback email to designated recipients.
 
     Args:
         attachments: Metadata for display in email body
-        file_attachments: Actual file content for email attachments (name, content_type, content)
+        attachment_refs: Files to attach, loaded at send time ({source, id})
     """
     recipients = _tolist(to) or ["feedback@covenanttechnology.net"]
 
@@ -104,4 +124,4 @@ def notify_feedback(
         attachments=attachments
     )
 
-    graph_send_mail(recipients, subject, body, attachments=file_attachments)
+    enqueue(db, "feedback", recipients, subject, body, attachment_refs)
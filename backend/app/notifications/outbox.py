@@ -0,0 +1,221 @@
+# backend/app/notifications/outbox.py
+"""
+Transactional email outbox.
+
+Request handlers never talk to Graph. notifier.notify_* render the message
+and enqueue() it on the caller's session, so the email is committed (or
+rolled back) together with the business change. The dispatcher
+(python -m app.notifications.dispatcher) claims due rows with a lease,
+sends them, and either marks them sent or schedules a retry with
+exponential back-off; after OUTBOX_MAX_ATTEMPTS a row is dead-lettered.
+
+Attachments are stored as references ({"source": "feedback_files", "id": ...})
+and loaded at send time, so file bytes are not copied into the outbox.
+Bodies of sent rows are cleared (they can contain temporary passwords).
+
+Chatty notifications (referral edits) go through enqueue_digest(): changes
+with the same digest key are merged into one pending row for
+OUTBOX_DIGEST_WINDOW_SECS and sent as a single email. claim() releases the
+key, so a change arriving mid-send starts the next digest.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import telemetry
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_SECS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECS", "30"))
+OUTBOX_BACKOFF_MAX_SECS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECS", "3600"))
+OUTBOX_LEASE_SECS = int(os.getenv("OUTBOX_LEASE_SECS", "120"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+
+# attachment reference source -> table holding (id, name, content_type, data bytea)
+_ATTACHMENT_SOURCES = {"feedback_files": "feedback_files", "referral_files": "referral_files"}
+# blobs up to this size are fetched whole; bigger ones are read in chunks while sending
+OUTBOX_INLINE_FETCH_BYTES = int(os.getenv("OUTBOX_INLINE_FETCH_BYTES", str(3 * 1024 * 1024)))
+# how long the first change of a digest waits for more; 0 sends every change on its own
+OUTBOX_DIGEST_WINDOW_SECS = int(os.getenv("OUTBOX_DIGEST_WINDOW_SECS", "300"))
+
+_expired = telemetry.counter("email_outbox_lease_expired", "Rows dead-lettered after their last lease ran out", ["kind"])
+_coalesced = telemetry.counter("email_outbox_coalesced", "Notifications merged into a pending digest", ["kind"])
+
+
+def enqueue(db: Session, kind: str, to: Sequence[str], subject: str, body: str,
+            attachments: Optional[Sequence[dict]] = None) -> int:
+    """Queue one email on the caller's transaction (caller commits). Returns the outbox id."""
+    for a in attachments or ():
+        if a.get("source") not in _ATTACHMENT_SOURCES:
+            raise ValueError(f"unknown attachment source {a.get('source')!r}")
+    return db.execute(
+        text("""INSERT INTO email_outbox (kind, recipients, subject, body, attachments)
+                VALUES (:kind, CAST(:to AS jsonb), :subject, :body, CAST(:att AS jsonb))
+                RETURNING id"""),
+        {"kind": kind, "to": json.dumps(list(to)), "subject": subject, "body": body,
+         "att": json.dumps(list(attachments or []))},
+    ).scalar_one()
+
+
+def enqueue_digest(db: Session, kind: str, key: str, to: Sequence[str], entry: dict,
+                   render: Callable[[list], tuple], window_secs: int = OUTBOX_DIGEST_WINDOW_SECS) -> int:
+    """
+    Add `entry` to the pending digest for `key` (caller commits), creating it
+    due in window_secs if there is none. render(entries) -> (subject, body)
+    is re-run over all entries so far. Returns the outbox id.
+    """
+    if window_secs <= 0:
+        subject, body = render([entry])
+        return enqueue(db, kind, to, subject, body)
+    row = db.execute(
+        text("""INSERT INTO email_outbox (kind, recipients, subject, body, digest_key, digest, next_attempt_at)
+                VALUES (:kind, CAST(:to AS jsonb), '', '', :key, CAST(:entry AS jsonb),
+                        now() + make_interval(secs => :w))
+                ON CONFLICT (digest_key) WHERE digest_key IS NOT NULL
+                DO UPDATE SET digest = email_outbox.digest || EXCLUDED.digest
+                RETURNING id, digest"""),
+        {"kind": kind, "to": json.dumps(list(to)), "key": key,
+         "entry": json.dumps([entry], default=str), "w": window_secs},
+    ).mappings().first()
+    entries = list(row["digest"])
+    if len(entries) > 1:
+        _coalesced.inc(kind=kind)
+    subject, body = render(entries)
+    db.execute(
+        text("UPDATE email_outbox SET subject = :subject, body = :body WHERE id = :id"),
+        {"id": row["id"], "subject": subject, "body": body},
+    )
+    return row["id"]
+
+
+def claim(db: Session, limit: int, lease_secs: int = OUTBOX_LEASE_SECS) -> list:
+    """
+    Lease up to `limit` due rows to this dispatcher and commit. A crashed
+    dispatcher's rows become due again when the lease runs out; a row whose
+    last allowed attempt never reported back (its send crashed or hung the
+    dispatcher) is dead-lettered instead of being leased again.
+    """
+    expired = db.execute(
+        text("""UPDATE email_outbox
+                   SET status = 'dead', last_error = 'lease expired'
+                 WHERE status = 'pending' AND next_attempt_at <= now() AND attempts >= :max
+             RETURNING kind"""),
+        {"max": OUTBOX_MAX_ATTEMPTS},
+    ).mappings().all()
+    for r in expired:
+        _expired.inc(kind=r["kind"])
+    rows = db.execute(
+        text("""UPDATE email_outbox
+                   SET attempts = attempts + 1,
+                       digest_key = NULL,
+                       next_attempt_at = now() + make_interval(secs => :lease)
+                 WHERE id IN (SELECT id FROM email_outbox
+                               WHERE status = 'pending' AND next_attempt_at <= now()
+                                 AND attempts < :max
+                               ORDER BY next_attempt_at
+                               LIMIT :n
+                               FOR UPDATE SKIP LOCKED)
+             RETURNING id, kind, recipients, subject, body, attachments, attempts, created_at"""),
+        {"n": limit, "lease": lease_secs, "max": OUTBOX_MAX_ATTEMPTS},
+    ).mappings().all()
+    db.commit()
+    return rows
+
+
+def _chunk_reader(db: Session, table: str, file_id: str):
+    sql = text(f"SELECT substring(data FROM :o FOR :n) FROM {table} WHERE id = CAST(:id AS uuid)")
+
+    def read(offset: int, length: int) -> bytes:
+        # substring() is 1-based; only this slice leaves the database
+        return db.execute(sql, {"o": offset + 1, "n": length, "id": file_id}).scalar_one()
+    return read
+
+
+def load_attachments(db: Session, refs: Sequence[dict]) -> list:
+    """
+    Resolve attachment references into send_mail's attachment dicts. Small
+    files come back with `content`; large ones with `size` and a
+    `read(offset, length)` that streams slices from the database.
+    """
+    out = []
+    by_source: dict = {}
+    for r in refs or ():
+        by_source.setdefault(r["source"], []).append(str(r["id"]))
+    for source, ids in by_source.items():
+        table = _ATTACHMENT_SOURCES[source]
+        rows = db.execute(
+            text(f"""SELECT id::text AS id, name, content_type, octet_length(data) AS size,
+                            CASE WHEN octet_length(data) <= :inline THEN data END AS data
+                       FROM {table} WHERE id = ANY(CAST(:ids AS uuid[]))"""),
+            {"ids": ids, "inline": OUTBOX_INLINE_FETCH_BYTES},
+        ).mappings().all()
+        found = {r["id"]: r for r in rows}
+        for i in ids:
+            r = found.get(i)
+            if r is None:
+                continue
+            att = {"name": r["name"], "content_type": r["content_type"] or "application/octet-stream",
+                   "size": r["size"]}
+            if r["data"] is not None:
+                att["content"] = r["data"]
+            else:
+                att["read"] = _chunk_reader(db, table, i)
+            out.append(att)
+    return out
+
+
+def mark_sent(db: Session, outbox_id: int) -> None:
+    db.execute(
+        text("""UPDATE email_outbox
+                   SET status = 'sent', sent_at = now(), body = '', last_error = NULL
+                 WHERE id = :id"""),
+        {"id": outbox_id},
+    )
+    db.commit()
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before the next try: exponential with full jitter, capped."""
+    ceiling = min(OUTBOX_BACKOFF_MAX_SECS, OUTBOX_BACKOFF_BASE_SECS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def mark_failed(db: Session, outbox_id: int, attempts: int, error: str) -> str:
+    """Schedule a retry, or dead-letter after OUTBOX_MAX_ATTEMPTS. Returns the new status."""
+    status = "dead" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending"
+    db.execute(
+        text("""UPDATE email_outbox
+                   SET status = :status, last_error = :err, next_attempt_at = :next
+                 WHERE id = :id"""),
+        {"id": outbox_id, "status": status, "err": error[:2000],
+         "next": datetime.now(timezone.utc) + timedelta(seconds=backoff(attempts))},
+    )
+    db.commit()
+    return status
+
+
+def stats(db: Session) -> dict:
+    """Queue depth by status and age of the oldest pending row (seconds)."""
+    row = db.execute(
+        text("""SELECT count(*) FILTER (WHERE status = 'pending') AS pending,
+                       count(*) FILTER (WHERE status = 'dead') AS dead,
+                       COALESCE(EXTRACT(EPOCH FROM now() - min(created_at) FILTER (WHERE status = 'pending')), 0) AS oldest_age
+                  FROM email_outbox
+                 WHERE status <> 'sent'"""),
+    ).mappings().first()
+    return {"pending": int(row["pending"]), "dead": int(row["dead"]), "oldest_age": float(row["oldest_age"])}
+
+
+def purge_sent(db: Session, retention_days: int = OUTBOX_RETENTION_DAYS) -> int:
+    n = db.execute(
+        text("DELETE FROM email_outbox WHERE status = 'sent' AND sent_at < now() - make_interval(days => :d)"),
+        {"d": retention_days},
+    ).rowcount
+    db.commit()
+    return n
@@ -0,0 +1,201 @@
+# backend/app/profiling.py
+"""
+On-demand sampling profiler.
+
+An admin arms a session (POST /admin/profile) for the next N requests and/or
+a time window. While it runs, a daemon thread snapshots every thread's stack
+with sys._current_frames() every PROFILE_INTERVAL_MS and counts identical
+stacks. When the session ends, it writes two files to PROFILE_DIR:
+
+  * <id>.folded - collapsed stacks ("thread;outer;...;inner count"), for
+    flamegraph.pl / speedscope / inferno,
+  * <id>.speedscope.json - open directly in https://www.speedscope.app.
+
+While no session is active nothing runs. ProfileMiddleware only reads one
+module attribute per request. Each pod profiles only itself.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/azor-profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECS = float(os.getenv("PROFILE_MAX_SECS", "300"))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "128"))
+
+# leaf frames of threads parked waiting for work: not worth a sample
+_IDLE = {("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+         ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker")}
+_NAME = re.compile(r"^[\w.-]+$")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Session:
+    def __init__(self, requests: Optional[int], seconds: Optional[float], interval_ms: float):
+        self.id = datetime.now(timezone.utc).strftime("profile-%Y%m%dT%H%M%S-%fZ")
+        self.requests_left = requests
+        self.deadline = time.monotonic() + min(seconds or PROFILE_MAX_SECS, PROFILE_MAX_SECS)
+        self.interval = max(interval_ms, 1.0) / 1000.0
+        self.started = time.time()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.files: list = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    # ---- sampling ----
+
+    def _sample(self, own_ident: int) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(me)
+            if time.monotonic() >= self.deadline:
+                break
+        _finish(self)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def request_done(self) -> None:
+        if self.requests_left is not None:
+            self.requests_left -= 1
+            if self.requests_left <= 0:
+                self.stop()
+
+    # ---- output ----
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(s)} {n}\n" for s, n in self.stacks.most_common())
+
+    def speedscope(self) -> dict:
+        frames: list = []
+        index: dict = {}
+        samples, weights = [], []
+        for stack, n in self.stacks.most_common():
+            ids = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(n * self.interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": self.id, "unit": "milliseconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights,
+            }],
+            "exporter": "azor app.profiling",
+        }
+
+    def write(self, directory: Optional[str] = None) -> list:
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        folded = os.path.join(directory, f"{self.id}.folded")
+        scope = os.path.join(directory, f"{self.id}.speedscope.json")
+        with open(folded, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        with open(scope, "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(), f)
+        self.files = [os.path.basename(folded), os.path.basename(scope)]
+        return self.files
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "running": not self._stop.is_set() and self._thread.is_alive(),
+            "samples": self.samples,
+            "requests_left": self.requests_left,
+            "seconds_left": max(0.0, round(self.deadline - time.monotonic(), 1)),
+            "files": self.files,
+        }
+
+
+_lock = threading.Lock()
+active: Optional[Session] = None
+last: Optional[Session] = None
+
+
+def _finish(session: Session) -> None:
+    global active, last
+    try:
+        session.write()
+        logger.info("profile %s: %d samples -> %s", session.id, session.samples, PROFILE_DIR)
+    except Exception as ex:
+        logger.error("profile %s: could not write output: %s", session.id, ex)
+    with _lock:
+        if active is session:
+            active = None
+        last = session
+
+
+def start(requests: Optional[int] = None, seconds: Optional[float] = None,
+          interval_ms: float = PROFILE_INTERVAL_MS) -> Session:
+    """Arm a session; raises RuntimeError if one is already running."""
+    global active
+    with _lock:
+        if active is not None:
+            raise RuntimeError("a profiling session is already running")
+        active = Session(requests, seconds, interval_ms)
+        active.start()
+        return active
+
+
+def stop() -> Optional[Session]:
+    """End the running session now; returns it once its output is written."""
+    s = active
+    if s is not None:
+        s.stop()
+        s._thread.join(timeout=10)
+    return s
+
+
+def output_path(name: str) -> Optional[str]:
+    """Path of a finished output file in PROFILE_DIR, or None (no traversal)."""
+    if not _NAME.match(name) or not (name.endswith(".folded") or name.endswith(".speedscope.json")):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def outputs() -> list:
+    try:
+        return sorted((n for n in os.listdir(PROFILE_DIR) if output_path(n)), reverse=True)
+    except FileNotFoundError:
+        return []
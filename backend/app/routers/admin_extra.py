@@ -3,11 +3,7 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.db import get_session
-
-try:
-    from passlib.hash import bcrypt
-except Exception:
-    bcrypt = None
+from app.security.passwords import hash_password
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -19,10 +15,8 @@ class ResetPasswordPayload(BaseModel):
 def admin_reset_password(user_id: str, payload: ResetPasswordPayload, db: Session = Depends(get_session)):
     if not payload.new_password or len(payload.new_password) < 8:
         raise HTTPException(status_code=400, detail="new_password too short")
-    if bcrypt is None:
-        raise HTTPException(status_code=500, detail="bcrypt not available on server")
 
-    hashed = bcrypt.hash(payload.new_password)
+    hashed = hash_password(payload.new_password)
     res = db.execute(
         text("UPDATE users SET password_hash = :hp WHERE id = :id"),
         {"hp": hashed, "id": user_id},
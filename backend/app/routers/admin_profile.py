@@ -0,0 +1,53 @@
+# backend/app/routers/admin_profile.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+from app import profiling
+from app.dependencies import require_admin
+
+router = APIRouter(prefix="/admin/profile", tags=["admin-profile"])
+
+
+class ProfileStart(BaseModel):
+    requests: Optional[int] = Field(None, ge=1, le=100000)
+    seconds: Optional[float] = Field(None, gt=0)
+    interval_ms: float = Field(profiling.PROFILE_INTERVAL_MS, ge=1, le=1000)
+
+
+@router.post("")
+def start_profile(payload: ProfileStart, admin=Depends(require_admin)):
+    """
+    Profile this pod for the next `requests` requests and/or `seconds`
+    (capped at PROFILE_MAX_SECS; with neither set, the cap applies).
+    """
+    try:
+        session = profiling.start(payload.requests, payload.seconds, payload.interval_ms)
+    except RuntimeError as ex:
+        raise HTTPException(status_code=409, detail=str(ex))
+    return session.status()
+
+
+@router.get("")
+def profile_status(admin=Depends(require_admin)):
+    session = profiling.active or profiling.last
+    return {"session": session.status() if session else None, "files": profiling.outputs()}
+
+
+@router.delete("")
+def stop_profile(admin=Depends(require_admin)):
+    session = profiling.stop()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session running")
+    return session.status()
+
+
+@router.get("/{name}")
+def download_profile(name: str, admin=Depends(require_admin)):
+    path = profiling.output_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media = "application/json" if name.endswith(".json") else "text/plain"
+    return FileResponse(path, media_type=media, filename=name)
@@ -1,26 +1,38 @@
 
-from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional, List, Dict, Any, Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import json
 
 from app.dependencies import get_db, require_admin
+from app.notifications.notifier import notify_referral_updated
+from app.schemas import ReferralPage
+from app.serialization import Serializer
+from app.services import collection_versions, events, referral_fields, referral_stats
 
 router = APIRouter(prefix="/admin/referrals", tags=["admin-referrals"])
 
-@router.get("")
+REFERRAL_PAGE = Serializer(ReferralPage)
+
+@router.get("", response_model=ReferralPage)
 def admin_list_referrals(
+    request: Request,
     admin = Depends(require_admin),
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id is always included)"),
+    view: Literal["full", "summary"] = Query("full", description="summary: id, ref_no, company, status, created_at"),
 ):
+    cols = referral_fields.select_list(referral_fields.columns(fields, view))
+    tag = collection_versions.tag_for(db, request, ["referrals"], admin[0])
+    if collection_versions.matches(request, tag):
+        return collection_versions.not_modified(request, tag)
     rows = db.execute(
-        text("""
-            SELECT id, ref_no, company, status, created_at, contact_name, contact_email,
-                   contact_phone, notes, agent_id, opportunity_types, locations, environment, reason
+        text(f"""
+            SELECT {cols}
               FROM referrals
              ORDER BY created_at DESC
              LIMIT :lim OFFSET :off
@@ -28,7 +40,7 @@ def admin_list_referrals(
         {"lim": limit, "off": offset},
     ).mappings().all()
     next_token = None if len(rows) < limit else str(offset + limit)
-    return {"items": rows, "next": next_token}
+    return collection_versions.tagged(REFERRAL_PAGE.response({"items": rows, "next": next_token}), tag)
 
 class AdminReferralUpdate(BaseModel):
     company: Optional[str] = None
@@ -42,6 +54,8 @@ class AdminReferralUpdate(BaseModel):
     environment: Optional[Dict[str, Any]] = None
     reason: Optional[str] = None
     agent_id: Optional[str] = None
+    estimated_commission: Optional[float] = None
+    commission_paid: Optional[float] = None
 
 @router.patch("/{referral_id}")
 def admin_update_referral(referral_id: str, payload: AdminReferralUpdate, admin=Depends(require_admin), db: Session = Depends(get_db)):
@@ -70,10 +84,19 @@ def admin_update_referral(referral_id: str, payload: AdminReferralUpdate, admin=
     add("environment", payload.environment, jsonb=True)
     add("reason", payload.reason)
     add("agent_id", payload.agent_id)
+    add("estimated_commission", payload.estimated_commission)
+    add("commission_paid", payload.commission_paid)
 
     if not sets:
         raise HTTPException(status_code=400, detail="No fields to update")
 
+    previous_agent = None
+    if payload.agent_id is not None:
+        # reassignment: the old owner's event stream must hear about it too
+        previous_agent = db.execute(
+            text("SELECT agent_id FROM referrals WHERE id = :id FOR UPDATE"), {"id": referral_id}
+        ).scalar()
+
     row = db.execute(
         text(f"""
             UPDATE referrals SET {", ".join(sets)}
@@ -86,24 +109,43 @@ def admin_update_referral(referral_id: str, payload: AdminReferralUpdate, admin=
     if not row:
         raise HTTPException(status_code=404, detail="Referral not found")
 
+    # Queued in this transaction; a burst of edits to one referral becomes one digest email
+    actor = db.execute(
+        text("SELECT email, first_name, last_name FROM users WHERE id = :id"), {"id": admin[0]}
+    ).mappings().first() or {}
+    actor_email = actor.get("email") or ""
+    actor_name = " ".join(filter(None, [actor.get("first_name"), actor.get("last_name")])) or actor_email
+    changed = payload.model_dump(exclude_none=True)
+    notify_referral_updated(db, None, row["ref_no"], row["company"] or "", changed, actor_email, actor_name)
+    event = {"type": "referral.updated", "id": row["id"], "ref_no": row["ref_no"],
+             "agent_id": row["agent_id"], "status": row["status"], "changed": sorted(changed)}
+    if previous_agent is not None and str(previous_agent) != str(row["agent_id"]):
+        event["previous_agent_id"] = previous_agent
+    events.publish(db, event)
+
     db.execute(
         text("""INSERT INTO audit_event (actor_user_id, action, entity_type, entity_id)
                 VALUES (:uid, 'admin.referral.updated', 'referral', :entity_id)"""),
         {"uid": admin[0], "entity_id": referral_id},
     )
     db.commit()
+    referral_stats.invalidate(row["agent_id"])
     return row
 
 @router.delete("/{referral_id}", status_code=200)
 def admin_delete_referral(referral_id: str, admin=Depends(require_admin), db: Session = Depends(get_db)):
-    deleted = db.execute(text("DELETE FROM referrals WHERE id = :id"), {"id": referral_id}).rowcount
+    deleted = db.execute(
+        text("DELETE FROM referrals WHERE id = :id RETURNING agent_id"), {"id": referral_id}
+    ).first()
     if not deleted:
         raise HTTPException(status_code=404, detail="Referral not found")
 
+    events.publish(db, {"type": "referral.deleted", "id": referral_id, "agent_id": deleted[0]})
     db.execute(
         text("""INSERT INTO audit_event (actor_user_id, action, entity_type, entity_id)
                 VALUES (:uid, 'admin.referral.deleted', 'referral', :entity_id)"""),
         {"uid": admin[0], "entity_id": referral_id},
     )
     db.commit()
+    referral_stats.invalidate(deleted[0])
     return {"ok": True}
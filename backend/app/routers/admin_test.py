@@ -4,10 +4,12 @@ from fastapi import APIRouter, Depends
 from app.dependencies import require_admin
 from app.graph_mail import send_mail
 from app.config import settings
+from app.security import ratelimit
 
 router = APIRouter(prefix="/admin", tags=["admin-test"])
 
 @router.post("/test-email")
+@ratelimit.cost(5)
 def send_test_email(admin=Depends(require_admin)):
     """Send a test email to verify email configuration"""
     admin_user_id, admin_email = admin
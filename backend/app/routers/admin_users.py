@@ -1,15 +1,23 @@
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import secrets, string, random
 
 from app.dependencies import get_db, require_admin
+from app.notifications.notifier import notify_mfa_reset, notify_password_reset, notify_user_created
+from app.schemas import AdminUserPage
+from app.serialization import Serializer
+from app.services import collection_versions
+from app.security import ratelimit
+from app.security.passwords import hash_password
 
 router = APIRouter(prefix="/admin/users", tags=["admin-users"])
 
+USER_PAGE = Serializer(AdminUserPage)
+
 class AdminUserCreate(BaseModel):
     email: EmailStr
     role: str = "user"
@@ -17,13 +25,17 @@ class AdminUserCreate(BaseModel):
     last_name: Optional[str] = ""
     password: str
 
-@router.get("")
+@router.get("", response_model=AdminUserPage)
 def admin_list_users(
+    request: Request,
     admin = Depends(require_admin),
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0)
 ):
+    tag = collection_versions.tag_for(db, request, ["users"], admin[0])
+    if collection_versions.matches(request, tag):
+        return collection_versions.not_modified(request, tag)
     rows = db.execute(
         text("""
             SELECT u.id, u.email, u.role,
@@ -40,17 +52,16 @@ def admin_list_users(
         {"lim": limit, "off": offset},
     ).mappings().all()
     next_token = None if len(rows) < limit else str(offset + limit)
-    return {"items": rows, "next": next_token}
+    return collection_versions.tagged(USER_PAGE.response({"items": rows, "next": next_token}), tag)
 
 @router.post("", status_code=200)
+@ratelimit.cost(10)
 def admin_create_user(payload: AdminUserCreate, admin=Depends(require_admin), db: Session = Depends(get_db)):
     # Validate password length
     if len(payload.password) < 15:
         raise HTTPException(status_code=422, detail="Password must be at least 15 characters")
 
-    # Hash the password
-    import bcrypt
-    hashed = bcrypt.hashpw(payload.password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+    hashed = hash_password(payload.password)
 
     row = db.execute(
         text("""
@@ -70,14 +81,9 @@ def admin_create_user(payload: AdminUserCreate, admin=Depends(require_admin), db
     if not row:
         raise HTTPException(status_code=409, detail="Email already exists")
 
-    # Send welcome email with credentials
-    try:
-        from app.notifications.notifier import notify_user_created
-        user_name = " ".join(filter(None, [payload.first_name, payload.last_name])) or payload.email
-        notify_user_created(payload.email, user_name, payload.password, payload.role)
-    except Exception as e:
-        print(f"[ADMIN] Failed to send user creation email: {e}")
-        # Don't fail the request if email fails
+    # Welcome email with credentials, queued in this transaction
+    user_name = " ".join(filter(None, [payload.first_name, payload.last_name])) or payload.email
+    notify_user_created(db, payload.email, user_name, payload.password, payload.role)
 
     db.execute(
         text("""INSERT INTO audit_event (actor_user_id, action, entity_type, entity_id)
@@ -145,6 +151,7 @@ def admin_update_user(user_id: str, payload: dict, admin=Depends(require_admin),
     return updated
 
 @router.post("/{user_id}/reset-password", status_code=200)
+@ratelimit.cost(10)
 def admin_reset_password(user_id: str, payload: dict, admin=Depends(require_admin), db: Session = Depends(get_db)):
     mode = payload.get("mode", "generate")
     user = db.execute(
@@ -158,9 +165,7 @@ def admin_reset_password(user_id: str, payload: dict, admin=Depends(require_admi
         password = payload.get("password")
         if not password or len(password) < 15:
             raise HTTPException(status_code=400, detail="Password must be at least 15 characters")
-        # Hash the password
-        import bcrypt
-        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+        hashed = hash_password(password)
         db.execute(
             text("UPDATE users SET password_hash = :hash WHERE id = :id"),
             {"hash": hashed, "id": user_id}
@@ -169,23 +174,16 @@ def admin_reset_password(user_id: str, payload: dict, admin=Depends(require_admi
         # Generate random password
         chars = string.ascii_letters + string.digits + "!@#$%^&*"
         new_password = ''.join(random.choice(chars) for _ in range(20))
-
-        import bcrypt
-        hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+        hashed = hash_password(new_password)
 
         db.execute(
             text("UPDATE users SET password_hash = :hash WHERE id = :id"),
             {"hash": hashed, "id": user_id}
         )
 
-        # Send email with new password
-        try:
-            from app.notifications.notifier import notify_password_reset
-            user_name = " ".join(filter(None, [user.get("first_name"), user.get("last_name")])) or user["email"]
-            notify_password_reset(user["email"], user_name, new_password)
-        except Exception as e:
-            print(f"[ADMIN] Failed to send password reset email: {e}")
-            # Don't fail the request if email fails
+        # Email with new password, queued in this transaction
+        user_name = " ".join(filter(None, [user.get("first_name"), user.get("last_name")])) or user["email"]
+        notify_password_reset(db, user["email"], user_name, new_password)
 
     db.execute(
         text("""INSERT INTO audit_event (actor_user_id, action, entity_type, entity_id)
@@ -212,15 +210,11 @@ def admin_reset_mfa(user_id: str, admin=Depends(require_admin), db: Session = De
         """),
         {"uid": user_id},
     )
+    db.execute(text("DELETE FROM mfa_recovery_code WHERE user_id = :uid"), {"uid": user_id})
 
-    # Send email notification
-    try:
-        from app.notifications.notifier import notify_mfa_reset
-        user_name = " ".join(filter(None, [user.get("first_name"), user.get("last_name")])) or user["email"]
-        notify_mfa_reset(user["email"], user_name)
-    except Exception as e:
-        print(f"[ADMIN] Failed to send MFA reset email: {e}")
-        # Don't fail the request if email fails
+    # Email notification, queued in this transaction
+    user_name = " ".join(filter(None, [user.get("first_name"), user.get("last_name")])) or user["email"]
+    notify_mfa_reset(db, user["email"], user_name)
 
     db.execute(
         text("""INSERT INTO audit_event (actor_user_id, action, entity_type, entity_id)
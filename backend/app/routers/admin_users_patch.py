@@ -41,8 +41,8 @@ def admin_reset_password(user_id: str, payload: dict, authorization: str | None
     u = db.query(models.User).filter(models.User.id == user_id).first()
     if not u:
         raise HTTPException(status_code=404, detail="Not found")
-    from app import utils
-    u.hashed_password = utils.hash_password(new_password)
+    from app.security.passwords import hash_password
+    u.password_hash = hash_password(new_password)
     db.add(u); db.commit()
     return {"ok": True}
 
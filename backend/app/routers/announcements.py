@@ -1,8 +1,10 @@
 # backend/app/routers/announcements.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
 import os, json
 
+from app.services import collection_versions, events
+
 router = APIRouter(prefix="/admin/announcements", tags=["announcements"])
 
 # Lightweight persistence without DB: data/announcements.json
@@ -31,10 +33,15 @@ def _write(doc: AnnouncementDoc) -> None:
         json.dump({"items": doc.items}, f, ensure_ascii=False, indent=2)
 
 @router.get("", response_model=AnnouncementDoc)
-def get_announcements():
+def get_announcements(request: Request, response: Response):
+    tag = collection_versions.file_tag(request, DATA_FILE)
+    if collection_versions.matches(request, tag):
+        return collection_versions.not_modified(request, tag)
+    collection_versions.tagged(response, tag)
     return _read()
 
 @router.put("", response_model=AnnouncementDoc)
 def put_announcements(doc: AnnouncementDoc):
     _write(doc)
+    events.publish_now({"type": "announcements.updated", "count": len(doc.items)})
     return doc
@@ -5,10 +5,14 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.dependencies import get_db, require_auth, require_admin
+from app.schemas import AuditEventPage
+from app.serialization import Serializer
 
 router = APIRouter()
 
-@router.get("/audit/events")
+AUDIT_PAGE = Serializer(AuditEventPage)
+
+@router.get("/audit/events", response_model=AuditEventPage)
 def list_audit_events(
     auth = Depends(require_auth),
     db: Session = Depends(get_db),
@@ -43,4 +47,4 @@ def list_audit_events(
     ).mappings().all()
 
     next_token = None if len(rows) < limit else str(offset + limit)
-    return {"items": rows, "next": next_token}
+    return AUDIT_PAGE.response({"items": rows, "next": next_token})
@@ -6,7 +6,6 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-import bcrypt
 import jwt
 from fastapi import APIRouter, Depends, Form, Header, Request
 from fastapi.responses import JSONResponse
@@ -15,6 +14,10 @@ from sqlalchemy.orm import Session
 
 from app.db import get_session
 from app.config import settings  # ⬅ unify all auth settings
+from app.security.passwords import hash_password, verify_password, needs_rehash, note_rehash
+from app.services import reset_tokens
+from app.security import ratelimit, revocation
+from app.deps.session import _pick_token
 
 router = APIRouter()
 
@@ -35,6 +38,7 @@ def _issue_token(sub: str, role: str, mfa_ok: bool) -> str:
         "mfa": mfa_ok,
         "iat": int(now.timestamp()),
         "exp": int((now + timedelta(hours=8)).timestamp()),
+        "jti": uuid.uuid4().hex,  # lets /logout revoke this exact token
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
@@ -50,6 +54,7 @@ def _set_auth_cookie(resp: JSONResponse, token: str, max_age_sec: int = 8 * 60 *
     )
 
 @router.post("/token")
+@ratelimit.cost(10)
 def login(
     request: Request,
     username: str = Form(...),
@@ -77,14 +82,21 @@ def login(
     if not row or not row["is_active"]:
         return JSONResponse({"code": "invalid_credentials"}, status_code=400)
 
-    try:
-        ok = bcrypt.checkpw(password.encode("utf-8"), row["password_hash"].encode("utf-8"))
-    except Exception:
-        ok = False
-    if not ok:
+    # runs on the hash pool; raises 503 when the pool is saturated
+    if not verify_password(password, row["password_hash"]):
         return JSONResponse({"code": "invalid_credentials"}, status_code=400)
 
     user_id = str(row["id"])
+
+    # upgrade weaker/legacy hashes while we hold the plaintext; never fail the login over it
+    if needs_rehash(row["password_hash"]):
+        try:
+            db.execute(text("UPDATE users SET password_hash=:ph WHERE id=:uid"),
+                       {"ph": hash_password(password), "uid": user_id})
+            db.commit()
+            note_rehash(row["password_hash"])
+        except Exception:
+            db.rollback()
     role = row["role"]
 
     cred = db.execute(
@@ -128,26 +140,25 @@ def login(
     return resp
 
 @router.post("/logout")
-def logout():
+def logout(request: Request, db: Session = Depends(get_session)):
+    # revoke the presented token server-side so a copied JWT dies with the session
+    tok = _pick_token(request)
+    if tok:
+        try:
+            payload = jwt.decode(tok, JWT_SECRET, algorithms=[JWT_ALG])
+        except jwt.PyJWTError:
+            payload = None
+        if payload and revocation.revoke_payload(db, payload):
+            db.commit()
     resp = JSONResponse({"ok": True})
     resp.delete_cookie(AUTH_COOKIE_NAME, path="/")
     return resp
 
 # ---------------- Password reset (DB-backed) ----------------
-
-def _ensure_reset_table(db: Session):
-    db.execute(text("""
-        CREATE TABLE IF NOT EXISTS password_reset_tokens (
-            id uuid PRIMARY KEY,
-            user_id uuid NOT NULL,
-            token text NOT NULL,
-            expires_at timestamptz NOT NULL,
-            used boolean NOT NULL DEFAULT FALSE
-        );
-    """))
-    db.commit()
+# Table, indexes and expiry sweep live in app.services.reset_tokens / alembic.
 
 @router.post("/request-password-reset")
+@ratelimit.cost(5)
 def request_password_reset(payload: dict, db: Session = Depends(get_session)):
     email = (payload or {}).get("email", "").strip().lower()
     if not email:
@@ -159,15 +170,7 @@ def request_password_reset(payload: dict, db: Session = Depends(get_session)):
     if not row:
         return {"ok": True}
 
-    _ensure_reset_table(db)
-    token = uuid.uuid4().hex + uuid.uuid4().hex
-    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
-    db.execute(
-        text("""INSERT INTO password_reset_tokens
-                (id, user_id, token, expires_at, used)
-                VALUES (:id, :uid, :t, :exp, FALSE)"""),
-        {"id": str(uuid.uuid4()), "uid": str(row["id"]), "t": token, "exp": expires_at},
-    )
+    token = reset_tokens.issue(db, str(row["id"]))
     db.commit()
 
     res = {"ok": True}
@@ -176,26 +179,21 @@ def request_password_reset(payload: dict, db: Session = Depends(get_session)):
     return res
 
 @router.post("/password-reset")
+@ratelimit.cost(10)
 def password_reset(payload: dict, db: Session = Depends(get_session)):
     token = (payload or {}).get("token")
     new_password = (payload or {}).get("new_password")
     if not token or not new_password:
         return JSONResponse({"code": "invalid_request"}, status_code=400)
 
-    _ensure_reset_table(db)
-    row = db.execute(
-        text("""SELECT user_id, expires_at, used
-                FROM password_reset_tokens
-                WHERE token=:t LIMIT 1"""),
-        {"t": token},
-    ).mappings().first()
-    if not row or row["used"] or row["expires_at"] < datetime.now(timezone.utc):
+    user_id = reset_tokens.consume(db, token)
+    if not user_id:
         return JSONResponse({"code": "invalid_or_expired"}, status_code=400)
 
-    hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+    # if hashing fails (e.g. 503 from a saturated pool) the session is closed
+    # uncommitted, so the token stays usable
+    hashed = hash_password(new_password)
     db.execute(text("UPDATE users SET password_hash=:ph WHERE id=:uid"),
-               {"ph": hashed, "uid": str(row["user_id"])})
-    db.execute(text("UPDATE password_reset_tokens SET used=TRUE WHERE token=:t"),
-               {"t": token})
+               {"ph": hashed, "uid": user_id})
     db.commit()
     return {"ok": True}
@@ -0,0 +1,29 @@
+# backend/app/routers/events.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import require_auth
+from app.services import events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# no DB session here: a stream may stay open for minutes and must not hold a pooled connection
+@router.get("/stream")
+async def event_stream(
+    auth=Depends(require_auth),
+    types: Optional[str] = Query(None, description="Comma-separated event type prefixes, e.g. referral,announcements"),
+):
+    if len(events.hub) >= events.SSE_MAX_CONNECTIONS:
+        raise HTTPException(status_code=503, detail="Too many event streams", headers={"Retry-After": "30"})
+    sub_id, role = auth
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    events.listener.ensure_started()
+    sub = events.hub.subscribe(sub_id, role.upper() == "COVENANT", wanted)
+    return StreamingResponse(
+        events.stream(sub),
+        media_type="text/event-stream",
+        # no-transform keeps the compression middleware and proxies from buffering frames
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.dependencies import get_db, require_auth
 from app.notifications.notifier import notify_feedback
+from app.security import ratelimit
 import uuid
 
 router = APIRouter(prefix="/feedback", tags=["feedback"])
@@ -18,6 +19,7 @@ class FeedbackRequest(BaseModel):
     attachment_ids: Optional[List[str]] = None
 
 @router.post("/files", status_code=200)
+@ratelimit.cost(20)
 async def upload_feedback_file(
     file: UploadFile = File(...),
     auth=Depends(require_auth),
@@ -65,6 +67,7 @@ async def upload_feedback_file(
     }
 
 @router.post("/send", status_code=200)
+@ratelimit.cost(5)
 def send_feedback(
     feedback: FeedbackRequest,
     auth=Depends(require_auth),
@@ -76,7 +79,7 @@ def send_feedback(
     - Validates user is authenticated
     - Retrieves user's name and email
     - Fetches attachment metadata if provided
-    - Sends professional feedback email to feedback@covenanttechnology.net
+    - Queues professional feedback email to feedback@covenanttechnology.net (outbox)
     - Logs the feedback submission in audit trail
     """
     user_id, role = auth
@@ -95,52 +98,45 @@ def send_feedback(
     last_name = user.get("last_name") or ""
     from_name = f"{first_name} {last_name}".strip() or from_email
 
-    # Get attachment details if provided
+    # Attachment metadata for the email body; the files themselves are
+    # referenced and loaded by the dispatcher at send time
     attachments = []
-    file_attachments = []
+    attachment_refs = []
     if feedback.attachment_ids:
+        # one round trip for all attachments, kept in the order the client sent them
+        rows = db.execute(
+            text("""
+                SELECT id::text AS id, name, size_bytes, content_type
+                FROM feedback_files
+                WHERE id = ANY(CAST(:ids AS uuid[])) AND user_id = :uid
+            """),
+            {"ids": list(feedback.attachment_ids), "uid": user_id}
+        ).mappings().all()
+        found = {r["id"]: r for r in rows}
         for att_id in feedback.attachment_ids:
-            att_data = db.execute(
-                text("""
-                    SELECT name, size_bytes, content_type, data
-                    FROM feedback_files
-                    WHERE id = :id AND user_id = :uid
-                """),
-                {"id": att_id, "uid": user_id}
-            ).mappings().first()
-
+            att_data = found.get(att_id.lower())
             if att_data:
-                # Metadata for email body
                 attachments.append({
                     "name": att_data["name"],
                     "size": att_data["size_bytes"],
                     "content_type": att_data.get("content_type", "application/octet-stream")
                 })
-                # Actual file content for email attachment
-                file_attachments.append({
-                    "name": att_data["name"],
-                    "content_type": att_data.get("content_type", "application/octet-stream"),
-                    "content": att_data["data"]
-                })
-
-    # Send feedback email
-    try:
-        notify_feedback(
-            from_email=from_email,
-            from_name=from_name,
-            subject_line=feedback.subject,
-            message_body=feedback.body,
-            cc=feedback.cc,
-            attachments=attachments if attachments else None,
-            file_attachments=file_attachments if file_attachments else None
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to send feedback: {str(e)}"
-        )
+                attachment_refs.append({"source": "feedback_files", "id": att_data["id"]})
+
+    # Queue feedback email; the dispatcher sends it
+    notify_feedback(
+        db,
+        from_email=from_email,
+        from_name=from_name,
+        subject_line=feedback.subject,
+        message_body=feedback.body,
+        cc=feedback.cc,
+        attachments=attachments if attachments else None,
+        attachment_refs=attachment_refs if attachment_refs else None
+    )
+    db.commit()
 
     return {
         "success": True,
-        "message": "Feedback sent successfully"
+        "message": "Feedback queued for delivery"
     }
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from app.dependencies import get_db, require_auth
 from app import models
+from app.services import collection_versions
 
 router = APIRouter()
 
 @router.get("/me")
-def read_me(auth=Depends(require_auth), db: Session = Depends(get_db)):
+def read_me(request: Request, response: Response, auth=Depends(require_auth), db: Session = Depends(get_db)):
     sub, role = auth  # require_auth returns (user_id, role)
 
+    tag = collection_versions.tag_for(db, request, [f"user:{sub}"], sub)
+    if collection_versions.matches(request, tag):
+        return collection_versions.not_modified(request, tag)
+    collection_versions.tagged(response, tag)
+
     # Get user with MFA status
     row = db.execute(
         text("""
@@ -1,56 +1,36 @@
+import hmac
+import os
 
 from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, or_
-from datetime import datetime, timedelta
-from app.database import SessionLocal
-from app.auth_helper import bearer_sub_and_role
-from app import models
 
-router = APIRouter()
-
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-
-@router.get("/overview")
-def overview(authorization: str | None = Header(default=None), db: Session = Depends(get_db)):
-    sub, role = bearer_sub_and_role(authorization)
-    if not sub: raise HTTPException(status_code=401, detail="Unauthorized")
-    base = db.query(models.Referral)
-    if role != "COVENANT":
-        base = base.filter(models.Referral.agent_id==sub)
+from app import telemetry
+from app.dependencies import get_db, require_auth
+from app.services import referral_stats
 
-    # counts by status
-    statuses = ["New","Contacted","Qualified","Proposal Sent","Won","Lost","On Hold","Commission Paid"]
-    status_counts = {s: 0 for s in statuses}
-    for s, c in db.query(models.Referral.status, func.count(models.Referral.id)).filter(base.whereclause if base.whereclause is not None else True).group_by(models.Referral.status):
-        if s in status_counts: status_counts[s] = c
-    total = base.count()
+# Scrapers must send "Authorization: Bearer <token>". Without a token /metrics is
+# refused unless METRICS_PUBLIC=1 says it is only reachable from a private network.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0").lower() in ("1", "true", "yes")
 
-    since = datetime.utcnow() - timedelta(days=30)
-    delta_total = base.filter(models.Referral.created_at>=since).count()
-    delta_won = base.filter(models.Referral.status=="Won", models.Referral.updated_at>=since).count()
-
-    projected = db.query(func.coalesce(func.sum(models.Referral.estimated_commission), 0)).filter(
-        or_(models.Referral.status=="Won", models.Referral.status=="Commission Paid"),
-        base.whereclause if base.whereclause is not None else True
-    ).scalar()
+router = APIRouter()
 
-    y = datetime.utcnow().year
-    paid_ytd = db.query(func.coalesce(func.sum(models.Referral.commission_paid), 0)).filter(
-        extract('year', models.Referral.updated_at)==y,
-        models.Referral.commission_paid>0,
-        base.whereclause if base.whereclause is not None else True
-    ).scalar()
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: str | None = Header(default=None)):
+    # async so scrape-time collectors run on the event loop (threadpool stats)
+    if not METRICS_TOKEN:
+        if not METRICS_PUBLIC:
+            raise HTTPException(status_code=403, detail="Metrics disabled: set METRICS_TOKEN")
+    elif not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return Response(telemetry.exposition(), media_type=telemetry.CONTENT_TYPE)
 
-    return {
-        "total_referrals": total,
-        "delta_total_30d": delta_total,
-        "won_deals": status_counts.get("Won",0),
-        "delta_won_30d": delta_won,
-        "projected_commission": float(projected or 0),
-        "paid_commissions_ytd": float(paid_ytd or 0),
-        "status_counts": status_counts
-    }
+@router.get("/overview")
+def overview(auth=Depends(require_auth), db: Session = Depends(get_db)):
+    """
+    Dashboard numbers: everyone's referrals for admins, the caller's own otherwise.
+    Served from trigger-maintained totals (see app.services.referral_stats).
+    """
+    sub, role = auth
+    return referral_stats.overview(db, None if role == "COVENANT" else sub)
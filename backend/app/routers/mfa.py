@@ -14,6 +14,7 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.db import get_session
+from app.security import revocation
 
 router = APIRouter()
 
@@ -38,6 +39,8 @@ def _require_user(req: Request):
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
     except Exception:
         return None
+    if revocation.is_revoked(payload):
+        return None
     return payload  # contains sub, role, mfa flag
 
 def _qr_data_uri(otpauth_url: str) -> str:
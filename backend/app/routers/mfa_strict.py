@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.db import get_session
 import pyotp
 from app.utils.mfa_policy import issuer
-import bcrypt
+from app.security.passwords import verify_password
 
 router = APIRouter(prefix="/auth/mfa", tags=["auth-mfa"])
 
@@ -26,7 +26,7 @@ def mfa_setup(body: SetupBody, db: Session = Depends(get_session)):   # <-- use
         text("SELECT id, password_hash FROM users WHERE email=:e LIMIT 1"),
         {"e": body.username}
     ).first()
-    if (not row) or (not row.password_hash) or (not bcrypt.checkpw(body.password.encode("utf-8"), row.password_hash.encode("utf-8"))):
+    if (not row) or (not row.password_hash) or (not verify_password(body.password, row.password_hash)):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     secret = pyotp.random_base32()
@@ -46,7 +46,7 @@ def mfa_enable(body: EnableBody, db: Session = Depends(get_session)):   # <-- us
         text("SELECT id, password_hash FROM users WHERE email=:e LIMIT 1"),
         {"e": body.username}
     ).first()
-    if (not row) or (not row.password_hash) or (not bcrypt.checkpw(body.password.encode("utf-8"), row.password_hash.encode("utf-8"))):
+    if (not row) or (not row.password_hash) or (not verify_password(body.password, row.password_hash)):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     cred = db.execute(
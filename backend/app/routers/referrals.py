@@ -1,14 +1,20 @@
-from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, List, Dict, Any, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import json
 
 from app.dependencies import get_db, require_auth
+from app.schemas import ReferralRow
+from app.serialization import Serializer
+from app.services import collection_versions, referral_fields, referral_stats
 
 router = APIRouter(prefix="/referrals", tags=["referrals"])
 
+REFERRAL = Serializer(ReferralRow)
+REFERRAL_LIST = Serializer(List[ReferralRow])
+
 
 class ReferralCreate(BaseModel):
     company: Optional[str] = None
@@ -35,23 +41,28 @@ class ReferralUpdate(BaseModel):
     reason: Optional[str] = None
 
 
-@router.get("/my")
+@router.get("/my", response_model=List[ReferralRow])
 def list_my_referrals(
+    request: Request,
     auth=Depends(require_auth),
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return (id is always included)"),
+    view: Literal["full", "summary"] = Query("full", description="summary: id, ref_no, company, status, created_at"),
 ):
     """
     Returns **array only** of current user's referrals.
     """
     user_id, _role = auth
+    cols = referral_fields.select_list(referral_fields.columns(fields, view))
+    tag = collection_versions.tag_for(db, request, [f"referrals:{user_id}"], user_id)
+    if collection_versions.matches(request, tag):
+        return collection_versions.not_modified(request, tag)
     rows = db.execute(
         text(
-            """
-            SELECT id, ref_no, company, status, created_at,
-                   contact_name, contact_email, contact_phone,
-                   notes, agent_id, opportunity_types, locations, environment, reason
+            f"""
+            SELECT {cols}
               FROM referrals
              WHERE agent_id = :uid
              ORDER BY created_at DESC
@@ -62,10 +73,10 @@ def list_my_referrals(
     ).mappings().all()
 
     # Return array only for FE simplicity
-    return [dict(r) for r in rows]
+    return collection_versions.tagged(REFERRAL_LIST.response(rows), tag)
 
 
-@router.post("", status_code=200)
+@router.post("", status_code=200, response_model=ReferralRow)
 def create_referral(
     payload: ReferralCreate, auth=Depends(require_auth), db: Session = Depends(get_db)
 ):
@@ -158,10 +169,11 @@ def create_referral(
         },
     )
     db.commit()
-    return dict(row)
+    referral_stats.invalidate(user_id)
+    return REFERRAL.response(row)
 
 
-@router.patch("/{referral_id}")
+@router.patch("/{referral_id}", response_model=ReferralRow)
 def update_referral(
     referral_id: str,
     payload: ReferralUpdate,
@@ -231,4 +243,5 @@ def update_referral(
         },
     )
     db.commit()
-    return dict(row)
+    referral_stats.invalidate(owner)
+    return REFERRAL.response(row)
@@ -1,11 +1,13 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 import uuid
 import json
 from app.dependencies import get_db, require_auth
 from app.services.virustotal import VirusTotalScanner
+from app.security import ratelimit
 
 router = APIRouter(prefix="/referrals", tags=["referrals-files"])
 vt_scanner = VirusTotalScanner()
@@ -32,6 +34,7 @@ def list_referral_files(referral_id: str, auth=Depends(require_auth), db: Sessio
     return {"items": rows}
 
 @router.post("/{referral_id}/files", status_code=200)
+@ratelimit.cost(20)
 async def upload_referral_file(
     referral_id: str,
     file: UploadFile = File(...),
@@ -45,8 +48,8 @@ async def upload_referral_file(
     # Read file content
     content = await file.read()
 
-    # Scan file with VirusTotal
-    scan_result = vt_scanner.scan_file(content, file.filename or "file")
+    # Scan file with VirusTotal (blocking HTTP + polling: keep it off the event loop)
+    scan_result = await run_in_threadpool(vt_scanner.scan_file, content, file.filename or "file")
 
     # Block unsafe files
     if not scan_result.get("safe", True):
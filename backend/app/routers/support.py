@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.auth_helper import bearer_sub_and_role
-from app.graph_mail import send_mail
+from app.notifications.outbox import enqueue
 from pydantic import BaseModel
 import os, datetime
 
@@ -21,7 +21,8 @@ def contact(payload: dict, authorization: str | None = Header(default=None), db:
     if not sub: raise HTTPException(status_code=401, detail="Unauthorized")
     msg = payload.get("message") or ""
     if not msg.strip(): raise HTTPException(status_code=400, detail="Empty message")
-    send_mail(["A-ZReferrals@covenanttechnology.net"], "Agent message", msg)
+    enqueue(db, "support_contact", ["A-ZReferrals@covenanttechnology.net"], "Agent message", msg)
+    db.commit()
     return {"ok": True}
 
 class FeedbackIn(BaseModel):
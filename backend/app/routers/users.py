@@ -4,24 +4,34 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import io, base64, json, secrets
-import bcrypt, pyotp, qrcode
+import io, base64, json, logging, os
+import pyotp, qrcode
 
 from app.db import get_session
 from app.deps.session import require_session
+from app.security.passwords import hash_password, verify_password
+from app.security import ratelimit, recovery_codes
+
+logger = logging.getLogger(__name__)
 
 # make audit optional
 try:
     from app.audit_helper import write_audit  # type: ignore
 except Exception as ex:  # pragma: no cover
-    print(f"[users] audit_helper disabled: {ex}")
+    logger.warning("audit_helper disabled: %s", ex)
     def write_audit(*_a, **_k):  # no-op
         return None
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# per-user attempts at /users/mfa/verify; the middleware treats /users/mfa/* as relaxed,
+# and a recovery-code guess can cost bcrypt work on the shared hash pool
+MFA_VERIFY_LIMIT = int(os.getenv("MFA_VERIFY_LIMIT", "10"))
+MFA_VERIFY_WINDOW_SECS = int(os.getenv("MFA_VERIFY_WINDOW_SECS", "300"))
+
 # ---------------- Password change ----------------
 @router.post("/change-password")
+@ratelimit.cost(10)
 def change_password(payload: dict, user=Depends(require_session), db: Session = Depends(get_session)):
     sub = str(user["id"])
     old_password = (payload.get("old_password") or "").strip()
@@ -42,13 +52,10 @@ def change_password(payload: dict, user=Depends(require_session), db: Session =
     if row.get("is_active", True) is False:
         raise HTTPException(status_code=403, detail="User disabled")
 
-    try:
-        if not bcrypt.checkpw(old_password.encode("utf-8"), row["password_hash"].encode("utf-8")):
-            raise HTTPException(status_code=400, detail="old_password invalid")
-    except Exception:
+    if not verify_password(old_password, row["password_hash"]):
         raise HTTPException(status_code=400, detail="old_password invalid")
 
-    new_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+    new_hash = hash_password(new_password)
     db.execute(text("UPDATE users SET password_hash=:ph WHERE id=:id"),
                {"ph": new_hash, "id": sub})
     db.commit()
@@ -59,13 +66,6 @@ def change_password(payload: dict, user=Depends(require_session), db: Session =
     return {"ok": True}
 
 # ---------------- MFA helpers ----------------
-def _gen_recovery_codes(n: int = 10) -> list[str]:
-    out = []
-    for _ in range(n):
-        h = secrets.token_hex(4).upper()  # 8 hex chars
-        out.append(f"{h[:4]}-{h[4:]}")
-    return out
-
 def _qr_data_url(otpauth: str) -> str:
     img = qrcode.make(otpauth)
     buf = io.BytesIO()
@@ -86,21 +86,23 @@ def mfa_setup(user=Depends(require_session), db: Session = Depends(get_session))
     otpauth_url = totp.provisioning_uri(name=user["email"], issuer_name="Covenant Azor")
     qr = _qr_data_url(otpauth_url)
 
-    plain_codes = _gen_recovery_codes(10)
-    hashed_codes = [bcrypt.hashpw(c.encode(), bcrypt.gensalt(12)).decode() for c in plain_codes]
+    # recovery codes live as HMAC digests in mfa_recovery_code; the legacy
+    # bcrypt list on mfa_credential is cleared on re-enrollment
+    plain_codes = recovery_codes.generate()
+    recovery_codes.replace_codes(db, user["id"], plain_codes)
 
     if row:
         db.execute(
             text("""UPDATE mfa_credential
-                    SET secret=:s, recovery_codes=:rc, enabled=FALSE
+                    SET secret=:s, recovery_codes='[]'::jsonb, enabled=FALSE
                     WHERE user_id=:u"""),
-            {"s": secret, "rc": json.dumps(hashed_codes), "u": user["id"]},
+            {"s": secret, "u": user["id"]},
         )
     else:
         db.execute(
             text("""INSERT INTO mfa_credential (user_id, secret, enabled, recovery_codes)
-                    VALUES (:u, :s, FALSE, :rc)"""),
-            {"u": user["id"], "s": secret, "rc": json.dumps(hashed_codes)},
+                    VALUES (:u, :s, FALSE, '[]'::jsonb)"""),
+            {"u": user["id"], "s": secret},
         )
 
     db.commit()
@@ -109,6 +111,7 @@ def mfa_setup(user=Depends(require_session), db: Session = Depends(get_session))
 
 @router.post("/mfa/verify")
 def mfa_verify(payload: dict, user=Depends(require_session), db: Session = Depends(get_session)):
+    ratelimit.check(f"mfa-verify:{user['id']}", MFA_VERIFY_WINDOW_SECS, MFA_VERIFY_LIMIT)
     code = (payload.get("code") or "").strip()
     recovery_code = (payload.get("recovery_code") or "").strip()
 
@@ -117,14 +120,14 @@ def mfa_verify(payload: dict, user=Depends(require_session), db: Session = Depen
         {"u": user["id"]},
     ).mappings().first()
     if not row:
-        print(f"[MFA] No credential found for user {user['id']}")
+        logger.info("mfa verify: no credential for user %s", user["id"])
         raise HTTPException(status_code=400, detail={"code": "mfa_not_enrolled"})
 
     # verify via authenticator code
     if code:
         totp = pyotp.TOTP(row["secret"])
         is_valid = totp.verify(str(code), valid_window=1)
-        print(f"[MFA] Code verification for user {user['id']}: {is_valid}")
+        logger.debug("mfa verify for user %s: %s", user["id"], is_valid)
         if not is_valid:
             raise HTTPException(status_code=400, detail={"code": "invalid_mfa_code"})
         db.execute(text("UPDATE mfa_credential SET enabled=TRUE WHERE user_id=:u"),
@@ -134,28 +137,25 @@ def mfa_verify(payload: dict, user=Depends(require_session), db: Session = Depen
 
     # or consume a recovery code
     if recovery_code:
-        hashes = row.get("recovery_codes") or []
-        if isinstance(hashes, str):
-            try:
-                hashes = json.loads(hashes)
-            except Exception:
-                hashes = []
-        idx = -1
-        for i, h in enumerate(hashes):
-            try:
-                if bcrypt.checkpw(recovery_code.encode(), h.encode()):
-                    idx = i
-                    break
-            except Exception:
-                continue
-        if idx < 0:
+        if recovery_codes.consume(db, user["id"], recovery_code):
+            db.execute(
+                text("""UPDATE mfa_credential
+                        SET enabled=TRUE, updated_at=now()
+                        WHERE user_id=:u"""),
+                {"u": user["id"]},
+            )
+            db.commit()
+            return {"ok": True}
+
+        # codes issued before the HMAC scheme: bcrypt check, dropped once used
+        remaining = recovery_codes.consume_legacy(recovery_code, row.get("recovery_codes"))
+        if remaining is None:
             raise HTTPException(status_code=400, detail={"code": "invalid_recovery_code"})
-        del hashes[idx]
         db.execute(
             text("""UPDATE mfa_credential
                     SET enabled=TRUE, recovery_codes=:rc, updated_at=now()
                     WHERE user_id=:u"""),
-            {"u": user["id"], "rc": json.dumps(hashes)},
+            {"u": user["id"], "rc": json.dumps(remaining)},
         )
         db.commit()
         return {"ok": True}
@@ -2,6 +2,7 @@
 from pydantic import BaseModel, EmailStr, UUID4, ConfigDict
 from typing import Optional, Literal, List, Dict, Any
 from datetime import datetime
+from uuid import UUID
 
 Role = Literal["AZOR", "COVENANT"]
 
@@ -53,3 +54,56 @@ class ReferralOut(BaseModel):
     contact_phone: Optional[str] = None
     notes: Optional[str] = None
     model_config = ConfigDict(from_attributes=True)
+
+# ---------- List rows (response models for the list endpoints) ----------
+# Lenient on purpose: legacy rows hold odd emails, and the JSON columns are
+# jsonb or text depending on the deployment. Output shape matches the raw rows.
+
+class ReferralRow(BaseModel):
+    id: UUID
+    ref_no: Optional[str] = None
+    company: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    contact_name: Optional[str] = None
+    contact_email: Optional[str] = None
+    contact_phone: Optional[str] = None
+    notes: Optional[str] = None
+    agent_id: Optional[UUID] = None
+    opportunity_types: Any = None
+    locations: Any = None
+    environment: Any = None
+    reason: Optional[str] = None
+
+class ReferralPage(BaseModel):
+    items: List[ReferralRow]
+    next: Optional[str] = None
+
+class AdminUserRow(BaseModel):
+    id: UUID
+    email: str
+    role: Optional[str] = None
+    first_name: str = ""
+    last_name: str = ""
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    mfa_enabled: bool = False
+
+class AdminUserPage(BaseModel):
+    items: List[AdminUserRow]
+    next: Optional[str] = None
+
+class AuditEventRow(BaseModel):
+    created_at: Optional[datetime] = None
+    action: Optional[str] = None
+    entity_type: Optional[str] = None
+    entity_id: Any = None
+    actor_user_id: Optional[UUID] = None
+    metadata: Any = None
+    actor_email: Optional[str] = None
+    actor_first_name: Optional[str] = None
+    actor_last_name: Optional[str] = None
+
+class AuditEventPage(BaseModel):
+    items: List[AuditEventRow]
+    next: Optional[str] = None
@@ -0,0 +1,221 @@
+# backend/app/security/passwords.py
+"""
+Password hashing off the request threadpool.
+
+bcrypt at cost 12 burns ~250 ms of CPU per call. Running it inline in sync
+endpoints parks a threadpool worker for the whole duration, so a login burst
+starves every other sync route. Here the work runs in a small dedicated
+process pool instead:
+
+  * at most HASH_POOL_WORKERS hashes run at once (one per process),
+  * at most HASH_POOL_MAX_QUEUE callers may wait for a free worker,
+  * a caller waits at most HASH_POOL_QUEUE_WAIT_MS for a worker,
+  * anything beyond that gets an immediate 503 with Retry-After.
+
+Set HASH_POOL_WORKERS=0 to hash inline (handy for scripts and tests).
+
+This is the only password hasher in the app. New hashes are bcrypt at a cost
+calibrated at startup (see calibrate()); the cost lives in the hash itself,
+so older/weaker hashes (lower bcrypt cost, legacy argon2) are detected with
+needs_rehash() and upgraded at the next successful login.
+"""
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from app import telemetry
+
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "2"))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", "16"))
+HASH_POOL_QUEUE_WAIT_MS = int(os.getenv("HASH_POOL_QUEUE_WAIT_MS", "2000"))
+HASH_POOL_RETRY_AFTER = int(os.getenv("HASH_POOL_RETRY_AFTER_SECS", "2"))
+
+# Cost calibration: pick the largest bcrypt cost whose hash time stays under
+# the target on this pod's CPU. PASSWORD_HASH_COST pins it and skips calibration;
+# deployments pin it, since rehash-on-login follows whichever pod measured highest.
+PASSWORD_HASH_TARGET_MS = int(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+PASSWORD_HASH_MIN_COST = int(os.getenv("PASSWORD_HASH_MIN_COST", "10"))
+PASSWORD_HASH_MAX_COST = int(os.getenv("PASSWORD_HASH_MAX_COST", "14"))
+PASSWORD_HASH_COST = os.getenv("PASSWORD_HASH_COST")
+BCRYPT_COST = int(PASSWORD_HASH_COST or 12)
+
+_queue_depth = telemetry.gauge("password_hash_queue_depth", "Callers waiting for a hash worker")
+_in_flight = telemetry.gauge("password_hash_in_flight", "Hashes currently running")
+_rejected = telemetry.counter("password_hash_rejected", "Hash requests rejected with 503", ["reason"])
+_queue_wait = telemetry.histogram("password_hash_queue_wait_seconds", "Time spent waiting for a hash worker", ["op"])
+_latency = telemetry.histogram("password_hash_seconds", "Hash/verify latency including queue wait", ["op"])
+_cost_gauge = telemetry.gauge("password_hash_cost", "bcrypt cost used for new hashes")
+_calibrated = telemetry.gauge("password_hash_calibrated_seconds", "Measured single-hash time at the chosen cost")
+_rehashed = telemetry.counter("password_rehash", "Hashes upgraded at login", ["from_alg"])
+_cost_gauge.set(BCRYPT_COST)
+
+
+# ---- worker functions (run in the pool; keep them module-level and picklable) ----
+
+def _hashpw(password: bytes, cost: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(cost))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    try:
+        if hashed.startswith(b"$2"):
+            return bcrypt.checkpw(password, hashed)
+        if hashed.startswith(b"$argon2"):
+            # legacy hashes from the old passlib/argon2 helper
+            from passlib.hash import argon2
+            return argon2.verify(password, hashed.decode("ascii"))
+    except Exception:
+        pass
+    return False
+
+
+# ---- pool ---------------------------------------------------------------------
+
+class HashPool:
+    def __init__(self, workers: int, max_queue: int, queue_wait_ms: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_wait = queue_wait_ms / 1000.0
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: never fork a process that already runs event loop/DB threads
+                    ctx = multiprocessing.get_context(os.getenv("HASH_POOL_START_METHOD", "spawn"))
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._executor
+
+    def _busy(self, reason: str) -> HTTPException:
+        _rejected.inc(reason=reason)
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"code": "auth_busy", "message": "Authentication is busy, retry shortly"},
+            headers={"Retry-After": str(HASH_POOL_RETRY_AFTER)},
+        )
+
+    def run(self, op: str, fn, *args):
+        """Run fn(*args) on a pool worker, honouring the queue bound and wait budget."""
+        start = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                _latency.observe(time.perf_counter() - start, op=op)
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise self._busy("queue_full")
+            self._waiting += 1
+            _queue_depth.set(self._waiting)
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                _queue_depth.set(self._waiting)
+        if not acquired:
+            raise self._busy("queue_timeout")
+
+        _queue_wait.observe(time.perf_counter() - start, op=op)
+        _in_flight.inc()
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            _in_flight.dec()
+            self._slots.release()
+            _latency.observe(time.perf_counter() - start, op=op)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pool = HashPool(HASH_POOL_WORKERS, HASH_POOL_MAX_QUEUE, HASH_POOL_QUEUE_WAIT_MS)
+
+
+def _algorithm(hashed: str) -> str:
+    if hashed.startswith("$2"):
+        return "bcrypt"
+    if hashed.startswith("$argon2"):
+        return "argon2"
+    return "unknown"
+
+
+def _bcrypt_cost(hashed: str) -> int:
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def calibrate() -> int:
+    """
+    Measure bcrypt on this CPU and set BCRYPT_COST to the largest cost whose
+    hash time fits PASSWORD_HASH_TARGET_MS (clamped to MIN..MAX). Call once at
+    startup; the measured time is exported as password_hash_calibrated_seconds.
+    """
+    global BCRYPT_COST
+    if PASSWORD_HASH_COST:
+        # pinned: no probes, nothing measured
+        BCRYPT_COST = int(PASSWORD_HASH_COST)
+        _cost_gauge.set(BCRYPT_COST)
+        return BCRYPT_COST
+
+    probe = PASSWORD_HASH_MIN_COST
+    samples = []
+    for _ in range(3):
+        t0 = time.perf_counter()
+        _hashpw(b"calibration-probe", probe)
+        samples.append(time.perf_counter() - t0)
+    t_probe = min(samples)
+
+    # each +1 cost doubles the work
+    budget = PASSWORD_HASH_TARGET_MS / 1000.0
+    steps = math.floor(math.log2(budget / t_probe)) if budget > 0 and t_probe > 0 else 0
+    cost = max(PASSWORD_HASH_MIN_COST, min(PASSWORD_HASH_MAX_COST, probe + steps))
+
+    BCRYPT_COST = cost
+    _cost_gauge.set(cost)
+    _calibrated.set(t_probe * (2 ** (cost - probe)))
+    return cost
+
+
+def needs_rehash(hashed: Optional[str]) -> bool:
+    """True when a stored hash is not bcrypt or is weaker than the current cost."""
+    if not hashed:
+        return False
+    if _algorithm(hashed) != "bcrypt":
+        return True
+    return _bcrypt_cost(hashed) < BCRYPT_COST
+
+
+def note_rehash(old_hash: str) -> None:
+    _rehashed.inc(from_alg=_algorithm(old_hash))
+
+
+def hash_password(password: str) -> str:
+    """bcrypt-hash a password on the hash pool. Raises 503 when the pool is saturated."""
+    return pool.run("hash", _hashpw, password.encode("utf-8"), BCRYPT_COST).decode("utf-8")
+
+
+def verify_password(password: str, hashed: Optional[str]) -> bool:
+    """Check a password against a stored hash (bcrypt or legacy argon2). Raises 503 when the pool is saturated."""
+    if not password or not hashed:
+        return False
+    return pool.run("verify", _checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
@@ -1,18 +1,465 @@
 # app/security/ratelimit.py
+"""
+The one rate limiter: a sliding-window counter.
+
+Each key keeps two fixed-window counts (previous and current). The request
+rate is estimated as
+
+    prev * (time left in current window / window) + cur
+
+which smooths the burst-at-the-boundary problem of plain fixed windows while
+storing O(1) state per key (no per-request timestamps).
+
+Two backends share the algorithm:
+
+  * MemoryLimiter: per-process, keys in an LRU capped at RATE_LIMIT_MAX_KEYS.
+    Expired keys are dropped from the cold end as new keys arrive, so memory
+    is bounded no matter how many distinct keys traffic or scanners produce.
+  * RedisLimiter: shared across pods; one EVALSHA round trip per check, the
+    whole read-modify-write runs atomically inside Redis and keys carry a TTL.
+  * HybridLimiter (default with Redis): decides locally from the last known
+    global counts plus this process's unsynced charges, and reconciles with
+    Redis in pipelined batches every RATE_LIMIT_SYNC_MS. A key whose unsynced
+    charges reach RATE_LIMIT_MAX_DRIFT x limit is flushed at once in the
+    background (never awaited by the request), so the global overshoot is
+    about pods x MAX_DRIFT x limit plus what one round trip lets through.
+
+Both Redis backends sit behind a CircuitBreaker: after
+RATE_LIMIT_BREAKER_FAILURES consecutive errors Redis is left alone for
+RATE_LIMIT_BREAKER_SECS and limits are enforced per process meanwhile.
+
+check() keeps the old helper signature for endpoint-level limits.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import threading
 import time
-from collections import deque, defaultdict
+from collections import OrderedDict, deque
+from typing import NamedTuple, Optional
+
 from fastapi import HTTPException
 
-# Simple in-memory fixed-window rate limiter (per-process).
-# window_seconds: seconds, limit: max requests in window.
-_hits: dict[str, deque[float]] = defaultdict(deque)
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis  # redis>=4.2
+except Exception:
+    redis = None
+
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+RATE_LIMIT_REDIS_MODE = os.getenv("RATE_LIMIT_REDIS_MODE", "hybrid")  # hybrid | direct
+RATE_LIMIT_SYNC_MS = int(os.getenv("RATE_LIMIT_SYNC_MS", "250"))
+RATE_LIMIT_SYNC_BATCH = int(os.getenv("RATE_LIMIT_SYNC_BATCH", "500"))
+RATE_LIMIT_MAX_DRIFT = float(os.getenv("RATE_LIMIT_MAX_DRIFT", "0.05"))  # fraction of limit, per process
+RATE_LIMIT_BREAKER_FAILURES = int(os.getenv("RATE_LIMIT_BREAKER_FAILURES", "3"))
+RATE_LIMIT_BREAKER_SECS = float(os.getenv("RATE_LIMIT_BREAKER_SECS", "30"))
+# leftover deltas kept for Redis while it is unreachable; the oldest go first
+RATE_LIMIT_MAX_CARRY = int(os.getenv("RATE_LIMIT_MAX_CARRY", "10000"))
+
+_decisions = telemetry.counter("rate_limit_decisions", "Rate-limit checks by outcome", ["result"])
+_keys = telemetry.gauge("rate_limit_keys", "Keys held by the in-process limiter")
+_round_trips = telemetry.counter("rate_limit_redis_round_trips", "Redis round trips made by the limiter", ["mode"])
+_synced = telemetry.counter("rate_limit_redis_keys_synced", "Key deltas pushed to Redis by the hybrid limiter")
+_sync_seconds = telemetry.histogram("rate_limit_redis_sync_seconds", "Hybrid limiter batch sync latency")
+_breaker_open = telemetry.gauge("rate_limit_redis_breaker_open", "1 while the Redis circuit breaker is open")
+_carry_dropped = telemetry.counter("rate_limit_carry_dropped", "Unsynced deltas dropped as stale or over RATE_LIMIT_MAX_CARRY")
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until a request would be allowed (0 when allowed)
+    reset: float  # seconds until the current window ends
+
+
+def _decide(prev: float, cur: float, limit: int, window: float, elapsed: float, cost: int = 1) -> Decision:
+    """Shared sliding-window arithmetic. elapsed = time since current window start.
+
+    A negative cost is a refund and is always allowed.
+    """
+    weight = (window - elapsed) / window
+    estimate = prev * weight + cur
+    reset = window - elapsed
+    if cost <= 0 or estimate + cost <= limit:
+        return Decision(True, limit, int(limit - estimate - cost), 0.0, reset)
+    if cur + cost > limit or prev <= 0:
+        # the current window alone is over: wait for it to roll, then for prev to decay
+        retry = reset + (window * (cur + cost - limit) / cur if cur > 0 else 0.0)
+    else:
+        # wait until prev's weight has decayed enough
+        retry = window * (estimate + cost - limit) / prev
+    return Decision(False, limit, 0, min(retry, 2 * window), reset)
+
+
+class MemoryLimiter:
+    """Per-process sliding-window limiter with a bounded, expiring key store."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> [window_start, prev, cur, expires_at]
+        self._store: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def _evict(self, now: float) -> None:
+        store = self._store
+        # cold end first: expired keys, then (if still over) least recently used
+        while store:
+            key, entry = next(iter(store.items()))
+            if entry[3] > now and len(store) <= self.max_keys:
+                break
+            store.popitem(last=False)
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> Decision:
+        now = self._clock()
+        start = now - (now % window)
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                entry = [start, 0, 0, 0.0]
+                self._store[key] = entry
+            else:
+                self._store.move_to_end(key)
+            if entry[0] < start:
+                entry[1] = entry[2] if entry[0] == start - window else 0
+                entry[2] = 0
+                entry[0] = start
+            d = _decide(entry[1], entry[2], limit, window, now - start, cost)
+            if d.allowed:
+                entry[2] = max(0, entry[2] + cost)
+            entry[3] = start + 2 * window
+            self._evict(now)
+            _keys.set(len(self._store))
+        _decisions.inc(result="allowed" if d.allowed else "limited")
+        return d
+
+
+class CircuitBreaker:
+    """Stop calling an unhealthy dependency for a back-off period."""
+
+    def __init__(self, failures: int = RATE_LIMIT_BREAKER_FAILURES,
+                 reset_secs: float = RATE_LIMIT_BREAKER_SECS, clock=time.monotonic):
+        self.failures = failures
+        self.reset_secs = reset_secs
+        self._clock = clock
+        self._count = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._clock() - self._opened_at >= self.reset_secs:
+            # half-open: let one trial through per back-off period
+            self._opened_at = self._clock()
+            return True
+        return False
+
+    def success(self) -> None:
+        self._count = 0
+        if self._opened_at is not None:
+            self._opened_at = None
+            _breaker_open.set(0)
+
+    def failure(self) -> None:
+        self._count += 1
+        if self._count >= self.failures:
+            if self._opened_at is None:
+                logger.warning("redis unhealthy; local-only limits for %.0fs", self.reset_secs)
+            self._opened_at = self._clock()
+            _breaker_open.set(1)
+
+
+# KEYS[1] = bucket key; ARGV = limit, window_ms, cost
+# Hash fields: s = current window start (ms), p = previous count, c = current count.
+_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local start = now - (now % window)
+local d = redis.call('HMGET', KEYS[1], 's', 'p', 'c')
+local s = tonumber(d[1]) or start
+local p = tonumber(d[2]) or 0
+local c = tonumber(d[3]) or 0
+if s < start then
+  if s == start - window then p = c else p = 0 end
+  c = 0
+end
+local elapsed = now - start
+local est = p * (window - elapsed) / window + c
+local allowed = 0
+if cost <= 0 or est + cost <= limit then
+  allowed = 1
+  c = math.max(0, c + cost)
+  redis.call('HSET', KEYS[1], 's', start, 'p', p, 'c', c)
+  redis.call('PEXPIRE', KEYS[1], window * 2)
+end
+return {allowed, tostring(p), tostring(c - cost * allowed), tostring(elapsed)}
+"""
+
+
+class RedisLimiter:
+    """Shared sliding-window limiter: one atomic Lua call per check."""
+
+    def __init__(self, url: str, prefix: str = "rl:", breaker: Optional[CircuitBreaker] = None):
+        self.prefix = prefix
+        self.breaker = breaker or CircuitBreaker()
+        self._r = redis.from_url(url, ssl=url.startswith("rediss://"))
+        self._script = self._r.register_script(_LUA)
+
+    async def hit(self, key: str, limit: int, window: float, cost: int = 1) -> Decision:
+        """Raises when Redis is down or the breaker is open; callers fall back to local."""
+        if not self.breaker.allow():
+            raise ConnectionError("rate-limit redis circuit open")
+        window_ms = int(window * 1000)
+        _round_trips.inc(mode="direct")
+        try:
+            allowed, p, c, elapsed = await self._script(
+                keys=[self.prefix + key], args=[limit, window_ms, cost]
+            )
+        except Exception:
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        # c is the count before this request; recompute headers with the shared arithmetic
+        d = _decide(float(p), float(c), limit, window, float(elapsed) / 1000.0, cost)
+        if bool(allowed) != d.allowed:  # float rounding at the edge; trust Redis
+            d = d._replace(allowed=bool(allowed))
+        _decisions.inc(result="allowed" if d.allowed else "limited")
+        return d
+
+
+# KEYS[1] = bucket hash (field per window start); ARGV = window_start_ms, delta, window_ms
+# Adds this process's delta to its window and returns the global {prev, cur}.
+_SYNC_LUA = """
+local ws = tonumber(ARGV[1])
+local w = tonumber(ARGV[3])
+if tonumber(ARGV[2]) ~= 0 then
+  -- negative deltas are refunds; never below zero
+  if redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2]) < 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], 0)
+  end
+end
+for _, f in ipairs(redis.call('HKEYS', KEYS[1])) do
+  if tonumber(f) < ws - w then redis.call('HDEL', KEYS[1], f) end
+end
+redis.call('PEXPIRE', KEYS[1], w * 2)
+local v = redis.call('HMGET', KEYS[1], tostring(ws - w), ARGV[1])
+return {tonumber(v[1]) or 0, tonumber(v[2]) or 0}
+"""
+
+
+class HybridLimiter:
+    """
+    Local decisions, batched reconciliation with Redis.
+
+    Per key: [window_start, global_prev, global_cur, pending, window, expires_at]
+    where global_* are Redis's counts as of the last sync (including what this
+    process has pushed) and pending is what this process charged since.
+    Window starts are wall-clock aligned so every pod agrees on them.
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: str = "rl:",
+                 sync_ms: int = RATE_LIMIT_SYNC_MS, max_drift: float = RATE_LIMIT_MAX_DRIFT,
+                 breaker: Optional[CircuitBreaker] = None, max_keys: int = RATE_LIMIT_MAX_KEYS,
+                 max_carry: int = RATE_LIMIT_MAX_CARRY, clock=time.time):
+        self.prefix = prefix
+        self.sync_interval = sync_ms / 1000.0
+        self.max_drift = max_drift
+        self.breaker = breaker or CircuitBreaker()
+        self.max_keys = max_keys
+        self.max_carry = max_carry
+        self._clock = clock
+        self._r = redis.from_url(url, ssl=url.startswith("rediss://")) if url else None
+        self._script = self._r.register_script(_SYNC_LUA) if self._r is not None else None
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._dirty: set = set()
+        # (key, window_start, amount, window) left over from rolled or evicted keys, oldest first
+        self._carry: deque = deque()
+        self._last_sync = 0.0
+        self._task: Optional[asyncio.Task] = None
+        # per-key flushes started by the drift bound, at most one in flight each
+        self._flushing: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _stale(item: tuple, now: float) -> bool:
+        # older than the previous window: no longer part of any sliding-window estimate
+        return item[1] < now - 2 * item[3]
+
+    def _stash(self, item: tuple, now: float) -> None:
+        """Keep a leftover delta for the next sync, bounded by age and max_carry."""
+        carry = self._carry
+        dropped = 0
+        if self._stale(item, now):
+            dropped += 1
+        else:
+            carry.append(item)
+        while carry and (len(carry) > self.max_carry or self._stale(carry[0], now)):
+            carry.popleft()
+            dropped += 1
+        if dropped:
+            _carry_dropped.inc(dropped)
+
+    def _fresh_carry(self, now: float) -> list:
+        """Take the carried deltas that still matter; stale ones are counted and dropped."""
+        items = [c for c in self._carry if not self._stale(c, now)]
+        if len(self._carry) > len(items):
+            _carry_dropped.inc(len(self._carry) - len(items))
+        self._carry = deque()
+        return items
+
+    def _roll(self, key: str, e: list, ws: float, now: float) -> None:
+        if e[3]:
+            self._stash((key, e[0], e[3], e[4]), now)
+        e[1] = e[2] + e[3] if e[0] == ws - e[4] else 0
+        e[2] = 0
+        e[3] = 0
+        e[0] = ws
+
+    def _evict(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            key, e = next(iter(entries.items()))
+            if e[5] > now and len(entries) <= self.max_keys:
+                break
+            entries.popitem(last=False)
+            if e[3]:
+                self._stash((key, e[0], e[3], e[4]), now)
+            self._dirty.discard(key)
+
+    async def hit(self, key: str, limit: int, window: float, cost: int = 1) -> Decision:
+        now = self._clock()
+        ws = now - (now % window)
+        e = self._entries.get(key)
+        if e is None:
+            e = self._entries[key] = [ws, 0, 0, 0, window, 0.0]
+            self._dirty.add(key)  # pick up other pods' counts on the next sync
+        else:
+            self._entries.move_to_end(key)
+            if e[0] < ws:
+                self._roll(key, e, ws, now)
+        d = _decide(e[1], e[2] + e[3], limit, window, now - ws, cost)
+        if d.allowed:
+            e[3] += cost
+            self._dirty.add(key)
+        e[5] = ws + 2 * window
+        self._evict(now)
+        _keys.set(len(self._entries))
+        _decisions.inc(result="allowed" if d.allowed else "limited")
+
+        if e[3] >= max(1.0, self.max_drift * limit):
+            # drift bound reached for this key: reconcile now, but off the request path,
+            # or every request costing more than the bound would wait on Redis
+            if key not in self._flushing:
+                task = asyncio.get_running_loop().create_task(self.sync([key]))
+                self._flushing[key] = task
+                task.add_done_callback(lambda _t, k=key: self._flushing.pop(k, None))
+        elif now - self._last_sync >= self.sync_interval and (self._task is None or self._task.done()):
+            self._last_sync = now
+            self._task = asyncio.get_running_loop().create_task(self.sync())
+        return d
+
+    async def _remote(self, items: list) -> list:
+        """Push (key, window_start, amount, window) deltas; returns [(prev, cur), ...]."""
+        async with self._r.pipeline(transaction=False) as pipe:
+            for key, ws, amount, window in items:
+                await self._script(
+                    keys=[self.prefix + key],
+                    args=[int(ws * 1000), amount, int(window * 1000)],
+                    client=pipe,
+                )
+            return await pipe.execute()
+
+    async def sync(self, keys=None) -> int:
+        """Push pending deltas and refresh global counts. Returns keys synced."""
+        if self._r is None or not self.breaker.allow():
+            return 0
+        now = self._clock()
+        items = self._fresh_carry(now)
+        carried = len(items)
+        for key in list(keys if keys is not None else self._dirty):
+            e = self._entries.get(key)
+            self._dirty.discard(key)
+            if e is None:
+                continue
+            amount, e[3] = e[3], 0
+            e[2] += amount  # optimistically counted as global until the reply lands
+            items.append((key, e[0], amount, e[4]))
+        total = 0
+        for i in range(0, len(items), RATE_LIMIT_SYNC_BATCH):
+            batch = items[i:i + RATE_LIMIT_SYNC_BATCH]
+            t0 = time.perf_counter()
+            _round_trips.inc(mode="hybrid")
+            try:
+                replies = await self._remote(batch)
+            except Exception as ex:
+                self.breaker.failure()
+                # keep the deltas; they are already counted locally
+                for item in items[i:]:
+                    if item[2]:
+                        self._stash(item, now)
+                logger.warning("redis sync failed: %s", ex)
+                return total
+            self.breaker.success()
+            _sync_seconds.observe(time.perf_counter() - t0)
+            for n, ((key, ws, _amount, _w), reply) in enumerate(zip(batch, replies)):
+                if i + n < carried:
+                    continue  # rolled-window leftovers: nothing to refresh
+                e = self._entries.get(key)
+                if e is not None and e[0] == ws:
+                    e[1], e[2] = int(reply[0]), int(reply[1])
+            total += len(batch)
+            _synced.inc(len(batch))
+        return total
+
+
+def from_env(url: str, prefix: str):
+    """The shared (Redis) limiter for url, or None when Redis is not configured/installed."""
+    if not url or redis is None:
+        return None
+    if RATE_LIMIT_REDIS_MODE == "direct":
+        return RedisLimiter(url, prefix)
+    return HybridLimiter(url, prefix)
+
+
+limiter = MemoryLimiter()
+
+
+def cost(tokens: int):
+    """
+    Route decorator declaring how many budget tokens a request costs (default:
+    1 for reads, more for writes). Put it under the @router.<method> line.
+    """
+    def deco(fn):
+        fn.rate_limit_cost = tokens
+        return fn
+    return deco
+
 
 def check(key: str, window_seconds: int = 60, limit: int = 20):
-    now = time.time()
-    q = _hits[key]
-    # drop old
-    while q and now - q[0] > window_seconds:
-        q.popleft()
-    if len(q) >= limit:
-        raise HTTPException(status_code=429, detail="Too many requests")
-    q.append(now)
+    """Raise 429 when key has used up limit requests in the sliding window."""
+    d = limiter.hit(key, limit, window_seconds)
+    if not d.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(d.retry_after)))},
+        )
@@ -0,0 +1,96 @@
+# backend/app/security/recovery_codes.py
+"""
+MFA recovery codes stored as keyed HMAC-SHA256 digests.
+
+Recovery codes are 32 bits of randomness shown to the user once, so a keyed
+HMAC (secret lives in app config, not the DB) is enough; a slow KDF adds
+nothing but CPU. Each digest is a row in mfa_recovery_code with a unique
+(user_id, code_digest) index, so consuming a code is one HMAC plus one index
+probe instead of up to ten bcrypt checks.
+
+Users enrolled before this scheme still carry bcrypt hashes in
+mfa_credential.recovery_codes; those are checked (on the hash pool) only when
+no digest row matches, and the matched hash is dropped on use. The input is
+put into the one format those codes were issued in (XXXX-XXXX, uppercase
+hex), so a wrong guess costs at most one bcrypt check per stored hash.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import secrets
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.security.passwords import verify_password
+
+RECOVERY_CODE_COUNT = 10
+
+
+def _key() -> bytes:
+    return (settings.MFA_RECOVERY_CODE_KEY or settings.JWT_SECRET).encode("utf-8")
+
+
+def normalize(code: str) -> str:
+    """Uppercase and drop separators so 'abcd-ef12', 'ABCD EF12' and 'ABCDEF12' match."""
+    return "".join(ch for ch in (code or "").upper() if ch.isalnum())
+
+
+def digest(code: str) -> bytes:
+    return hmac.new(_key(), normalize(code).encode("utf-8"), hashlib.sha256).digest()
+
+
+def generate(n: int = RECOVERY_CODE_COUNT) -> list[str]:
+    out = []
+    for _ in range(n):
+        h = secrets.token_hex(4).upper()  # 8 hex chars
+        out.append(f"{h[:4]}-{h[4:]}")
+    return out
+
+
+def replace_codes(db: Session, user_id: str, codes: Sequence[str]) -> None:
+    """Replace the user's recovery codes with digests of `codes` (caller commits)."""
+    db.execute(text("DELETE FROM mfa_recovery_code WHERE user_id = :u"), {"u": user_id})
+    if codes:
+        db.execute(
+            text("INSERT INTO mfa_recovery_code (user_id, code_digest) VALUES (:u, :d)"),
+            [{"u": user_id, "d": digest(c)} for c in codes],
+        )
+
+
+def consume(db: Session, user_id: str, code: str) -> bool:
+    """Delete the matching digest row; True if one existed (caller commits)."""
+    row = db.execute(
+        text("""DELETE FROM mfa_recovery_code
+                 WHERE user_id = :u AND code_digest = :d
+             RETURNING id"""),
+        {"u": user_id, "d": digest(code)},
+    ).first()
+    return row is not None
+
+
+def consume_legacy(code: str, hashes) -> Optional[list]:
+    """
+    Match `code` against legacy bcrypt hashes from mfa_credential.recovery_codes.
+    Returns the remaining hashes on a match, or None.
+    """
+    if isinstance(hashes, str):
+        try:
+            hashes = json.loads(hashes)
+        except Exception:
+            hashes = []
+    hashes = [h for h in (hashes or []) if isinstance(h, str) and h.startswith("$2")]
+    if not hashes:
+        return None
+    n = normalize(code)
+    if len(n) != 8 or any(ch not in "0123456789ABCDEF" for ch in n):
+        return None  # can't be a legacy code: no bcrypt work at all
+    canonical = f"{n[:4]}-{n[4:]}"
+    for i, h in enumerate(hashes):
+        if verify_password(canonical, h):
+            return hashes[:i] + hashes[i + 1:]
+    return None
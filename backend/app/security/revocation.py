@@ -0,0 +1,221 @@
+# backend/app/security/revocation.py
+"""
+Server-side JWT revocation (by jti).
+
+Revoked jtis live in the revoked_token table. Each process keeps a Bloom
+filter of them, so the common case ("this token is not revoked") is a few
+in-memory hash probes with no DB round trip. Only a filter hit, which is
+either a real revocation or a rare false positive, falls through to an
+authoritative SELECT.
+
+The filter is kept current by a daemon thread that pulls new rows by id
+every REVOCATION_SYNC_SECS (incremental), and rebuilt from scratch every
+REVOCATION_REBUILD_SECS so entries for expired tokens drop out. A process
+sees its own revocations immediately. Other processes see them within one
+sync interval. Until the first sync has loaded the filter (process start, or
+a database that was down when the thread started), every check goes to the
+table.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_SECS = float(os.getenv("REVOCATION_SYNC_SECS", "5"))
+REVOCATION_REBUILD_SECS = float(os.getenv("REVOCATION_REBUILD_SECS", "3600"))
+REVOCATION_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+# re-read this many ids behind the high-water mark: bigserial ids can commit
+# out of order, and re-adding a jti to the filter is a no-op
+REVOCATION_SYNC_OVERLAP = 100
+
+_checks = telemetry.counter("token_revocation_checks", "Revocation checks by outcome", ["result"])
+_filter_size = telemetry.gauge("token_revocation_filter_entries", "jtis loaded into the revocation filter")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.m = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        d = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, item: str) -> bool:
+        """Set the item's bits; returns False if they were all set already."""
+        new = False
+        for p in self._positions(item):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class RevocationStore:
+    def __init__(self, session_factory: Optional[Callable] = None,
+                 capacity: int = REVOCATION_CAPACITY, error_rate: float = REVOCATION_ERROR_RATE):
+        self._session_factory = session_factory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._loaded = False
+        self._rebuilt_at = 0.0
+        # confirmed false positives; cleared for any jti a sync brings in
+        self._not_revoked: "OrderedDict[str, None]" = OrderedDict()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.db import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ---- sync ----
+
+    def _load(self, db, since_id: int) -> list:
+        return db.execute(
+            text("""SELECT id, jti FROM revoked_token
+                     WHERE id > :since AND expires_at > now()
+                     ORDER BY id"""),
+            {"since": since_id},
+        ).all()
+
+    def sync(self) -> int:
+        """Pull revocations newer than the last seen id; rebuild when due. Returns rows applied."""
+        rebuild = (not self._loaded
+                   or time.monotonic() - self._rebuilt_at >= REVOCATION_REBUILD_SECS
+                   or self._filter.count >= self.capacity)
+        db = self._session()
+        try:
+            if rebuild:
+                db.execute(text("DELETE FROM revoked_token WHERE expires_at < now()"))
+                db.commit()
+            rows = self._load(db, 0 if rebuild else max(0, self._last_id - REVOCATION_SYNC_OVERLAP))
+        finally:
+            db.close()
+
+        with self._lock:
+            if rebuild:
+                self._filter = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+                self._rebuilt_at = time.monotonic()
+                self._loaded = True
+            for rid, jti in rows:
+                self._filter.add(jti)
+                self._not_revoked.pop(jti, None)
+                self._last_id = max(self._last_id, rid)
+            _filter_size.set(self._filter.count)
+        return len(rows)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as ex:
+                logger.warning("revocation sync failed: %s", ex)
+            self._stop.wait(REVOCATION_SYNC_SECS)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="revocation-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---- API ----
+
+    def revoke(self, db, jti: str, user_id: Optional[str], expires_at: datetime) -> None:
+        """Record a revocation (caller commits) and apply it to this process at once."""
+        db.execute(
+            text("""INSERT INTO revoked_token (jti, user_id, expires_at)
+                    VALUES (:j, :u, :exp)
+                    ON CONFLICT (jti) DO NOTHING"""),
+            {"j": jti, "u": user_id, "exp": expires_at},
+        )
+        with self._lock:
+            self._filter.add(jti)
+            self._not_revoked.pop(jti, None)
+
+    def _lookup(self, jti: str) -> bool:
+        db = self._session()
+        try:
+            return db.execute(
+                text("SELECT 1 FROM revoked_token WHERE jti = :j"), {"j": jti}
+            ).first() is not None
+        finally:
+            db.close()
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        if not self._loaded:
+            # an empty filter would wave every revoked token through
+            hit = self._lookup(jti)
+            _checks.inc(result="revoked" if hit else "unloaded")
+            return hit
+        if jti not in self._filter:
+            _checks.inc(result="filter_miss")
+            return False
+        if jti in self._not_revoked:
+            _checks.inc(result="false_positive_cached")
+            return False
+        hit = self._lookup(jti)
+        _checks.inc(result="revoked" if hit else "false_positive")
+        if not hit:
+            with self._lock:
+                self._not_revoked[jti] = None
+                if len(self._not_revoked) > 10000:
+                    self._not_revoked.popitem(last=False)
+        return hit
+
+
+store = RevocationStore()
+
+
+def is_revoked(payload: dict) -> bool:
+    """True if the decoded JWT payload carries a revoked jti."""
+    return store.is_revoked(payload.get("jti"))
+
+
+def revoke_payload(db, payload: dict) -> bool:
+    """Revoke a decoded JWT payload; False if it has no jti (pre-revocation tokens)."""
+    jti = payload.get("jti")
+    if not jti:
+        return False
+    exp = datetime.fromtimestamp(int(payload.get("exp") or time.time()), tz=timezone.utc)
+    store.revoke(db, jti, payload.get("sub"), exp)
+    return True
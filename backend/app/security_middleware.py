@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-from typing import Callable
-from fastapi import Request
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .config import Settings
+from .middleware.asgi import header_block, with_default_headers
 
 
 def add_security_middleware(app, settings: Settings) -> None:
@@ -35,27 +34,42 @@ def add_security_middleware(app, settings: Settings) -> None:
             app.add_middleware(RejectAuthHeaderInProd, settings=settings)
 
 
-class RejectAuthHeaderInProd(BaseHTTPMiddleware):
-    def __init__(self, app, settings: Settings):
-        super().__init__(app)
+class RejectAuthHeaderInProd:
+    def __init__(self, app: ASGIApp, settings: Settings):
+        self.app = app
         self.settings = settings
+        self.reject = JSONResponse(
+            status_code=401,
+            content={
+                "code": "header_auth_disabled",
+                "message": "Authorization header is disabled in production. Use cookie-based authentication.",
+            },
+        )
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        if request.headers.get("authorization"):
-            return JSONResponse(
-                status_code=401,
-                content={
-                    "code": "header_auth_disabled",
-                    "message": "Authorization header is disabled in production. Use cookie-based authentication.",
-                },
-            )
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and any(k == b"authorization" for k, _ in scope["headers"]):
+            await self.reject(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, settings: Settings):
-        super().__init__(app)
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp, settings: Settings):
+        self.app = app
         self.s = settings
+        # settings don't change at runtime: encode the whole header block once
+        pairs = [
+            ("Content-Security-Policy", self._build_csp()),
+            ("Referrer-Policy", self.s.REFERRER_POLICY),
+            ("X-Content-Type-Options", "nosniff"),
+            ("X-Frame-Options", "DENY"),
+            ("Cross-Origin-Opener-Policy", "same-origin"),
+            ("Cross-Origin-Resource-Policy", "same-site"),
+        ]
+        # HSTS only in prod over HTTPS
+        if self.s.is_prod and self.s.ENABLE_HSTS:
+            pairs.append(("Strict-Transport-Security", f"max-age={int(self.s.HSTS_MAX_AGE)}; includeSubDomains"))
+        self.block = header_block(pairs)
 
     def _build_csp(self) -> str:
         csp_parts = [
@@ -70,24 +84,8 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         ]
         return "; ".join(csp_parts)
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        response: Response = await call_next(request)
-
-        # Content Security Policy
-        response.headers.setdefault("Content-Security-Policy", self._build_csp())
-
-        # Other security headers
-        response.headers.setdefault("Referrer-Policy", self.s.REFERRER_POLICY)
-        response.headers.setdefault("X-Content-Type-Options", "nosniff")
-        response.headers.setdefault("X-Frame-Options", "DENY")
-        response.headers.setdefault("Cross-Origin-Opener-Policy", "same-origin")
-        response.headers.setdefault("Cross-Origin-Resource-Policy", "same-site")
-
-        # HSTS only in prod over HTTPS
-        if self.s.is_prod and self.s.ENABLE_HSTS:
-            response.headers.setdefault(
-                "Strict-Transport-Security",
-                f"max-age={int(self.s.HSTS_MAX_AGE)}; includeSubDomains",
-            )
-
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, with_default_headers(send, self.block))
@@ -0,0 +1,127 @@
+# backend/app/services/collection_versions.py
+"""
+Conditional GET for read endpoints.
+
+Triggers (alembic migration 2026_10_19_collection_versions) bump a counter
+in collection_versions each time a collection changes:
+
+  * "referrals" and "referrals:<agent_id>" on referrals writes,
+  * "users" and "user:<id>" on users and mfa_credential writes.
+
+A read endpoint builds a weak ETag from the versions of the scopes it
+depends on, plus a hash of the caller and the query string. If that
+matches If-None-Match, it answers 304 without running its query. The
+check is one primary-key lookup. Responses carry the tag,
+Last-Modified, "Cache-Control: private, no-cache" (always revalidate)
+and "Vary: Authorization".
+
+If the table is missing (migration not applied yet), the lookup fails.
+No tag is issued for VERSION_RETRY_SECS and the endpoints behave as
+before.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+# change on deploys that alter response formats so old tags stop matching
+ETAG_SALT = os.getenv("ETAG_SALT", "1")
+VERSION_RETRY_SECS = float(os.getenv("VERSION_RETRY_SECS", "60"))
+
+_not_modified = telemetry.counter("http_not_modified", "Conditional GETs answered with 304", ["route"])
+
+_VERSIONS_SQL = text("""
+    SELECT COALESCE(sum(version), 0) AS version, max(updated_at) AS updated_at
+      FROM collection_versions
+     WHERE scope = ANY(:scopes)
+""")
+
+_disabled_until = 0.0
+
+
+class Tag:
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, etag: str, last_modified: Optional[datetime]):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self) -> dict:
+        h = {"ETag": self.etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+        if self.last_modified is not None:
+            h["Last-Modified"] = format_datetime(self.last_modified.astimezone(timezone.utc), usegmt=True)
+        return h
+
+
+def make_etag(version, variant: str) -> str:
+    digest = hashlib.blake2b(f"{ETAG_SALT}|{variant}".encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def _variant(request: Request, caller: str) -> str:
+    return f"{caller}|{request.url.path}?{request.url.query}"
+
+
+def tag_for(db: Session, request: Request, scopes: list, caller: str) -> Optional[Tag]:
+    """ETag from the scopes' versions, or None while the versions table is unavailable."""
+    global _disabled_until
+    if time.monotonic() < _disabled_until:
+        return None
+    try:
+        row = db.execute(_VERSIONS_SQL, {"scopes": list(scopes)}).mappings().one()
+    except DBAPIError as ex:
+        db.rollback()
+        _disabled_until = time.monotonic() + VERSION_RETRY_SECS
+        logger.warning("collection_versions unavailable, ETags off for %ss: %s", VERSION_RETRY_SECS, ex.orig)
+        return None
+    # sum of monotonically increasing counters: any bump changes it
+    return Tag(make_etag(int(row["version"]), _variant(request, caller)), row["updated_at"])
+
+
+def file_tag(request: Request, path: str, caller: str = "") -> Optional[Tag]:
+    """ETag for a file-backed resource from its mtime and size."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return Tag(make_etag(f"{st.st_mtime_ns:x}.{st.st_size:x}", _variant(request, caller)),
+               datetime.fromtimestamp(st.st_mtime, tz=timezone.utc))
+
+
+def matches(request: Request, tag: Optional[Tag]) -> bool:
+    if tag is None:
+        return False
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    # weak comparison: W/ prefixes are ignored
+    wanted = tag.etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == wanted for t in inm.split(","))
+
+
+def not_modified(request: Request, tag: Tag) -> Response:
+    route = getattr(request.scope.get("route"), "path", None) or request.url.path
+    _not_modified.inc(route=route)
+    return Response(status_code=304, headers=tag.headers())
+
+
+def tagged(response: Response, tag: Optional[Tag]) -> Response:
+    if tag is not None:
+        response.headers.update(tag.headers())
+    return response
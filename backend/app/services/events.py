@@ -0,0 +1,258 @@
+# backend/app/services/events.py
+"""
+Server-sent events for dashboard updates.
+
+Writers call publish(db, event) inside their transaction. It runs
+pg_notify on EVENTS_CHANNEL, and Postgres delivers the notification only
+if the transaction commits. Writers with no session call publish_now().
+
+Each process holds one LISTEN connection (Listener). psycopg2 is used
+non-blocking: the socket is registered with loop.add_reader, so idle time
+costs no thread and no pooled connection. The listener starts with the
+first subscriber. It reconnects with backoff and then sends "resync" so
+clients refetch anything they missed.
+
+The Hub indexes subscribers by user, so a referral event is matched
+against the owning agent's connections (and the previous owner's, on
+reassignment) and the admins only. An announcement goes to everyone.
+Each event is encoded into an SSE frame once and the same bytes are
+shared by every recipient. A subscriber whose queue fills up (a client
+not reading) is closed; it reconnects and refetches.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "azor_events")
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_HEARTBEAT_SECS = float(os.getenv("SSE_HEARTBEAT_SECS", "15"))
+# streams end after this long so clients reconnect with a fresh token
+SSE_MAX_LIFETIME_SECS = float(os.getenv("SSE_MAX_LIFETIME_SECS", "900"))
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "5000"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+
+_connections = telemetry.gauge("sse_connections", "Open server-sent event streams")
+_events = telemetry.counter("sse_events", "Events received from the LISTEN channel", ["type"])
+_slow = telemetry.counter("sse_slow_disconnects", "Streams closed because the client fell behind")
+_listening = telemetry.gauge("sse_listener_connected", "1 while the LISTEN connection is up")
+
+HEARTBEAT = b": ping\n\n"
+
+
+def publish(db: Session, event: dict) -> None:
+    """NOTIFY in db's transaction; listeners see it after commit."""
+    db.execute(text("SELECT pg_notify(:ch, :payload)"),
+               {"ch": EVENTS_CHANNEL, "payload": json.dumps(event, default=str)})
+
+
+def publish_now(event: dict) -> None:
+    """NOTIFY on its own connection; falls back to this process's subscribers."""
+    try:
+        from app.db import engine
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:ch, :payload)"),
+                         {"ch": EVENTS_CHANNEL, "payload": json.dumps(event, default=str)})
+    except Exception as ex:
+        logger.warning("pg_notify failed, delivering locally only: %s", ex)
+        hub.dispatch_threadsafe(event)
+
+
+def frame(event: dict) -> bytes:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n".encode()
+
+
+class Subscriber:
+    __slots__ = ("user_id", "admin", "types", "queue")
+
+    def __init__(self, user_id: str, admin: bool, types: Optional[set] = None):
+        self.user_id = user_id
+        self.admin = admin
+        self.types = types  # event type prefixes, None = all
+        self.queue: asyncio.Queue = asyncio.Queue(SSE_QUEUE_SIZE)
+
+    def wants(self, etype: str) -> bool:
+        return self.types is None or etype.startswith(tuple(self.types))
+
+
+class Hub:
+    def __init__(self):
+        self._all: set = set()
+        self._admins: set = set()
+        self._by_user: dict = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def subscribe(self, user_id: str, admin: bool, types: Optional[set] = None) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscriber(user_id, admin, types)
+        self._all.add(sub)
+        (self._admins if admin else self._by_user.setdefault(user_id, set())).add(sub)
+        _connections.set(len(self._all))
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._all.discard(sub)
+        self._admins.discard(sub)
+        peers = self._by_user.get(sub.user_id)
+        if peers is not None:
+            peers.discard(sub)
+            if not peers:
+                del self._by_user[sub.user_id]
+        _connections.set(len(self._all))
+
+    def recipients(self, event: dict):
+        if event.get("type", "").startswith("referral"):
+            # previous_agent_id: a reassigned referral leaves the old owner's list too
+            owners = {str(a) for a in (event.get("agent_id"), event.get("previous_agent_id")) if a is not None}
+            return [*self._admins, *(sub for o in owners for sub in self._by_user.get(o, ()))]
+        return list(self._all)
+
+    def dispatch(self, event: dict) -> None:
+        etype = event.get("type", "message")
+        _events.inc(type=etype)
+        data = frame(event)
+        for sub in self.recipients(event):
+            if not sub.wants(etype):
+                continue
+            try:
+                sub.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.close(sub)
+                _slow.inc()
+
+    def dispatch_threadsafe(self, event: dict) -> None:
+        loop = self._loop
+        if loop is not None and self._all:
+            loop.call_soon_threadsafe(self.dispatch, event)
+
+    def close(self, sub: Subscriber) -> None:
+        """End one stream: drop what it has queued and wake it with None."""
+        self.unsubscribe(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def close_all(self) -> None:
+        for sub in list(self._all):
+            self.close(sub)
+
+
+hub = Hub()
+
+
+async def stream(sub: Subscriber, heartbeat: float = SSE_HEARTBEAT_SECS,
+                 lifetime: float = SSE_MAX_LIFETIME_SECS) -> AsyncIterator[bytes]:
+    """SSE frames for one subscriber: queued events, heartbeats while idle."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + lifetime
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n".encode() + frame({"type": "ready"})
+        while True:
+            timeout = min(heartbeat, deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                data = await asyncio.wait_for(sub.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if data is None:
+                return
+            yield data
+    finally:
+        hub.unsubscribe(sub)
+
+
+class Listener:
+    """The process's LISTEN connection, started by the first subscriber."""
+
+    def __init__(self, hub: Hub):
+        self.hub = hub
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def _connect():
+        import psycopg2
+        from sqlalchemy.engine import make_url
+        from app.db import DATABASE_URL
+
+        dsn = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        # TCP keepalives surface a dead peer as a socket error, which wakes the reader
+        conn = psycopg2.connect(dsn, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{EVENTS_CHANNEL}"')
+        return conn
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        delay, first = 1.0, True
+        while True:
+            try:
+                conn = await loop.run_in_executor(None, self._connect)
+            except Exception as ex:
+                logger.warning("events listener connect failed, retry in %.0fs: %s", delay, ex)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            delay = 1.0
+            lost = loop.create_future()
+
+            def on_readable():
+                try:
+                    conn.poll()
+                except Exception as ex:
+                    if not lost.done():
+                        lost.set_result(ex)
+                    return
+                while conn.notifies:
+                    payload = conn.notifies.pop(0).payload
+                    try:
+                        self.hub.dispatch(json.loads(payload))
+                    except ValueError:
+                        logger.warning("dropping malformed event payload")
+
+            fd = conn.fileno()
+            loop.add_reader(fd, on_readable)
+            _listening.set(1)
+            if not first:
+                # anything sent while we were disconnected is gone
+                self.hub.dispatch({"type": "resync"})
+            first = False
+            try:
+                ex = await lost
+                logger.warning("events listener lost connection: %s", ex)
+            finally:
+                _listening.set(0)
+                loop.remove_reader(fd)
+                conn.close()
+
+
+listener = Listener(hub)
+
+
+def shutdown() -> None:
+    listener.stop()
+    hub.close_all()
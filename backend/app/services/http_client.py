@@ -0,0 +1,163 @@
+# backend/app/services/http_client.py
+"""
+Shared outbound HTTP client (Graph, VirusTotal, ...).
+
+One pooled keep-alive session per process instead of a fresh TCP+TLS
+handshake per call, plus:
+
+  * per-host concurrency caps (HTTP_MAX_PER_HOST, overrides in
+    HTTP_HOST_LIMITS="www.virustotal.com=2,graph.microsoft.com=8"),
+  * retries with full-jitter exponential back-off on connection errors,
+    429 and 5xx. Retry-After is honoured, and a wait longer than
+    HTTP_RETRY_MAX_WAIT_SECS returns the response instead of sleeping,
+  * http_client_request_seconds{host,method,status} timings.
+
+Non-idempotent requests (POST/PATCH) are only retried when the server
+cannot have acted on them: connection failures, 429, or a 503 carrying
+Retry-After.
+
+`client` is the process-wide instance. It blocks; call it from sync code
+or through run_in_threadpool.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app import telemetry
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))  # distinct hosts kept pooled
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_BASE_SECS = float(os.getenv("HTTP_BACKOFF_BASE_SECS", "0.5"))
+HTTP_BACKOFF_MAX_SECS = float(os.getenv("HTTP_BACKOFF_MAX_SECS", "8"))
+HTTP_RETRY_MAX_WAIT_SECS = float(os.getenv("HTTP_RETRY_MAX_WAIT_SECS", "30"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_timing = telemetry.histogram("http_client_request_seconds", "Outbound HTTP request latency", ["host", "method", "status"])
+_retries = telemetry.counter("http_client_retries", "Outbound HTTP retries", ["host", "reason"])
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    out = {}
+    for part in spec.split(","):
+        host, _, n = part.strip().partition("=")
+        if host and n.strip().isdigit():
+            out[host.lower()] = int(n)
+    return out
+
+
+HOST_LIMITS = _parse_limits(os.getenv("HTTP_HOST_LIMITS", ""))
+
+
+def host_limit(host: str) -> int:
+    return HOST_LIMITS.get(host, HTTP_MAX_PER_HOST)
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int) -> float:
+    """Full jitter: uniform(0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_SECS, HTTP_BACKOFF_BASE_SECS * (2 ** attempt)))
+
+
+def _retry_plan(method: str, status: Optional[int], headers, attempt: int, retries: int) -> Optional[float]:
+    """Delay before retrying, or None to stop. status None = connection failure."""
+    if attempt >= retries:
+        return None
+    hinted = retry_after(headers.get("Retry-After")) if headers is not None else None
+    if status is not None:
+        if status not in RETRY_STATUSES:
+            return None
+        if method not in IDEMPOTENT and not (status == 429 or (status == 503 and hinted is not None)):
+            return None
+    delay = hinted if hinted is not None else backoff(attempt)
+    if delay > HTTP_RETRY_MAX_WAIT_SECS:
+        return None
+    return delay
+
+
+class HttpClient:
+    """Sync client: pooled requests.Session with per-host caps and retries."""
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_MAX_PER_HOST, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _slot(self, host: str):
+        sem = self._slots.get(host)
+        if sem is None:
+            with self._lock:
+                sem = self._slots.setdefault(host, threading.BoundedSemaphore(host_limit(host)))
+        with sem:
+            yield
+
+    def request(self, method: str, url: str, *, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        method = method.upper()
+        host = (urlsplit(url).hostname or "").lower()
+        retries = HTTP_RETRIES if retries is None else retries
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                with self._slot(host):
+                    resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                _timing.observe(time.perf_counter() - t0, host=host, method=method, status="error")
+                # a read timeout may mean the server acted: only retry idempotent calls then
+                safe = isinstance(ex, requests.ConnectionError) or method in IDEMPOTENT
+                delay = _retry_plan(method, None, None, attempt, retries) if safe else None
+                if delay is None:
+                    raise
+                _retries.inc(host=host, reason=type(ex).__name__)
+            else:
+                _timing.observe(time.perf_counter() - t0, host=host, method=method, status=str(resp.status_code))
+                delay = _retry_plan(method, resp.status_code, resp.headers, attempt, retries)
+                if delay is None:
+                    return resp
+                _retries.inc(host=host, reason=str(resp.status_code))
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+client = HttpClient()
@@ -0,0 +1,44 @@
+# backend/app/services/referral_fields.py
+"""
+Column projections for referral listings.
+
+The list pages show only company, status and date, yet each row used to
+carry notes, the environment JSONB, and the opportunity/location arrays.
+Callers can now ask for less:
+
+  * view=summary: SUMMARY_COLUMNS only,
+  * fields=company,status,...: exactly those columns (id is always added).
+
+The result goes straight into the SELECT list. Pruned columns are never
+detoasted, decoded or serialized, and never sent over the wire. Names are
+checked against COLUMNS before they reach the SQL.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import HTTPException
+
+# every column the list endpoints have always returned, in response order
+COLUMNS = ("id", "ref_no", "company", "status", "created_at", "contact_name", "contact_email",
+           "contact_phone", "notes", "agent_id", "opportunity_types", "locations", "environment", "reason")
+SUMMARY_COLUMNS = ("id", "ref_no", "company", "status", "created_at")
+VIEWS = {"full": COLUMNS, "summary": SUMMARY_COLUMNS}
+
+
+def columns(fields: Optional[str] = None, view: str = "full") -> tuple:
+    """Columns to select; 422 on an unknown field or view."""
+    if fields:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = sorted(wanted - set(COLUMNS))
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown field(s): {', '.join(unknown)}")
+        wanted.add("id")
+        return tuple(c for c in COLUMNS if c in wanted)
+    if view not in VIEWS:
+        raise HTTPException(status_code=422, detail=f"Unknown view: {view}")
+    return VIEWS[view]
+
+
+def select_list(cols: tuple) -> str:
+    return ", ".join(cols)
@@ -0,0 +1,143 @@
+# backend/app/services/referral_stats.py
+"""
+Dashboard overview numbers from pre-aggregated referral totals.
+
+Triggers on referrals (alembic migration 2026_10_19_referral_stats) keep two
+small tables in step with every write:
+
+  * referral_status_totals (agent_id, status): row count and estimated
+    commission per status,
+  * referral_daily_totals (agent_id, day): referrals created (on their
+    created_at day), moves into "won", and commission paid (on the row's
+    commission_paid_on day, which the triggers stamp when the amount changes).
+
+overview() reads both in one statement with FILTER aggregates. The cost
+depends on the number of agents and days, not on the number of referrals.
+Results are cached per scope for OVERVIEW_CACHE_TTL_SECS.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+OVERVIEW_CACHE_TTL_SECS = float(os.getenv("OVERVIEW_CACHE_TTL_SECS", "30"))
+OVERVIEW_CACHE_MAX_ENTRIES = int(os.getenv("OVERVIEW_CACHE_MAX_ENTRIES", "10000"))
+
+STATUSES = ["New", "Contacted", "Qualified", "Proposal Sent", "Won", "Lost", "On Hold", "Commission Paid"]
+
+# totals are keyed by lower(status); unassigned referrals live under the zero uuid
+_status_cols = ",\n".join(
+    f"COALESCE(sum(n) FILTER (WHERE status = '{s.lower()}'), 0) AS s{i}" for i, s in enumerate(STATUSES)
+)
+_OVERVIEW_SQL = text(f"""
+    SELECT s.*, d.*
+      FROM (SELECT COALESCE(sum(n), 0) AS total,
+                   COALESCE(sum(estimated_commission)
+                            FILTER (WHERE status IN ('won', 'commission paid')), 0) AS projected,
+                   {_status_cols}
+              FROM referral_status_totals
+             WHERE CAST(:agent AS uuid) IS NULL OR agent_id = CAST(:agent AS uuid)) s
+     CROSS JOIN
+           (SELECT COALESCE(sum(created) FILTER (WHERE day >= :since), 0) AS delta_total,
+                   COALESCE(sum(won) FILTER (WHERE day >= :since), 0) AS delta_won,
+                   COALESCE(sum(commission_paid) FILTER (WHERE day >= :year_start), 0) AS paid_ytd
+              FROM referral_daily_totals
+             WHERE (CAST(:agent AS uuid) IS NULL OR agent_id = CAST(:agent AS uuid))
+               AND day >= LEAST(CAST(:since AS date), CAST(:year_start AS date))) d
+""")
+
+
+def _compute(db: Session, agent_id: Optional[str]) -> dict:
+    today = date.today()
+    row = db.execute(
+        _OVERVIEW_SQL,
+        {"agent": agent_id, "since": today - timedelta(days=30), "year_start": date(today.year, 1, 1)},
+    ).mappings().one()
+    status_counts = {s: int(row[f"s{i}"]) for i, s in enumerate(STATUSES)}
+    return {
+        "total_referrals": int(row["total"]),
+        "delta_total_30d": int(row["delta_total"]),
+        "won_deals": status_counts["Won"],
+        "delta_won_30d": int(row["delta_won"]),
+        "projected_commission": float(row["projected"]),
+        "paid_commissions_ytd": float(row["paid_ytd"]),
+        "status_counts": status_counts,
+    }
+
+
+ZERO_AGENT = "00000000-0000-0000-0000-000000000000"
+
+# totals vs. a direct GROUP BY over referrals, per (agent, status) and per
+# (agent, day), so an amount booked on the wrong day shows up too; any row
+# returned is drift
+_DRIFT_SQL = text(f"""
+    WITH status_direct AS (
+        SELECT COALESCE(agent_id, '{ZERO_AGENT}') AS agent_id, lower(COALESCE(status, '')) AS status,
+               count(*) AS n, COALESCE(sum(estimated_commission), 0) AS estimated_commission
+          FROM referrals GROUP BY 1, 2
+    ), daily_direct AS (
+        SELECT agent_id, day, sum(created) AS created, sum(paid) AS commission_paid
+          FROM (SELECT COALESCE(agent_id, '{ZERO_AGENT}') AS agent_id, created_at::date AS day,
+                       1 AS created, 0 AS paid
+                  FROM referrals
+                UNION ALL
+                SELECT COALESCE(agent_id, '{ZERO_AGENT}'), commission_paid_on, 0, commission_paid
+                  FROM referrals WHERE commission_paid <> 0) r
+         GROUP BY 1, 2
+    )
+    SELECT 'status' AS kind, COALESCE(t.agent_id, d.agent_id)::text AS agent_id,
+           COALESCE(t.status, d.status) AS status, NULL::date AS day,
+           t.n AS total_n, d.n AS direct_n,
+           t.estimated_commission AS total_amount, d.estimated_commission AS direct_amount
+      FROM referral_status_totals t
+      FULL JOIN status_direct d USING (agent_id, status)
+     WHERE COALESCE(t.n, 0) <> COALESCE(d.n, 0)
+        OR COALESCE(t.estimated_commission, 0) <> COALESCE(d.estimated_commission, 0)
+    UNION ALL
+    SELECT 'daily', COALESCE(t.agent_id, d.agent_id)::text, NULL, COALESCE(t.day, d.day),
+           t.created, d.created, t.commission_paid, d.commission_paid
+      FROM referral_daily_totals t
+      FULL JOIN daily_direct d USING (agent_id, day)
+     WHERE COALESCE(t.created, 0) <> COALESCE(d.created, 0)
+        OR COALESCE(t.commission_paid, 0) <> COALESCE(d.commission_paid, 0)
+    ORDER BY 1, 2, 4
+""")
+
+
+def drift(db: Session) -> list:
+    """Where the trigger-maintained totals disagree with referrals (empty when in step)."""
+    return [dict(r) for r in db.execute(_DRIFT_SQL).mappings().all()]
+
+
+_cache: dict = {}
+_lock = threading.Lock()
+
+
+def overview(db: Session, agent_id: Optional[str] = None) -> dict:
+    """Overview for one agent, or everyone when agent_id is None (served from a short TTL cache)."""
+    key = agent_id or "*"
+    now = time.monotonic()
+    hit = _cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    data = _compute(db, agent_id)
+    with _lock:
+        if len(_cache) >= OVERVIEW_CACHE_MAX_ENTRIES:
+            for k in [k for k, (exp, _) in _cache.items() if exp <= now] or list(_cache)[: len(_cache) // 2]:
+                _cache.pop(k, None)
+        _cache[key] = (now + OVERVIEW_CACHE_TTL_SECS, data)
+    return data
+
+
+def invalidate(agent_id: Optional[str] = None) -> None:
+    """Drop cached overviews for an agent (and the global one) after a write in this process."""
+    with _lock:
+        _cache.pop("*", None)
+        if agent_id:
+            _cache.pop(str(agent_id), None)
@@ -0,0 +1,114 @@
+# backend/app/services/reset_tokens.py
+"""
+Password-reset tokens.
+
+Only SHA-256(token) is stored (unique index), so a DB leak does not hand out
+working reset links and lookups are a single index probe. Consuming a token
+is one UPDATE ... RETURNING, so a token cannot be used twice even under
+concurrent requests. A background sweeper deletes used and expired rows in
+small batches so the table (and its indexes) stay small.
+
+The table itself is created by the alembic migration
+2026_10_19_password_reset_tokens.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+RESET_TOKEN_TTL_MIN = int(os.getenv("RESET_TOKEN_TTL_MIN", "60"))
+RESET_TOKEN_SWEEP_SECS = int(os.getenv("RESET_TOKEN_SWEEP_SECS", "600"))
+RESET_TOKEN_SWEEP_BATCH = int(os.getenv("RESET_TOKEN_SWEEP_BATCH", "1000"))
+
+
+def token_hash(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def issue(db: Session, user_id: str) -> str:
+    """Create a token for user_id and return the plaintext (caller commits)."""
+    token = secrets.token_urlsafe(32)
+    db.execute(
+        text("""INSERT INTO password_reset_tokens (user_id, token_hash, expires_at)
+                VALUES (:uid, :h, :exp)"""),
+        {
+            "uid": user_id,
+            "h": token_hash(token),
+            "exp": datetime.now(timezone.utc) + timedelta(minutes=RESET_TOKEN_TTL_MIN),
+        },
+    )
+    return token
+
+
+def consume(db: Session, token: str) -> Optional[str]:
+    """Mark a live token used and return its user_id, or None (caller commits)."""
+    row = db.execute(
+        text("""UPDATE password_reset_tokens
+                   SET used = TRUE
+                 WHERE token_hash = :h AND NOT used AND expires_at > now()
+             RETURNING user_id"""),
+        {"h": token_hash(token)},
+    ).first()
+    return str(row[0]) if row else None
+
+
+def sweep(db: Session, batch: int = RESET_TOKEN_SWEEP_BATCH) -> int:
+    """Delete used/expired tokens in batches; returns rows removed."""
+    total = 0
+    while True:
+        n = db.execute(
+            text("""DELETE FROM password_reset_tokens
+                     WHERE id IN (SELECT id FROM password_reset_tokens
+                                   WHERE used OR expires_at < now()
+                                   LIMIT :n
+                                   FOR UPDATE SKIP LOCKED)"""),
+            {"n": batch},
+        ).rowcount
+        db.commit()
+        total += n
+        if n < batch:
+            return total
+
+
+# ---- background sweeper ------------------------------------------------------
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _sweep_loop():
+    from app.db import SessionLocal
+    while not _stop.wait(RESET_TOKEN_SWEEP_SECS):
+        db = SessionLocal()
+        try:
+            n = sweep(db)
+            if n:
+                logger.info("swept %d used/expired reset tokens", n)
+        except Exception as ex:
+            db.rollback()
+            logger.warning("reset token sweep failed: %s", ex)
+        finally:
+            db.close()
+
+
+def start_sweeper() -> None:
+    global _thread
+    if RESET_TOKEN_SWEEP_SECS <= 0 or (_thread and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_sweep_loop, name="reset-token-sweeper", daemon=True)
+    _thread.start()
+
+
+def stop_sweeper() -> None:
+    _stop.set()
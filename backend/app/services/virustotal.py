@@ -1,12 +1,24 @@
 # backend/app/services/virustotal.py
+import logging
 import os
 import time
 import hashlib
-import requests
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from threading import Lock
 
+from app import telemetry
+from app.services.http_client import client as http
+
+# calls go out with retries=0: every attempt spends quota that
+# VirusTotalRateLimiter records once, and a 429 means the quota is gone anyway
+
+logger = logging.getLogger(__name__)
+
+_quota_used = telemetry.gauge("virustotal_quota_used", "VirusTotal API calls in the current window", ["window"])
+_quota_limit = telemetry.gauge("virustotal_quota_limit", "VirusTotal API call limit per window", ["window"])
+_quota_rejected = telemetry.counter("virustotal_quota_rejected", "VirusTotal calls refused by the local quota", ["window"])
+
 class VirusTotalRateLimiter:
     """
     Rate limiter for VirusTotal API free tier:
@@ -25,28 +37,32 @@ class VirusTotalRateLimiter:
         self.MAX_PER_DAY = 500
         self.MAX_PER_MONTH = 15500
 
+    def _prune(self, now: datetime) -> None:
+        one_min_ago = now - timedelta(minutes=1)
+        one_day_ago = now - timedelta(days=1)
+        one_month_ago = now - timedelta(days=30)
+
+        self.minute_requests = [t for t in self.minute_requests if t > one_min_ago]
+        self.daily_requests = [t for t in self.daily_requests if t > one_day_ago]
+        self.monthly_requests = [t for t in self.monthly_requests if t > one_month_ago]
+
     def can_make_request(self) -> tuple[bool, str]:
         """Check if a request can be made. Returns (allowed, reason)"""
         with self.lock:
-            now = datetime.now()
-
             # Clean old requests
-            one_min_ago = now - timedelta(minutes=1)
-            one_day_ago = now - timedelta(days=1)
-            one_month_ago = now - timedelta(days=30)
-
-            self.minute_requests = [t for t in self.minute_requests if t > one_min_ago]
-            self.daily_requests = [t for t in self.daily_requests if t > one_day_ago]
-            self.monthly_requests = [t for t in self.monthly_requests if t > one_month_ago]
+            self._prune(datetime.now())
 
             # Check limits
             if len(self.minute_requests) >= self.MAX_PER_MINUTE:
+                _quota_rejected.inc(window="minute")
                 return False, f"Rate limit: {self.MAX_PER_MINUTE} requests/minute exceeded"
 
             if len(self.daily_requests) >= self.MAX_PER_DAY:
+                _quota_rejected.inc(window="day")
                 return False, f"Daily quota: {self.MAX_PER_DAY} requests/day exceeded"
 
             if len(self.monthly_requests) >= self.MAX_PER_MONTH:
+                _quota_rejected.inc(window="month")
                 return False, f"Monthly quota: {self.MAX_PER_MONTH} requests/month exceeded"
 
             return True, ""
@@ -62,6 +78,7 @@ class VirusTotalRateLimiter:
     def get_stats(self) -> Dict:
         """Get current usage stats"""
         with self.lock:
+            self._prune(datetime.now())
             return {
                 "minute": len(self.minute_requests),
                 "day": len(self.daily_requests),
@@ -76,6 +93,14 @@ class VirusTotalRateLimiter:
 # Global rate limiter instance
 _rate_limiter = VirusTotalRateLimiter()
 
+
+@telemetry.collector
+def _quota_stats() -> None:
+    stats = _rate_limiter.get_stats()
+    for window in ("minute", "day", "month"):
+        _quota_used.set(stats[window], window=window)
+        _quota_limit.set(stats["limits"][window], window=window)
+
 class VirusTotalScanner:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.environ.get("VIRUSTOTAL_API_KEY")
@@ -100,7 +125,7 @@ class VirusTotalScanner:
         url = f"{self.base_url}/files/{file_hash}"
 
         self.rate_limiter.record_request()
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http.get(url, headers=headers, timeout=30, retries=0)
 
         if response.status_code == 404:
             return None  # File not in database
@@ -126,7 +151,7 @@ class VirusTotalScanner:
         files = {"file": (filename, file_content)}
 
         self.rate_limiter.record_request()
-        response = requests.post(url, headers=headers, files=files, timeout=60)
+        response = http.post(url, headers=headers, files=files, timeout=60, retries=0)
 
         if response.status_code == 200:
             data = response.json()
@@ -148,7 +173,7 @@ class VirusTotalScanner:
         url = f"{self.base_url}/analyses/{analysis_id}"
 
         self.rate_limiter.record_request()
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http.get(url, headers=headers, timeout=30, retries=0)
 
         if response.status_code == 200:
             return response.json()
@@ -214,7 +239,7 @@ class VirusTotalScanner:
 
         except Exception as e:
             # Log error but allow upload (fail open for availability)
-            print(f"VirusTotal scan error: {e}")
+            logger.warning("VirusTotal scan error: %s", e)
             return {
                 "safe": True,
                 "error": str(e),
@@ -0,0 +1,130 @@
+# backend/app/sql_stats.py
+"""
+Per-request SQL accounting.
+
+Engine event hooks time every cursor execution and add it to the stats of
+the request being served. The request is tracked in a contextvar, which
+FastAPI copies into the threadpool for sync endpoints. LogJSONMiddleware
+opens a RequestSQL per request and writes the totals into the access log
+line: query count, total DB time, and the slowest statement's fingerprint.
+
+With SQL_N_PLUS_ONE_WARN=1 (development), a warning is logged the first
+time a single statement fingerprint runs more than SQL_N_PLUS_ONE_THRESHOLD
+times in one request. That is usually a per-row query inside a loop.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app import telemetry
+
+SQL_N_PLUS_ONE_WARN = os.getenv("SQL_N_PLUS_ONE_WARN", "0").lower() in ("1", "true", "yes")
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+logger = logging.getLogger("app.sql")
+
+_queries = telemetry.histogram("db_queries_per_request", "SQL statements executed per request",
+                               buckets=(1, 2, 5, 10, 20, 50, 100))
+_n_plus_one = telemetry.counter("db_n_plus_one_warnings", "Statements repeated past the N+1 threshold in one request")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals replaced by ? and whitespace collapsed (bind names are kept)."""
+    s = _STRING.sub("?", statement)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(?...)", s)
+    return _SPACE.sub(" ", s).strip()[:300]
+
+
+class RequestSQL:
+    __slots__ = ("path", "count", "seconds", "slowest", "slowest_seconds", "by_fingerprint", "warned")
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: Optional[str] = None
+        self.slowest_seconds = 0.0
+        self.by_fingerprint: dict = {}
+        self.warned: set = set()
+
+    def record(self, statement: str, seconds: float) -> None:
+        fp = fingerprint(statement)
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest, self.slowest_seconds = fp, seconds
+        n = self.by_fingerprint[fp] = self.by_fingerprint.get(fp, 0) + 1
+        if SQL_N_PLUS_ONE_WARN and n > SQL_N_PLUS_ONE_THRESHOLD and fp not in self.warned:
+            self.warned.add(fp)
+            _n_plus_one.inc()
+            logger.warning("possible N+1 on %s: statement ran %d times in one request: %s", self.path, n, fp)
+
+    def as_log(self) -> dict:
+        return {
+            "db_queries": self.count,
+            "db_ms": round(self.seconds * 1000, 1),
+            "db_slowest_ms": round(self.slowest_seconds * 1000, 1),
+            "db_slowest": self.slowest,
+        }
+
+
+_current: ContextVar[Optional[RequestSQL]] = ContextVar("request_sql", default=None)
+
+
+def begin(path: str = ""):
+    """Start collecting for the current request; returns a token for end()."""
+    return _current.set(RequestSQL(path))
+
+
+def end(token) -> Optional[RequestSQL]:
+    stats = _current.get()
+    _current.reset(token)
+    if stats is not None:
+        _queries.observe(stats.count)
+    return stats
+
+
+def current() -> Optional[RequestSQL]:
+    return _current.get()
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_stats_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_stats_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def _error(exception_context):
+    starts = exception_context.connection.info.get("sql_stats_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def install(engine) -> None:
+    """Attach the timing hooks to an engine (once)."""
+    if event.contains(engine, "before_cursor_execute", _before):
+        return
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    event.listen(engine, "handle_error", _error)
@@ -0,0 +1,218 @@
+# backend/app/telemetry.py
+"""
+Tiny in-process metrics registry (counters, gauges, histograms).
+
+Kept dependency-free so any module can record a metric without caring
+whether an exporter is installed. Values are per process. exposition()
+renders everything in the Prometheus text format (served at /metrics);
+collector() hooks refresh scrape-time gauges (pool sizes, quotas) first.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+_collectors: list = []
+
+
+def _key(labelnames: Sequence[str], labels: dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(n, "")) for n in labelnames)
+
+
+def _labels(labelnames: Sequence[str], key: Tuple[str, ...]) -> Dict[str, str]:
+    return dict(zip(labelnames, key))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for k, v in items:
+            yield self.name + "_total", _labels(self.labelnames, k), v
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for k, v in items:
+            yield self.name, _labels(self.labelnames, k), v
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(self.labelnames, labels)
+        with self._lock:
+            row = self._values.get(k)
+            if row is None:
+                row = self._values[k] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_key(self.labelnames, labels))
+        return row[-1] if row else 0
+
+    def sum(self, **labels) -> float:
+        row = self._values.get(_key(self.labelnames, labels))
+        return row[-2] if row else 0.0
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for k, row in items:
+            labels = _labels(self.labelnames, k)
+            for i, b in enumerate(self.buckets):
+                yield self.name + "_bucket", {**labels, "le": repr(b)}, row[i]
+            yield self.name + "_bucket", {**labels, "le": "+Inf"}, row[-1]
+            yield self.name + "_sum", labels, row[-2]
+            yield self.name + "_count", labels, row[-1]
+
+
+def _register(cls, name: str, help: str, labelnames: Sequence[str] = (), **kw):
+    with _lock:
+        m = _registry.get(name)
+        if m is None:
+            m = _registry[name] = cls(name, help, labelnames, **kw)
+        return m
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter, name, help, labelnames)
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return _register(Gauge, name, help, labelnames)
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (),
+              buckets: Optional[Sequence[float]] = None) -> Histogram:
+    return _register(Histogram, name, help, labelnames, buckets=buckets or DEFAULT_BUCKETS)
+
+
+def all_metrics() -> list:
+    with _lock:
+        return list(_registry.values())
+
+
+def collector(fn: Callable[[], None]) -> Callable[[], None]:
+    """Register fn to run before each exposition (usable as a decorator)."""
+    with _lock:
+        _collectors.append(fn)
+    return fn
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def exposition() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    for fn in list(_collectors):
+        try:
+            fn()
+        except Exception:
+            pass  # a broken collector must not take the scrape down
+    out = []
+    for m in sorted(all_metrics(), key=lambda m: m.name):
+        out.append(f"# HELP {m.name} {_escape(m.help)}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        for name, labels, value in m.samples():
+            if labels:
+                body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                out.append(f"{name}{{{body}}} {_number(value)}")
+            else:
+                out.append(f"{name} {_number(value)}")
+    return "\n".join(out) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def serve(port: int, host: str = "0.0.0.0") -> None:
+    """Expose /metrics on a daemon thread, for worker processes without a web app."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
@@ -0,0 +1,19 @@
+# backend/loadtest/__init__.py
+"""
+Load tests against a local stack.
+
+  1. Seed a scratch Postgres with synthetic agents, admins, referrals, audit
+     history and file metadata:
+
+         DATABASE_URL=postgresql://... python -m loadtest.seed --referrals 1000000
+
+  2. Start the API with login throttling and MFA out of the way
+     (RATE_LIMIT_ENABLED=0 REQUIRE_MFA=false), then replay the agent/admin
+     traffic mix and compare against the committed baseline:
+
+         python -m loadtest.run --base-url http://localhost:8000 --duration 120
+
+Every seeded account is on the loadtest.invalid domain and uses one shared
+password, so `python -m loadtest.seed --reset` removes the whole data set.
+Never point either command at a shared database.
+"""
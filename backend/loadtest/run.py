@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Replay the agent/admin traffic mix and report per-endpoint latency.
+
+    python -m loadtest.run --base-url http://localhost:8000 [--agents 40] [--admins 4]
+        [--duration 120] [--warmup 15] [--out results.json] [--baseline loadtest/baseline.json]
+        [--save-baseline] [--tolerance 0.25]
+
+Prints throughput, error count and p50/p90/p95/p99/max per endpoint. The
+full result is written with --out. With --baseline (the default is the
+committed one), the exit status is 1 when an endpoint's p95 or error rate
+regressed beyond --tolerance, and 2 when the baseline holds no numbers, so
+CI never mistakes "nothing to compare" for a pass. With --save-baseline, the
+run becomes the new baseline.
+
+Requires httpx (pip install -r loadtest/requirements.txt) and data from
+loadtest.seed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import httpx
+except ImportError:  # only needed to run, not to import the report helpers
+    httpx = None
+
+BASELINE = Path(__file__).parent / "baseline.json"
+# p95 changes smaller than this are noise at these latencies
+MIN_REGRESSION_MS = 5.0
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class Stats:
+    def __init__(self):
+        self.samples: dict = defaultdict(list)
+        self.errors: dict = defaultdict(int)
+        self.statuses: dict = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+        self.started = self.stopped = 0.0
+
+    def start(self) -> None:
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording = False
+        self.stopped = time.perf_counter()
+
+    def record(self, name: str, seconds: float, status: int, error: str = "") -> None:
+        if not self.recording:
+            return
+        self.samples[name].append(seconds)
+        self.statuses[name][error or status] += 1
+        if error or status >= 400:
+            self.errors[name] += 1
+
+    def summary(self) -> dict:
+        elapsed = max(self.stopped - self.started, 1e-9)
+        out = {}
+        for name in sorted(self.samples):
+            lat = sorted(s * 1000 for s in self.samples[name])
+            out[name] = {
+                "count": len(lat),
+                "errors": self.errors[name],
+                "rps": round(len(lat) / elapsed, 2),
+                **{f"p{q}_ms": round(percentile(lat, q), 1) for q in (50, 90, 95, 99)},
+                "max_ms": round(lat[-1], 1),
+                "statuses": {str(k): v for k, v in self.statuses[name].items()},
+            }
+        return out
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of `current` against `baseline` (both summary() dicts)."""
+    problems = []
+    for name, base in baseline.items():
+        cur = current.get(name)
+        if cur is None:
+            problems.append(f"{name}: not exercised in this run")
+            continue
+        limit = base["p95_ms"] * (1 + tolerance)
+        if cur["p95_ms"] > limit and cur["p95_ms"] - base["p95_ms"] >= MIN_REGRESSION_MS:
+            problems.append(f"{name}: p95 {cur['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        base_rate = base["errors"] / max(base["count"], 1)
+        cur_rate = cur["errors"] / max(cur["count"], 1)
+        if cur_rate > base_rate + max(0.01, base_rate * tolerance):
+            problems.append(f"{name}: error rate {cur_rate:.1%} vs baseline {base_rate:.1%}")
+    return problems
+
+
+def print_table(summary: dict) -> None:
+    print(f"{'endpoint':<38}{'count':>8}{'err':>6}{'rps':>8}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>9}")
+    for name, s in summary.items():
+        print(f"{name:<38}{s['count']:>8}{s['errors']:>6}{s['rps']:>8.1f}{s['p50_ms']:>8.1f}"
+              f"{s['p90_ms']:>8.1f}{s['p95_ms']:>8.1f}{s['p99_ms']:>8.1f}{s['max_ms']:>9.1f}")
+
+
+async def _user_loop(user, deadline: float) -> None:
+    if not await user.login():
+        return
+    while time.perf_counter() < deadline:
+        await user.step()
+        await asyncio.sleep(user.rng.expovariate(1 / user.think) if user.think > 0 else 0)
+
+
+async def run(args) -> dict:
+    from loadtest.scenarios import make_users
+
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.agents + args.admins)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+        users = make_users(client, stats, args.agents, args.admins, args.seeded_agents,
+                           args.seeded_admins, args.seed, args.think_ms)
+        deadline = time.perf_counter() + args.warmup + args.duration
+
+        async def measure():
+            await asyncio.sleep(args.warmup)
+            stats.start()
+            await asyncio.sleep(args.duration)
+            stats.stop()
+
+        await asyncio.gather(measure(), *(_user_loop(u, deadline) for u in users))
+    return stats.summary()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--base-url", default="http://localhost:8000")
+    ap.add_argument("--agents", type=int, default=40, help="concurrent virtual agents")
+    ap.add_argument("--admins", type=int, default=4, help="concurrent virtual admins")
+    ap.add_argument("--seeded-agents", type=int, default=2000, help="--agents given to loadtest.seed")
+    ap.add_argument("--seeded-admins", type=int, default=20, help="--admins given to loadtest.seed")
+    ap.add_argument("--think-ms", type=float, default=500, help="mean pause between tasks per user")
+    ap.add_argument("--duration", type=float, default=120, help="measured seconds")
+    ap.add_argument("--warmup", type=float, default=15, help="unmeasured seconds before that")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the full result as JSON")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth (0.25 = +25%%)")
+    args = ap.parse_args()
+    if httpx is None:
+        sys.exit("httpx is required: pip install -r loadtest/requirements.txt")
+
+    summary = asyncio.run(run(args))
+    print_table(summary)
+    result = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "config": {k: getattr(args, k) for k in ("agents", "admins", "seeded_agents", "seeded_admins",
+                                                  "think_ms", "duration", "warmup", "seed")},
+        "endpoints": summary,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2) + "\n")
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    path = Path(args.baseline)
+    baseline = json.loads(path.read_text()) if path.exists() else {}
+    if not baseline.get("endpoints"):
+        print(f"no baseline numbers in {path}; record them on the reference setup with --save-baseline")
+        sys.exit(2)
+    if baseline.get("config") != result["config"]:
+        print("warning: run config differs from the baseline's; comparison is indicative only")
+    problems = compare(summary, baseline["endpoints"], args.tolerance)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# backend/loadtest/scenarios.py
+"""
+Scripted traffic for the load runner.
+
+A virtual user logs in once and then loops: it picks a weighted task, runs
+it, and waits a think time before the next one. Each request is recorded
+under its route template (GET /referrals/{id}/files), so results stay
+comparable between runs. The mixes approximate the frontend: the agent
+dashboard is /users/me, /admin/announcements, /referrals/my and /overview, and
+the admin pages page through /admin/referrals and /admin/users.
+"""
+from __future__ import annotations
+
+import os
+import random
+import time
+
+from loadtest.seed import OPPORTUNITIES, CITIES, PASSWORD, admin_email, agent_email, company, environment
+
+
+class VirtualUser:
+    tasks: list = []  # [(weight, method name)]
+
+    def __init__(self, client, stats, email: str, rng: random.Random, think_ms: float):
+        self.client = client
+        self.stats = stats
+        self.email = email
+        self.rng = rng
+        self.think = think_ms / 1000.0
+        self.headers: dict = {}
+        self.referral_ids: list = []
+
+    async def request(self, name: str, method: str, url: str, **kw):
+        t0 = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, headers=self.headers, **kw)
+        except Exception as ex:
+            self.stats.record(name, time.perf_counter() - t0, 0, error=type(ex).__name__)
+            return None
+        self.stats.record(name, time.perf_counter() - t0, resp.status_code)
+        return resp
+
+    async def login(self) -> bool:
+        resp = await self.request("POST /token", "POST", "/token",
+                                  data={"username": self.email, "password": PASSWORD})
+        if resp is None or resp.status_code != 200 or "access_token" not in resp.json():
+            return False
+        self.headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+        return True
+
+    async def step(self) -> None:
+        weights, names = zip(*self.tasks)
+        await getattr(self, self.rng.choices(names, weights=weights)[0])()
+
+    def _pick_referral(self):
+        return self.rng.choice(self.referral_ids) if self.referral_ids else None
+
+
+class Agent(VirtualUser):
+    tasks = [(40, "dashboard"), (10, "create_referral"), (6, "update_referral"),
+             (10, "list_files"), (4, "upload_file"), (2, "relogin")]
+
+    async def dashboard(self) -> None:
+        await self.request("GET /users/me", "GET", "/users/me")
+        await self.request("GET /admin/announcements", "GET", "/admin/announcements")
+        resp = await self.request("GET /referrals/my", "GET", "/referrals/my", params={"limit": 50})
+        if resp is not None and resp.status_code == 200:
+            self.referral_ids = [r["id"] for r in resp.json()][:50] or self.referral_ids
+        await self.request("GET /overview", "GET", "/overview")
+
+    async def create_referral(self) -> None:
+        rng = self.rng
+        resp = await self.request("POST /referrals", "POST", "/referrals", json={
+            "company": company(rng),
+            "contact_name": "Load Test",
+            "contact_email": "contact@example.com",
+            "contact_phone": "555-0100",
+            "opportunity_types": rng.sample(OPPORTUNITIES, rng.randint(1, 3)),
+            "locations": rng.sample(CITIES, 1),
+            "environment": environment(rng),
+            "reason": "load test",
+        })
+        if resp is not None and resp.status_code == 200:
+            self.referral_ids.insert(0, resp.json()["id"])
+
+    async def update_referral(self) -> None:
+        rid = self._pick_referral()
+        if rid:
+            await self.request("PATCH /referrals/{id}", "PATCH", f"/referrals/{rid}",
+                               json={"notes": f"follow-up {self.rng.randint(1, 10**6)}"})
+
+    async def list_files(self) -> None:
+        rid = self._pick_referral()
+        if rid:
+            await self.request("GET /referrals/{id}/files", "GET", f"/referrals/{rid}/files")
+
+    async def upload_file(self) -> None:
+        rid = self._pick_referral()
+        if rid:
+            size = self.rng.choice([20_000, 200_000, 1_000_000])
+            await self.request("POST /referrals/{id}/files", "POST", f"/referrals/{rid}/files",
+                               files={"file": ("survey.pdf", os.urandom(size), "application/pdf")})
+
+    async def relogin(self) -> None:
+        await self.login()
+
+
+class Admin(VirtualUser):
+    tasks = [(35, "list_referrals"), (15, "list_referrals_deep"), (15, "list_users"),
+             (15, "overview"), (10, "update_referral")]
+
+    async def list_referrals(self) -> None:
+        resp = await self.request("GET /admin/referrals", "GET", "/admin/referrals", params={"limit": 50})
+        if resp is not None and resp.status_code == 200:
+            self.referral_ids = [r["id"] for r in resp.json()["items"]] or self.referral_ids
+
+    async def list_referrals_deep(self) -> None:
+        # later pages: OFFSET cost grows with the table
+        offset = 50 * self.rng.randint(1, 400)
+        await self.request("GET /admin/referrals?offset=deep", "GET", "/admin/referrals",
+                           params={"limit": 50, "offset": offset})
+
+    async def list_users(self) -> None:
+        await self.request("GET /admin/users", "GET", "/admin/users",
+                           params={"limit": 50, "offset": 50 * self.rng.randint(0, 20)})
+
+    async def overview(self) -> None:
+        await self.request("GET /overview", "GET", "/overview")
+
+    async def update_referral(self) -> None:
+        rid = self._pick_referral()
+        if rid:
+            await self.request("PATCH /admin/referrals/{id}", "PATCH", f"/admin/referrals/{rid}",
+                               json={"status": self.rng.choice(["Contacted", "Qualified", "Proposal Sent"])})
+
+
+def make_users(client, stats, agents: int, admins: int, seeded_agents: int, seeded_admins: int,
+               seed: int, think_ms: float) -> list:
+    rng = random.Random(seed)
+    # agent000000 owns the most referrals (seed skew); keep one of it in every run
+    users = [Agent(client, stats, agent_email(rng.randrange(seeded_agents) if i else 0),
+                   random.Random(rng.random()), think_ms)
+             for i in range(agents)]
+    users += [Admin(client, stats, admin_email(rng.randrange(seeded_admins)), random.Random(rng.random()), think_ms)
+              for _ in range(admins)]
+    return users
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Synthetic data for load tests.
+
+    DATABASE_URL=postgresql://... python -m loadtest.seed [--agents 2000] [--admins 20]
+        [--referrals 1000000] [--files-per-referral 0.3] [--seed 1] [--reset]
+
+Rows are generated in Python from a fixed RNG seed and streamed in with
+COPY. Each table goes in batch by batch, so memory stays flat at 1M
+referrals. Referral ownership is skewed: a few agents own most rows, as in
+production, so /referrals/my sees both small and very large lists.
+Deployments disagree on whether referrals.opportunity_types, locations and
+environment are text[], jsonb or text. The column types are read from
+information_schema and each value is written to match.
+
+The referral_totals triggers fire as usual, so /overview is correct
+afterwards.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+
+DOMAIN = "loadtest.invalid"
+PASSWORD = os.getenv("LOADTEST_PASSWORD", "loadtest-password-2026")
+BATCH = 20000
+
+STATUSES = [("New", 30), ("Contacted", 20), ("Qualified", 14), ("Proposal Sent", 10), ("Won", 9),
+            ("Lost", 10), ("On Hold", 4), ("Commission Paid", 3)]
+OPPORTUNITIES = ["Managed IT", "Hosted Voice / Phone", "Network / Wi-Fi", "Structured Cabling",
+                 "Cybersecurity", "Cloud Migration", "Backup / DR"]
+CITIES = ["Austin, TX", "Dallas, TX", "Denver, CO", "Phoenix, AZ", "Atlanta, GA", "Chicago, IL",
+          "Columbus, OH", "Nashville, TN", "Raleigh, NC", "Tampa, FL", "Seattle, WA", "Boise, ID"]
+PHONE_PROVIDERS = ["RingCentral", "8x8", "Verizon", "AT&T", "Comcast Business", "Teams Phone", "Zoom Phone"]
+ISPS = ["Comcast Business", "Spectrum", "AT&T Fiber", "Verizon Fios", "Lumen", "Cox Business"]
+IT_MODELS = ["In-house", "MSP", "Co-managed", "Break/fix", "None"]
+WORDS = ["Acme", "Summit", "Pioneer", "Blue", "Granite", "Harbor", "Cedar", "North", "Atlas", "Vertex",
+         "Lakeside", "Union", "Keystone", "Prairie", "Metro", "Liberty", "Evergreen", "Iron", "Silver"]
+SUFFIXES = ["Dental", "Logistics", "Law Group", "Manufacturing", "Realty", "Clinic", "Partners",
+            "Construction", "Foods", "Accounting", "Insurance", "Academy"]
+FIRST = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST = ["Garcia", "Smith", "Nguyen", "Johnson", "Patel", "Brown", "Kim", "Lopez", "Miller", "Davis"]
+FILE_TYPES = [("proposal.pdf", "application/pdf", 350_000), ("site-survey.xlsx",
+              "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 80_000),
+              ("bill.pdf", "application/pdf", 150_000), ("photo.jpg", "image/jpeg", 2_000_000)]
+
+
+def agent_email(i: int) -> str:
+    return f"agent{i:06d}@{DOMAIN}"
+
+
+def admin_email(i: int) -> str:
+    return f"admin{i:03d}@{DOMAIN}"
+
+
+# ---- COPY text format ----
+
+def _copy_field(v) -> str:
+    if v is None:
+        return r"\N"
+    s = v if isinstance(v, str) else str(v)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(cur, table: str, columns: list, rows) -> int:
+    buf = io.StringIO()
+    n = 0
+    for row in rows:
+        buf.write("\t".join(_copy_field(v) for v in row))
+        buf.write("\n")
+        n += 1
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+    return n
+
+
+def _pg_array(items: list) -> str:
+    return "{" + ",".join('"' + s.replace("\\", "\\\\").replace('"', '\\"') + '"' for s in items) + "}"
+
+
+def encode(value, data_type: str):
+    """Render a list/dict for a column that may be text[], jsonb or text."""
+    if data_type == "ARRAY":
+        return _pg_array(list(value))
+    return json.dumps(value, separators=(",", ":"))
+
+
+def column_types(cur, table: str) -> dict:
+    cur.execute("SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = %s", (table,))
+    return dict(cur.fetchall())
+
+
+# ---- generators ----
+
+def company(rng: random.Random) -> str:
+    return f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(SUFFIXES)}"
+
+
+def environment(rng: random.Random) -> dict:
+    env = {
+        "users": rng.choice([5, 10, 15, 25, 40, 60, 100, 150, 250, 500]),
+        "phone_provider": rng.choice(PHONE_PROVIDERS),
+        "internet_provider": rng.choice(ISPS),
+        "internet_bandwidth_mbps": str(rng.choice([100, 300, 500, 1000, 2000])),
+        "it_model": rng.choice(IT_MODELS),
+    }
+    # older referrals were captured with fewer fields
+    for key in list(env):
+        if rng.random() < 0.15:
+            del env[key]
+    if rng.random() < 0.3:
+        env["sites"] = rng.randint(1, 12)
+        env["workstations"] = {"windows": rng.randint(0, 300), "mac": rng.randint(0, 60)}
+    return env
+
+
+def referral_rows(rng, args, agents: list, types: dict, start_no: int):
+    now = datetime.now(timezone.utc)
+    weights = [1.0 / (i + 1) ** 0.8 for i in range(len(agents))]
+    cum, total = [], 0.0
+    for w in weights:
+        total += w
+        cum.append(total)
+    statuses, status_w = zip(*STATUSES)
+    for i in range(args.referrals):
+        rid = uuid.uuid4()
+        agent = rng.choices(agents, cum_weights=cum)[0]
+        created = now - timedelta(seconds=rng.randint(0, args.days * 86400))
+        status = rng.choices(statuses, weights=status_w)[0]
+        estimated = round(rng.uniform(500, 25000), 2)
+        paid = estimated if status == "Commission Paid" else 0
+        opp = rng.sample(OPPORTUNITIES, rng.randint(1, 3))
+        locs = rng.sample(CITIES, rng.choice([1, 1, 1, 2, 3]))
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        yield (
+            rid, agent, created, status,
+            (
+                str(rid), f"LT-{start_no + i:07d}", company(rng), status,
+                name, f"{name.lower().replace(' ', '.')}@example.com", f"555-{rng.randint(1000000, 9999999)}",
+                rng.choice([None, "", "Met at a trade show.", "Existing customer of a partner.",
+                            "Renewal due next quarter; wants quotes before then."]),
+                str(agent),
+                encode(opp, types.get("opportunity_types", "jsonb")),
+                encode(locs, types.get("locations", "jsonb")),
+                encode(environment(rng), types.get("environment", "jsonb")),
+                rng.choice([None, "Unhappy with current provider", "Office move", "Growth", "Cost"]),
+                estimated, paid, created.isoformat(),
+            ),
+        )
+
+
+REFERRAL_COLUMNS = ["id", "ref_no", "company", "status", "contact_name", "contact_email", "contact_phone",
+                    "notes", "agent_id", "opportunity_types", "locations", "environment", "reason",
+                    "estimated_commission", "commission_paid", "created_at"]
+
+
+def audit_rows(rng, rid, agent, admins, created, status, has_meta: bool):
+    def row(actor, action, at, meta):
+        base = (str(actor), action, "referral", str(rid))
+        tail = (json.dumps(meta),) if has_meta else ()
+        return base + tail + (at.isoformat(),)
+
+    yield row(agent, "referral.created", created, {})
+    at = created
+    for _ in range(rng.choice([0, 0, 1, 1, 2, 3, 4])):
+        at = at + timedelta(hours=rng.randint(1, 240))
+        actor = rng.choice(admins) if rng.random() < 0.6 else agent
+        yield row(actor, "referral.updated", at, {"fields": rng.sample(["status", "notes", "contact_phone",
+                                                                         "estimated_commission"], 1)})
+    if status != "New":
+        yield row(rng.choice(admins), "referral.updated", at + timedelta(hours=1), {"status": status})
+
+
+def file_rows(rng, rid, created, count: int):
+    for _ in range(count):
+        name, ctype, size = rng.choice(FILE_TYPES)
+        fid = uuid.uuid4()
+        meta = {"virus_scan": {"safe": True, "stats": {"malicious": 0, "suspicious": 0, "harmless": 0,
+                                                        "undetected": rng.randint(55, 70)}}}
+        yield (str(fid), str(rid), name, int(size * rng.uniform(0.3, 1.5)), ctype,
+               f"referrals/{rid}/{fid}", json.dumps(meta),
+               (created + timedelta(minutes=rng.randint(1, 600))).isoformat())
+
+
+# ---- commands ----
+
+def reset(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM audit_event WHERE actor_user_id IN (SELECT id FROM users WHERE email LIKE '%@{DOMAIN}')")
+        cur.execute(f"DELETE FROM referrals WHERE agent_id IN (SELECT id FROM users WHERE email LIKE '%@{DOMAIN}')")
+        cur.execute(f"DELETE FROM users WHERE email LIKE '%@{DOMAIN}'")
+    conn.commit()
+
+
+def seed(conn, args) -> None:
+    from app.security.passwords import hash_password
+
+    rng = random.Random(args.seed)
+    pw_hash = hash_password(PASSWORD)  # one hash for every account; login cost is still real
+    now = datetime.now(timezone.utc).isoformat()
+    cur = conn.cursor()
+
+    user_types = column_types(cur, "users")
+    cols = ["id", "email", "first_name", "last_name", "role", "password_hash", "created_at"]
+    if "is_active" in user_types:
+        cols.append("is_active")
+    agents = [uuid.uuid4() for _ in range(args.agents)]
+    admins = [uuid.uuid4() for _ in range(args.admins)]
+
+    def users():
+        for ids, role, email in ((agents, "AZOR", agent_email), (admins, "COVENANT", admin_email)):
+            for i, uid in enumerate(ids):
+                row = [str(uid), email(i), rng.choice(FIRST), rng.choice(LAST), role, pw_hash, now]
+                if "is_active" in user_types:
+                    row.append("t")
+                yield row
+
+    copy_rows(cur, "users", cols, users())
+    conn.commit()
+    print(f"users: {args.agents} agents, {args.admins} admins")
+
+    types = column_types(cur, "referrals")
+    has_meta = "meta" in column_types(cur, "audit_event")
+    audit_cols = ["actor_user_id", "action", "entity_type", "entity_id"] + (["meta"] if has_meta else []) + ["created_at"]
+    file_cols = ["id", "referral_id", "name", "size_bytes", "content_type", "storage_path", "metadata", "created_at"]
+    cur.execute("SELECT count(*) FROM referrals WHERE ref_no LIKE 'LT-%'")
+    start_no = cur.fetchone()[0] + 1
+
+    t0 = time.perf_counter()
+    done = audits = files = 0
+    gen = referral_rows(rng, args, agents, types, start_no)
+    while done < args.referrals:
+        batch = [r for _, r in zip(range(BATCH), gen)]
+        if not batch:
+            break
+        copy_rows(cur, "referrals", REFERRAL_COLUMNS, (r[4] for r in batch))
+        audits += copy_rows(cur, "audit_event", audit_cols,
+                            (a for rid, agent, created, status, _ in batch
+                             for a in audit_rows(rng, rid, agent, admins, created, status, has_meta)))
+        files += copy_rows(cur, "referral_files", file_cols,
+                           (f for rid, _, created, _, _ in batch
+                            for f in file_rows(rng, rid, created, _poisson(rng, args.files_per_referral))))
+        conn.commit()
+        done += len(batch)
+        rate = done / (time.perf_counter() - t0)
+        print(f"referrals: {done}/{args.referrals} ({rate:.0f}/s), audit events: {audits}, files: {files}")
+
+    cur.execute("ANALYZE users; ANALYZE referrals; ANALYZE audit_event; ANALYZE referral_files")
+    conn.commit()
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    # Knuth; means here are small
+    limit, k, p = math.exp(-mean), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--agents", type=int, default=2000)
+    ap.add_argument("--admins", type=int, default=20)
+    ap.add_argument("--referrals", type=int, default=1_000_000)
+    ap.add_argument("--files-per-referral", type=float, default=0.3)
+    ap.add_argument("--days", type=int, default=730, help="spread created_at over this many days")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--reset", action="store_true", help="delete previously seeded data and exit")
+    args = ap.parse_args()
+
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        sys.exit("set DATABASE_URL to a scratch database")
+    conn = create_engine(url).raw_connection()
+    try:
+        if args.reset:
+            reset(conn)
+            print("load-test data removed")
+        else:
+            seed(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
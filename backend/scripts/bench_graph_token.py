@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Per-send Graph token latency: the old per-call path (read cache file, build a
+new PublicClientApplication with authority discovery, acquire_token_silent,
+rewrite the file) vs graph_mail._token() (process-wide client, in-memory
+token).
+
+Needs MS_GRAPH_CLIENT_ID/TENANT_ID and a seeded BOT_CACHE_PATH (auth_graph.py).
+Makes no sendMail calls.
+
+    python scripts/bench_graph_token.py [--rounds 20]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import msal
+
+from app import graph_mail
+from app.config import settings
+
+
+def legacy_token():
+    p = Path(settings.BOT_CACHE_PATH)
+    cache = msal.SerializableTokenCache()
+    if p.exists():
+        cache.deserialize(p.read_text(encoding="utf-8"))
+    app = msal.PublicClientApplication(
+        client_id=settings.MS_GRAPH_CLIENT_ID,
+        authority=f"https://login.microsoftonline.com/{settings.MS_GRAPH_TENANT_ID}",
+        token_cache=cache,
+    )
+    accts = app.get_accounts()
+    res = app.acquire_token_silent(graph_mail.SCOPE, account=accts[0] if accts else None)
+    p.write_text(cache.serialize(), encoding="utf-8")
+    return res["access_token"]
+
+
+def _time(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+    if not settings.MS_GRAPH_CLIENT_ID or not Path(settings.BOT_CACHE_PATH).exists():
+        sys.exit("configure MS_GRAPH_* and seed BOT_CACHE_PATH with auth_graph.py first")
+
+    print(f"{'path':<10}{'median ms':>12}{'max ms':>10}")
+    for name, fn in (("legacy", legacy_token), ("cached", graph_mail._token)):
+        med, worst = _time(fn, args.rounds)
+        print(f"{name:<10}{med:>12.2f}{worst:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
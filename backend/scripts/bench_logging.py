@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Caller-side cost of one access log line: the old path (json.dumps plus a
+synchronous StreamHandler write on the calling thread) vs app.logs (copy
+the record onto a queue; a listener thread encodes and writes).
+
+Both write to the same file so the I/O is comparable. Only the time spent
+on the calling thread (the event loop, in the app) is measured.
+--write-delay-us simulates a slow stdout, e.g. a container log pipe under
+back-pressure.
+
+    python scripts/bench_logging.py [--records 50000] [--write-delay-us 0]
+"""
+import argparse
+import json
+import logging
+import queue
+import statistics
+import sys
+import time
+from logging.handlers import QueueListener
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import logs
+
+FIELDS = {"type": "access", "request_id": "0f0e8a4c-3a8e-4d36-9d39-5f3d0c1d2b7a", "method": "GET",
+          "path": "/referrals/my", "route": "/referrals/my", "status": 200, "duration_ms": 12,
+          "client_ip": "10.0.0.8", "db_queries": 3, "db_ms": 4.2, "db_slowest_ms": 2.1,
+          "db_slowest": "SELECT id, ref_no FROM referrals WHERE agent_id = %(uid)s"}
+
+
+class SlowSink:
+    def __init__(self, f, delay: float):
+        self.f, self.delay = f, delay
+
+    def write(self, s):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.f.write(s)
+
+    def flush(self):
+        self.f.flush()
+
+
+def _run(logger: logging.Logger, n: int, emit) -> list:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        emit(logger)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=50000)
+    ap.add_argument("--out", default="/tmp/bench-log.jsonl")
+    ap.add_argument("--write-delay-us", type=float, default=0)
+    args = ap.parse_args()
+
+    with open(args.out, "w") as f:
+        sink = SlowSink(f, args.write_delay_us / 1e6)
+        old = logging.getLogger("bench.old")
+        old.propagate = False
+        old.addHandler(logging.StreamHandler(sink))
+        old.setLevel(logging.INFO)
+        before = _run(old, args.records, lambda lg: lg.info(json.dumps(FIELDS)))
+
+        q: queue.Queue = queue.Queue(maxsize=args.records + 1)
+        out = logging.StreamHandler(sink)
+        out.setFormatter(logs.JsonFormatter())
+        listener = QueueListener(q, out)
+        listener.start()
+        new = logging.getLogger("bench.new")
+        new.propagate = False
+        new.addHandler(logs._NonBlockingQueueHandler(q))
+        new.setLevel(logging.INFO)
+        after = _run(new, args.records, lambda lg: lg.info("access", extra={"fields": FIELDS}))
+        listener.stop()
+
+    print(f"encoder: {logs.ENCODER}, write delay {args.write_delay_us:g} us")
+    print(f"{'path':<28}{'median us':>12}{'p99 us':>10}")
+    for name, s in (("sync json.dumps + write", before), ("queue handler (app.logs)", after)):
+        s.sort()
+        print(f"{name:<28}{statistics.median(s) * 1e6:>12.1f}{s[int(len(s) * 0.99)] * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Peak memory of building/sending one email with large attachments: the old
+inline path (bytes() copy, base64 of everything, one JSON body) vs
+graph_mail.send_mail (upload sessions streamed in chunks).
+
+Sends to a local stand-in Graph server; the attachment blobs themselves are
+allocated before measuring, as they would sit in the database.
+
+    python scripts/bench_mail_memory.py [--files 3] [--mb 25]
+"""
+import argparse
+import base64
+import json
+import sys
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import graph_mail
+from app.services.http_client import client as http
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _drain_and_reply(self, body=None):
+        n = int(self.headers.get("Content-Length") or 0)
+        while n:
+            n -= len(self.rfile.read(min(n, 1 << 20)))
+        data = json.dumps(body or {}).encode()
+        self.send_response(201 if body and "id" in body else 202)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path == "/me/messages":
+            self._drain_and_reply({"id": "m1"})
+        elif self.path.endswith("/createUploadSession"):
+            self._drain_and_reply({"uploadUrl": f"http://127.0.0.1:{self.server.server_address[1]}/upload"})
+        else:
+            self._drain_and_reply()
+
+    do_PUT = do_POST
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_send(base, to, subject, body, attachments):
+    payload = {"message": {"subject": subject, "body": {"contentType": "Text", "content": body},
+                           "toRecipients": [{"emailAddress": {"address": a}} for a in to],
+                           "attachments": []}, "saveToSentItems": "true"}
+    for att in attachments:
+        content = bytes(att["content"])
+        payload["message"]["attachments"].append({
+            "@odata.type": "#microsoft.graph.fileAttachment", "name": att["name"],
+            "contentType": "application/octet-stream",
+            "contentBytes": base64.b64encode(content).decode("utf-8"),
+        })
+    http.post(f"{base}/me/sendMail", json=payload, timeout=60)
+
+
+def measure(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=3)
+    ap.add_argument("--mb", type=int, default=25)
+    args = ap.parse_args()
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    graph_mail.GRAPH_API_BASE = base
+    graph_mail._token = lambda: "bench"
+
+    blobs = [memoryview(bytes(args.mb * 2**20)) for _ in range(args.files)]
+    legacy_atts = [{"name": f"f{i}.bin", "content": b} for i, b in enumerate(blobs)]
+    stream_atts = [{"name": f"f{i}.bin", "size": len(b), "read": (lambda b: lambda o, n: b[o:o + n])(b)}
+                   for i, b in enumerate(blobs)]
+
+    total = args.files * args.mb
+    legacy = measure(lambda: legacy_send(base, ["a@example.com"], "s", "b", legacy_atts))
+    streamed = measure(lambda: graph_mail.send_mail(["a@example.com"], "s", "b", attachments=stream_atts))
+    print(f"{args.files} x {args.mb} MB attachments ({total} MB total)")
+    print(f"{'path':<10}{'peak MB':>10}")
+    print(f"{'legacy':<10}{legacy:>10.1f}")
+    print(f"{'streamed':<10}{streamed:>10.1f}")
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Requests/sec through the full middleware stack: BaseHTTPMiddleware layers
+(before) vs the raw ASGI middlewares in app/ (after).
+
+Requests go in-process through httpx's ASGI transport, so the numbers are
+middleware + routing overhead only (no sockets, no DB). The "before" stack is
+a faithful copy of the old dispatch() bodies kept here for comparison.
+
+    python scripts/bench_middleware.py [--requests 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("ENABLE_CSP", "true")
+os.environ.setdefault("ENABLE_HSTS", "true")
+os.environ.setdefault("RATE_LIMIT_READ_PER_MIN", "100000000")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from app import security_middleware
+from app.middleware import csp, log_json, rate_limit
+
+logging.getLogger("app.log_json").disabled = True
+
+SETTINGS = SimpleNamespace(
+    CSP_DEFAULT_SRC="'self'", CSP_IMG_SRC="'self' data:", CSP_SCRIPT_SRC="'self'",
+    CSP_STYLE_SRC="'self'", CSP_CONNECT_SRC="'self'", CSP_FRAME_ANCESTORS="'none'",
+    REFERRER_POLICY="strict-origin-when-cross-origin", is_prod=True, ENABLE_HSTS=True,
+    HSTS_MAX_AGE=63072000,
+)
+
+
+# ---- before: the old BaseHTTPMiddleware implementations ----
+
+class OldLogJSON(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start = time.time()
+        req_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        response = await call_next(request)
+        log_json.logger.info(json.dumps({
+            "type": "access", "request_id": req_id, "method": request.method, "path": request.url.path,
+            "status": response.status_code, "duration_ms": int((time.time() - start) * 1000),
+            "client_ip": request.client.host if request.client else None,
+        }))
+        return response
+
+
+class OldRateLimit(BaseHTTPMiddleware):
+    def __init__(self, app):
+        super().__init__(app)
+        self.store = {}
+
+    async def dispatch(self, request, call_next):
+        ip = request.client.host if request.client else "unknown"
+        key = f"rl:norm:{ip}:{request.url.path}:{int(time.time() // 60)}"
+        b = self.store.setdefault(key, {"count": 0})
+        b["count"] += 1
+        if b["count"] > rate_limit.READ_PER_MIN:
+            return JSONResponse({"code": "rate_limited"}, status_code=429)
+        return await call_next(request)
+
+
+class OldCSP(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if os.getenv("ENABLE_CSP", "false").lower() in ("1", "true", "yes", "on"):
+            response.headers["Content-Security-Policy"] = csp.CSP
+        if os.getenv("ENABLE_HSTS", "false").lower() in ("1", "true", "yes", "on"):
+            response.headers["Strict-Transport-Security"] = csp.HSTS
+        return response
+
+
+class OldSecurityHeaders(BaseHTTPMiddleware):
+    def __init__(self, app, settings):
+        super().__init__(app)
+        self.inner = security_middleware.SecurityHeadersMiddleware(None, settings)
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers.setdefault("Content-Security-Policy", self.inner._build_csp())
+        for k, v in self.inner.block[1:]:
+            response.headers.setdefault(k.decode(), v.decode())
+        return response
+
+
+class OldRejectAuth(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        if request.headers.get("authorization"):
+            return JSONResponse({"code": "header_auth_disabled"}, status_code=401)
+        return await call_next(request)
+
+
+def build(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def item(item_id: str):
+        return {"id": item_id, "ok": True}
+
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+    if stack == "before":
+        app.add_middleware(OldLogJSON)
+        app.add_middleware(OldRateLimit)
+        app.add_middleware(OldCSP)
+        app.add_middleware(OldSecurityHeaders, settings=SETTINGS)
+        app.add_middleware(OldRejectAuth)
+    elif stack == "after":
+        app.add_middleware(log_json.LogJSONMiddleware)
+        app.add_middleware(rate_limit.RateLimitMiddleware)
+        app.add_middleware(csp.SecurityHeadersMiddleware)
+        app.add_middleware(security_middleware.SecurityHeadersMiddleware, settings=SETTINGS)
+        app.add_middleware(security_middleware.RejectAuthHeaderInProd, settings=SETTINGS)
+    return app
+
+
+async def run(app: FastAPI, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(100):  # warm up
+            await client.get(f"/items/{i}")
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with sem:
+                r = await client.get(f"/items/{i}")
+                assert r.status_code == 200, r.status_code
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        return total / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'stack':<10}{'req/s':>10}")
+    for stack in ("none", "before", "after"):
+        rps = asyncio.run(run(build(stack), args.requests, args.concurrency))
+        print(f"{stack:<10}{rps:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
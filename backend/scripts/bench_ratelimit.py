@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Rate-limit cost per request against a real Redis: direct (one Lua call per
+check) vs hybrid (local decisions, batched sync).
+
+Reports Redis round trips per request and added latency per check.
+
+    REDIS_URL=redis://localhost:6379/0 python scripts/bench_ratelimit.py [--requests 20000] [--keys 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.security import ratelimit
+
+
+async def run(limiter, mode: str, requests: int, keys: int):
+    before = ratelimit._round_trips.value(mode=mode)
+    lat = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        await limiter.hit(f"bench:{i % keys}", 10**9, 60)
+        lat.append(time.perf_counter() - t0)
+    if mode == "hybrid":
+        await limiter.sync()
+    trips = ratelimit._round_trips.value(mode=mode) - before
+    lat.sort()
+    return trips / requests, statistics.mean(lat) * 1e6, lat[int(len(lat) * 0.99)] * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--keys", type=int, default=200)
+    args = ap.parse_args()
+    url = os.getenv("REDIS_URL")
+    if not url or ratelimit.redis is None:
+        sys.exit("set REDIS_URL (and install redis) to run this benchmark")
+
+    print(f"{'mode':<8}{'trips/req':>12}{'mean us':>10}{'p99 us':>10}")
+    for mode, limiter in (
+        ("direct", ratelimit.RedisLimiter(url, "bench:")),
+        ("hybrid", ratelimit.HybridLimiter(url, "bench:")),
+    ):
+        trips, mean, p99 = asyncio.run(run(limiter, mode, args.requests, args.keys))
+        print(f"{mode:<8}{trips:>12.4f}{mean:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
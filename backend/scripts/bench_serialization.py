@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Serialization cost per list page: FastAPI's default path (jsonable_encoder +
+JSONResponse) vs app.serialization.Serializer (precompiled TypeAdapter
+validate + dump_json).
+
+Rows are synthetic but shaped like the real SELECTs: UUIDs, timestamptz,
+text[] lists and a nested environment dict. No DB or HTTP involved.
+
+    python scripts/bench_serialization.py [--rows 50,200] [--iterations 300]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.routers.admin_referrals import REFERRAL_PAGE
+from app.routers.admin_users import USER_PAGE
+from app.routers.audit import AUDIT_PAGE
+from app.routers.referrals import REFERRAL_LIST
+
+NOW = datetime.now(timezone.utc)
+
+
+def referral(rng):
+    return {
+        "id": uuid.uuid4(), "ref_no": f"AZR-2025-{rng.randint(1, 9999):04d}", "company": "Granite Harbor Dental",
+        "status": rng.choice(["New", "Contacted", "Won"]), "created_at": NOW - timedelta(minutes=rng.randint(0, 10**6)),
+        "contact_name": "Jordan Patel", "contact_email": "jordan.patel@example.com", "contact_phone": "555-0100",
+        "notes": "Renewal due next quarter; wants quotes before then.", "agent_id": uuid.uuid4(),
+        "opportunity_types": ["Managed IT", "Hosted Voice / Phone"], "locations": ["Austin, TX"],
+        "environment": {"users": 40, "phone_provider": "RingCentral", "internet_provider": "Spectrum",
+                        "internet_bandwidth_mbps": "500", "it_model": "MSP",
+                        "workstations": {"windows": 35, "mac": 5}},
+        "reason": "Office move",
+    }
+
+
+def user(rng):
+    return {"id": uuid.uuid4(), "email": f"user{rng.randint(1, 10**6)}@example.com", "role": "AZOR",
+            "first_name": "Sam", "last_name": "Nguyen", "is_active": True, "created_at": NOW, "mfa_enabled": True}
+
+
+def audit(rng):
+    return {"created_at": NOW, "action": "referral.updated", "entity_type": "referral", "entity_id": uuid.uuid4(),
+            "actor_user_id": uuid.uuid4(), "metadata": {"fields": ["status"]}, "actor_email": "admin@example.com",
+            "actor_first_name": "Avery", "actor_last_name": "Kim"}
+
+
+def timeit(fn, iterations):
+    fn()
+    times = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", default="50,200")
+    ap.add_argument("--iterations", type=int, default=300)
+    args = ap.parse_args()
+    rng = random.Random(1)
+
+    cases = [
+        ("GET /referrals/my", REFERRAL_LIST, referral, False),
+        ("GET /admin/referrals", REFERRAL_PAGE, referral, True),
+        ("GET /admin/users", USER_PAGE, user, True),
+        ("GET /audit/events", AUDIT_PAGE, audit, True),
+    ]
+    print(f"{'endpoint':<24}{'rows':>6}{'default ms':>12}{'serializer ms':>15}{'speed-up':>10}")
+    for name, serializer, make, paged in cases:
+        for n in (int(x) for x in args.rows.split(",")):
+            rows = [make(rng) for _ in range(n)]
+            content = {"items": rows, "next": str(n)} if paged else rows
+            default = timeit(lambda: JSONResponse(jsonable_encoder(content)).body, args.iterations)
+            fast = timeit(lambda: serializer.response(content).body, args.iterations)
+            assert json.loads(serializer.dump(content)) == json.loads(
+                json.dumps(jsonable_encoder(content)).replace("+00:00", "Z"))
+            print(f"{name:<24}{n:>6}{default:>12.2f}{fast:>15.2f}{default / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
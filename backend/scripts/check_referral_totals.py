@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Compare referral_status_totals (per agent and status) and
+referral_daily_totals (per agent and day) with a GROUP BY over referrals.
+Prints every mismatch and exits 1 if there is any, so it can run after
+deploys or from cron.
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services import referral_stats
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    print("ERROR: DATABASE_URL environment variable not set")
+    sys.exit(1)
+
+
+def main() -> int:
+    with Session(create_engine(DATABASE_URL)) as db:
+        rows = referral_stats.drift(db)
+    for r in rows:
+        where = f"day={r['day']}" if r["kind"] == "daily" else f"status={r['status']}"
+        print(f"{r['kind']:6} agent={r['agent_id']} {where} "
+              f"count {r['total_n']} vs {r['direct_n']}, amount {r['total_amount']} vs {r['direct_amount']}")
+    print("referral totals in step" if not rows else f"{len(rows)} mismatched total(s)")
+    return 1 if rows else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
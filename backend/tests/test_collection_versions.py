@@ -0,0 +1,103 @@
+import json
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import ProgrammingError
+
+from app.services import collection_versions as cv
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def mappings(self):
+        return self
+
+    def one(self):
+        return self._row
+
+
+class FakeDB:
+    def __init__(self, version=0, fail=False):
+        self.version = version
+        self.fail = fail
+        self.statements = 0
+        self.rolled_back = False
+
+    def execute(self, sql, params=None):
+        self.statements += 1
+        if self.fail:
+            raise ProgrammingError("SELECT", {}, Exception('relation "collection_versions" does not exist'))
+        return _Result({"version": self.version, "updated_at": None})
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def _app(db):
+    app = FastAPI()
+    queries = []
+
+    @app.get("/items")
+    def items(request: Request, response: Response):
+        tag = cv.tag_for(db, request, ["things"], "user-1")
+        if cv.matches(request, tag):
+            return cv.not_modified(request, tag)
+        queries.append(1)  # the expensive query
+        cv.tagged(response, tag)
+        return {"items": [1, 2, 3]}
+
+    return app, queries
+
+
+def test_if_none_match_skips_the_query_until_the_version_moves():
+    cv._disabled_until = 0.0
+    db = FakeDB(version=7)
+    app, queries = _app(db)
+    client = TestClient(app)
+
+    first = client.get("/items?limit=50")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('W/"7-')
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get("/items?limit=50", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and len(queries) == 1
+
+    # other query string -> other tag; strong form of the same tag still matches
+    assert client.get("/items?limit=10", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/items?limit=50", headers={"If-None-Match": etag[2:]}).status_code == 304
+
+    db.version = 8
+    changed = client.get("/items?limit=50", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert json.loads(changed.content) == {"items": [1, 2, 3]}
+
+
+def test_missing_table_turns_tags_off():
+    cv._disabled_until = 0.0
+    db = FakeDB(fail=True)
+    app, _ = _app(db)
+    client = TestClient(app)
+    resp = client.get("/items", headers={"If-None-Match": "*"})
+    assert resp.status_code == 200 and "etag" not in resp.headers
+    assert db.rolled_back
+    client.get("/items")
+    assert db.statements == 1  # not retried until VERSION_RETRY_SECS passes
+    cv._disabled_until = 0.0
+
+
+def test_file_tag_follows_mtime_and_size(tmp_path):
+    path = tmp_path / "doc.json"
+    path.write_text('{"items": []}')
+    app = FastAPI()
+
+    @app.get("/doc")
+    def doc(request: Request):
+        return cv.file_tag(request, str(path)).etag
+
+    client = TestClient(app)
+    before = client.get("/doc").json()
+    path.write_text('{"items": ["new"]}')
+    assert client.get("/doc").json() != before
@@ -0,0 +1,88 @@
+# backend/tests/test_compress.py
+import asyncio
+import gzip
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+
+BIG = {"rows": [{"id": i, "company": "Acme Corporation", "status": "submitted"} for i in range(200)]}
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return JSONResponse(BIG, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/pdf")
+    def pdf():
+        return Response(b"%PDF-1.7" + b"\0" * 4096, media_type="application/pdf")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(b"x" * 4096), media_type="text/plain",
+                        headers={"Content-Encoding": "gzip"})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_choose_encoding_honours_q_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("*") is not None
+    assert choose_encoding("identity") is None
+
+
+def test_large_json_is_gzipped_and_etag_weakened():
+    r = _client().get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in r.headers["vary"].lower()
+    assert r.headers["etag"] == 'W/"v1"'
+    assert r.json() == BIG
+
+
+def test_small_and_excluded_bodies_pass_through():
+    c = _client()
+    small = c.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert "accept-encoding" in small.headers["vary"].lower()
+    pdf = c.get("/pdf", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in pdf.headers
+    enc = c.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert enc.headers["content-encoding"] == "gzip"
+    assert enc.content == b"x" * 4096
+
+
+def test_streaming_chunks_are_flushed_incrementally():
+    lines = [f"line {i}\n".encode() for i in range(50)]
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/csv")]})
+        for line in lines:
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(app)(scope, None, send))
+    bodies = [m["body"] for m in sent[1:]]
+    # every app chunk goes out as its own sync-flushed piece, then the trailer
+    assert len(bodies) == len(lines) + 1
+    d = zlib.decompressobj(31)
+    assert d.decompress(bodies[0]) == lines[0]
+    assert d.decompress(b"".join(bodies[1:])) == b"".join(lines[1:])
@@ -0,0 +1,76 @@
+# backend/tests/test_events.py
+import asyncio
+import json
+
+from app.services import events
+
+
+def _drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait())
+    return out
+
+
+def test_referral_events_reach_owner_and_admins_only():
+    async def run():
+        hub = events.Hub()
+        owner = hub.subscribe("a1", admin=False)
+        other = hub.subscribe("a2", admin=False)
+        admin = hub.subscribe("adm", admin=True)
+        hub.dispatch({"type": "referral.updated", "id": "r1", "agent_id": "a1", "status": "won"})
+        hub.dispatch({"type": "announcements.updated", "count": 2})
+        return _drain(owner), _drain(other), _drain(admin)
+
+    owner, other, admin = asyncio.run(run())
+    assert len(owner) == 2 and len(admin) == 2
+    assert len(other) == 1 and other[0].startswith(b"event: announcements.updated\n")
+    data = owner[0].split(b"data: ", 1)[1].strip()
+    assert json.loads(data)["status"] == "won"
+
+
+def test_reassignment_reaches_previous_owner():
+    async def run():
+        hub = events.Hub()
+        old, new, other = (hub.subscribe(u, admin=False) for u in ("a1", "a2", "a3"))
+        hub.dispatch({"type": "referral.updated", "id": "r1", "agent_id": "a2", "previous_agent_id": "a1"})
+        return _drain(old), _drain(new), _drain(other)
+
+    old, new, other = asyncio.run(run())
+    assert len(old) == 1 and len(new) == 1 and other == []
+
+
+def test_type_filter_and_slow_subscriber_is_closed(monkeypatch):
+    monkeypatch.setattr(events, "SSE_QUEUE_SIZE", 2)
+
+    async def run():
+        hub = events.Hub()
+        quiet = hub.subscribe("a1", admin=False, types={"announcements"})
+        slow = hub.subscribe("a1", admin=False)
+        for i in range(3):
+            hub.dispatch({"type": "referral.updated", "id": f"r{i}", "agent_id": "a1"})
+        return hub, _drain(quiet), _drain(slow)
+
+    hub, quiet, slow = asyncio.run(run())
+    assert quiet == []
+    assert slow == [None]  # queue overflowed: stream told to end
+    assert len(hub) == 1
+
+
+def test_stream_sends_ready_heartbeats_and_events():
+    async def run():
+        sub = events.hub.subscribe("a1", admin=False)
+        gen = events.stream(sub, heartbeat=0.01, lifetime=5)
+        first = await gen.__anext__()
+        ping = await gen.__anext__()
+        events.hub.dispatch({"type": "referral.updated", "agent_id": "a1"})
+        ev = await gen.__anext__()
+        events.hub.close(sub)
+        rest = [f async for f in gen]
+        return first, ping, ev, rest, len(events.hub)
+
+    first, ping, ev, rest, left = asyncio.run(run())
+    assert first.startswith(b"retry: ") and b"event: ready" in first
+    assert ping == events.HEARTBEAT
+    assert ev.startswith(b"event: referral.updated\n")
+    assert rest == [] and left == 0
@@ -0,0 +1,127 @@
+# backend/tests/test_graph_mail.py
+import pytest
+
+from app import graph_mail
+
+
+class FakeApp:
+    instances = 0
+
+    def __init__(self, client_id, authority, token_cache):
+        FakeApp.instances += 1
+        self.cache = token_cache
+        self.calls = 0
+
+    def get_accounts(self):
+        return [{"username": "bot@example.com"}]
+
+    def acquire_token_silent(self, scopes, account=None):
+        self.calls += 1
+        if self.calls == 1:
+            self.cache.has_state_changed = True  # MSAL refreshed the token
+        return {"access_token": f"tok-{self.calls}", "expires_in": 3600}
+
+
+@pytest.fixture
+def graph(monkeypatch, tmp_path):
+    FakeApp.instances = 0
+    monkeypatch.setattr(graph_mail.msal, "PublicClientApplication", FakeApp)
+    monkeypatch.setattr(graph_mail.settings, "MS_GRAPH_CLIENT_ID", "cid")
+    monkeypatch.setattr(graph_mail.settings, "MS_GRAPH_TENANT_ID", "tid")
+    monkeypatch.setattr(graph_mail.settings, "BOT_CACHE_PATH", str(tmp_path / "cache.json"))
+    for name, value in (("_app", None), ("_cache", None), ("_cache_mtime", 0.0),
+                        ("_access_token", None), ("_expires_at", 0.0)):
+        monkeypatch.setattr(graph_mail, name, value)
+    return tmp_path / "cache.json"
+
+
+def test_token_reused_until_near_expiry(graph):
+    assert graph_mail._token() == "tok-1"
+    assert graph_mail._token() == "tok-1"
+    assert FakeApp.instances == 1 and graph_mail._app.calls == 1
+    assert graph.exists()  # first acquisition changed the cache
+
+    mtime = graph.stat().st_mtime_ns
+    graph_mail._expires_at = 0  # simulate approaching expiry
+    assert graph_mail._token() == "tok-2"
+    assert FakeApp.instances == 1
+    assert graph.stat().st_mtime_ns == mtime  # unchanged cache is not rewritten
+
+
+def test_invalidate_forces_reacquire(graph):
+    graph_mail._token()
+    graph_mail._invalidate_token()
+    assert graph_mail._token() == "tok-2"
+
+
+def test_large_attachments_use_upload_session(monkeypatch):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    seen = []
+
+    class Graph(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, body=None):
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            body = self._body()
+            seen.append(("POST", self.path, body))
+            if self.path == "/me/messages":
+                self._reply(201, {"id": "m1"})
+            elif self.path.endswith("/createUploadSession"):
+                self._reply(200, {"uploadUrl": f"http://127.0.0.1:{self.server.server_address[1]}/upload"})
+            else:
+                self._reply(202)
+
+        def do_PUT(self):
+            seen.append(("PUT", self.headers["Content-Range"], len(self._body())))
+            self._reply(200, {})
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Graph)
+    threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    try:
+        monkeypatch.setattr(graph_mail, "GRAPH_API_BASE", f"http://127.0.0.1:{srv.server_address[1]}")
+        monkeypatch.setattr(graph_mail, "GRAPH_INLINE_MAX_BYTES", 1000)
+        monkeypatch.setattr(graph_mail, "GRAPH_UPLOAD_CHUNK_BYTES", 4096)
+        monkeypatch.setattr(graph_mail, "GRAPH_UPLOAD_SESSION_MIN_BYTES", 8000)
+        monkeypatch.setattr(graph_mail, "_token", lambda: "tok")
+        blob = bytes(range(256)) * 40  # 10240 bytes -> 3 chunks
+        reads = []
+
+        def read(off, n):
+            reads.append((off, n))
+            return blob[off:off + n]
+
+        graph_mail.send_mail(["a@example.com"], "s", "b", attachments=[
+            {"name": "small.txt", "content": b"hello"},
+            {"name": "a.pdf", "content": b"a" * 600},
+            {"name": "b.pdf", "content": b"b" * 700},
+            {"name": "big.bin", "size": len(blob), "read": read},
+        ])
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+    draft = json.loads(seen[0][2])
+    assert [a["name"] for a in draft["attachments"]] == ["small.txt", "a.pdf"]
+    # over the inline budget but under the upload-session minimum: added to the draft directly
+    added = [json.loads(s[2]) for s in seen if s[1] == "/me/messages/m1/attachments"]
+    assert [a["name"] for a in added] == ["b.pdf"]
+    assert sum(1 for s in seen if s[1].endswith("/createUploadSession")) == 1
+    assert [s[1] for s in seen if s[0] == "PUT"] == ["bytes 0-4095/10240", "bytes 4096-8191/10240", "bytes 8192-10239/10240"]
+    assert reads == [(0, 4096), (4096, 4096), (8192, 2048)]
+    assert seen[-1][1] == "/me/messages/m1/send"
@@ -0,0 +1,98 @@
+# backend/tests/test_http_client.py
+"""HttpClient against local stand-in servers."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import http_client
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    script = []  # queued (status, headers) replies; default 200
+    ports = set()
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    delay = 0.0
+
+    def _reply(self):
+        cls = type(self)
+        with cls.lock:
+            cls.ports.add(self.client_address[1])
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            status, headers = cls.script.pop(0) if cls.script else (200, {})
+        time.sleep(cls.delay)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        body = b'{"ok": true}'
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with cls.lock:
+            cls.active -= 1
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    StandIn.script, StandIn.ports, StandIn.active, StandIn.peak, StandIn.delay = [], set(), 0, 0, 0.0
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_BASE_SECS", 0.01)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    t = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_keep_alive_reuses_one_connection(server):
+    c = http_client.HttpClient()
+    for _ in range(5):
+        assert c.get(server + "/x").status_code == 200
+    assert len(StandIn.ports) == 1
+
+
+def test_retries_429_honouring_retry_after(server):
+    StandIn.script = [(429, {"Retry-After": "0"}), (503, {}), (200, {})]
+    c = http_client.HttpClient()
+    assert c.get(server + "/x").status_code == 200
+    assert StandIn.script == []
+
+
+def test_post_5xx_not_retried_without_retry_after(server):
+    StandIn.script = [(500, {}), (200, {})]
+    assert http_client.HttpClient().post(server + "/send", json={}).status_code == 500
+    StandIn.script = [(503, {"Retry-After": "0"}), (200, {})]
+    assert http_client.HttpClient().post(server + "/send", json={}).status_code == 200
+
+
+def test_long_retry_after_returns_instead_of_sleeping(server):
+    StandIn.script = [(429, {"Retry-After": "3600"})]
+    t0 = time.perf_counter()
+    assert http_client.HttpClient().get(server + "/x").status_code == 429
+    assert time.perf_counter() - t0 < 1
+
+
+def test_per_host_concurrency_cap(server, monkeypatch):
+    monkeypatch.setattr(http_client, "HOST_LIMITS", {"127.0.0.1": 2})
+    StandIn.delay = 0.05
+    c = http_client.HttpClient()
+    threads = [threading.Thread(target=c.get, args=(server + "/x",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert StandIn.peak == 2
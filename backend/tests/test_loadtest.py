@@ -0,0 +1,66 @@
+from loadtest import seed
+from loadtest.run import Stats, compare, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_stats_only_record_inside_the_window():
+    stats = Stats()
+    stats.record("GET /x", 0.5, 200)  # warm-up
+    stats.start()
+    stats.record("GET /x", 0.010, 200)
+    stats.record("GET /x", 0.020, 500)
+    stats.stop()
+    s = stats.summary()["GET /x"]
+    assert s["count"] == 2 and s["errors"] == 1
+    assert s["max_ms"] == 20.0
+    assert s["statuses"] == {"200": 1, "500": 1}
+
+
+def test_compare_flags_p95_and_error_regressions():
+    base = {"GET /a": {"count": 100, "errors": 0, "p95_ms": 40.0},
+            "GET /b": {"count": 100, "errors": 0, "p95_ms": 2.0},
+            "GET /c": {"count": 100, "errors": 0, "p95_ms": 10.0}}
+    cur = {"GET /a": {"count": 100, "errors": 0, "p95_ms": 60.0},   # +50%
+           "GET /b": {"count": 100, "errors": 0, "p95_ms": 4.0}}    # +100% but only 2ms
+    problems = compare(cur, base, 0.25)
+    assert any(p.startswith("GET /a: p95") for p in problems)
+    assert not any(p.startswith("GET /b") for p in problems)
+    assert "GET /c: not exercised in this run" in problems
+
+    cur["GET /c"] = {"count": 100, "errors": 5, "p95_ms": 10.0}
+    assert any(p.startswith("GET /c: error rate") for p in compare(cur, base, 0.25))
+
+
+def test_seed_encodes_for_either_column_type():
+    assert seed.encode(["Managed IT", 'A "b"'], "ARRAY") == '{"Managed IT","A \\"b\\""}'
+    assert seed.encode(["x"], "jsonb") == '["x"]'
+    assert seed._copy_field("a\tb\nc\\") == "a\\tb\\nc\\\\"
+    assert seed._copy_field(None) == "\\N"
+
+
+def test_empty_baseline_is_not_a_pass(tmp_path, monkeypatch):
+    import sys
+
+    import pytest
+
+    from loadtest import run
+
+    empty = tmp_path / "baseline.json"
+    empty.write_text('{"endpoints": {}}')
+
+    async def no_load(args):
+        return {}
+
+    monkeypatch.setattr(run, "httpx", object())
+    monkeypatch.setattr(run, "run", no_load)
+    monkeypatch.setattr(sys, "argv", ["run", "--baseline", str(empty)])
+    with pytest.raises(SystemExit) as ei:
+        run.main()
+    assert ei.value.code == 2
@@ -0,0 +1,41 @@
+import json
+import logging
+import queue
+
+from app import logs
+
+
+def test_json_lines_carry_fields_and_sampling(monkeypatch):
+    rec = logging.LogRecord("app.log_json", logging.INFO, __file__, 1, "access", None, None)
+    rec.fields = {"type": "access", "status": 200, "route": "/referrals/{referral_id}"}
+    line = json.loads(logs.JsonFormatter().format(rec))
+    assert line["level"] == "info" and line["logger"] == "app.log_json" and line["message"] == "access"
+    assert line["route"] == "/referrals/{referral_id}" and line["ts"].endswith("+00:00")
+
+    monkeypatch.setattr(logs, "LOG_SAMPLE_PROBES", 0.0)
+    assert not logs.sample_access("/healthz", 200)
+    assert logs.sample_access("/healthz", 503)
+    assert logs.sample_access("/referrals/my", 200)
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    h = logs._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    before = logs._dropped.value()
+    for i in range(3):
+        h.emit(logging.LogRecord("x", logging.INFO, __file__, 1, "m %d", (i,), None))
+    assert h.queue.get_nowait().msg == "m 0"
+    assert logs._dropped.value() == before + 2
+
+
+def test_queue_handler_leaves_the_callers_record_alone():
+    import sys
+
+    h = logs._NonBlockingQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        rec = logging.LogRecord("x", logging.ERROR, __file__, 1, "m %d", (1,), sys.exc_info())
+    h.emit(rec)
+    queued = h.queue.get_nowait()
+    assert queued.msg == "m 1" and queued.exc_info is None and "boom" in queued.exc_text
+    assert rec.args == (1,) and rec.exc_info is not None
@@ -0,0 +1,57 @@
+# backend/tests/test_middleware.py
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import security_middleware
+from app.middleware.log_json import LogJSONMiddleware
+
+SETTINGS = SimpleNamespace(
+    CSP_DEFAULT_SRC="'self'", CSP_IMG_SRC="'self'", CSP_SCRIPT_SRC="'self'",
+    CSP_STYLE_SRC="'self'", CSP_CONNECT_SRC="'self'", CSP_FRAME_ANCESTORS="'none'",
+    REFERRER_POLICY="no-referrer", is_prod=True, ENABLE_HSTS=True, HSTS_MAX_AGE=60,
+)
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/plain")
+    def plain():
+        return {"ok": True}
+
+    @app.get("/framed")
+    def framed():
+        return JSONResponse({"ok": True}, headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    app.add_middleware(LogJSONMiddleware)
+    app.add_middleware(security_middleware.SecurityHeadersMiddleware, settings=SETTINGS)
+    app.add_middleware(security_middleware.RejectAuthHeaderInProd, settings=SETTINGS)
+    return app
+
+
+def test_security_headers_added_without_overriding():
+    client = TestClient(_app())
+    r = client.get("/plain")
+    assert r.headers["x-content-type-options"] == "nosniff"
+    assert r.headers["strict-transport-security"] == "max-age=60; includeSubDomains"
+    assert "frame-ancestors 'none'" in r.headers["content-security-policy"]
+    assert client.get("/framed").headers["x-frame-options"] == "SAMEORIGIN"
+
+
+def test_streaming_passes_through():
+    r = TestClient(_app()).get("/stream")
+    assert r.text == "abc"
+    assert r.headers["referrer-policy"] == "no-referrer"
+
+
+def test_authorization_header_rejected_in_prod():
+    r = TestClient(_app()).get("/plain", headers={"Authorization": "Bearer x"})
+    assert r.status_code == 401
+    assert r.json()["code"] == "header_auth_disabled"
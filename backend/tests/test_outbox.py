@@ -0,0 +1,103 @@
+# backend/tests/test_outbox.py
+from app.notifications import dispatcher, outbox
+
+
+class FakeDB:
+    def rollback(self):
+        pass
+
+
+def _install(monkeypatch, rows):
+    calls = {"sent": [], "failed": []}
+    monkeypatch.setattr(outbox, "claim", lambda db, n: rows)
+    monkeypatch.setattr(outbox, "load_attachments", lambda db, refs: [])
+    monkeypatch.setattr(outbox, "mark_sent", lambda db, i: calls["sent"].append(i))
+
+    def mark_failed(db, i, attempts, err):
+        calls["failed"].append((i, err))
+        return "dead" if attempts >= outbox.OUTBOX_MAX_ATTEMPTS else "pending"
+
+    monkeypatch.setattr(outbox, "mark_failed", mark_failed)
+    return calls
+
+
+def _row(i, attempts=1):
+    return {"id": i, "kind": "user_created", "recipients": ["a@example.com"], "subject": "s",
+            "body": "b", "attachments": [], "attempts": attempts}
+
+
+def test_dispatch_sends_and_retries_failures(monkeypatch):
+    calls = _install(monkeypatch, [_row(1), _row(2), _row(3)])
+
+    def send(to, subject, body, attachments=None):
+        if body == "b" and send.n == 1:
+            send.n += 1
+            raise RuntimeError("Graph sendMail failed: 503")
+        send.n += 1
+
+    send.n = 0
+    assert dispatcher.dispatch_once(FakeDB(), send=send) == 3
+    assert calls["sent"] == [1, 3]
+    assert calls["failed"][0][0] == 2 and "503" in calls["failed"][0][1]
+
+
+def test_backoff_grows_and_is_capped():
+    lows = [outbox.backoff(n) for n in range(1, 6)]
+    assert all(outbox.OUTBOX_BACKOFF_BASE_SECS / 2 <= b for b in lows)
+    assert outbox.backoff(2) <= 2 * outbox.OUTBOX_BACKOFF_BASE_SECS
+    assert outbox.backoff(50) <= outbox.OUTBOX_BACKOFF_MAX_SECS
+
+
+def test_enqueue_rejects_unknown_attachment_source():
+    import pytest
+
+    with pytest.raises(ValueError):
+        outbox.enqueue(None, "feedback", ["a@example.com"], "s", "b", [{"source": "users", "id": "1"}])
+
+
+def test_referral_digest_lists_every_change():
+    from app.notifications import notifier
+
+    render = notifier._referral_digest("R-1", "Acme")
+    entries = [
+        {"at": "2026-10-19T10:00:00+00:00", "actor_email": "a@x.com", "actor_name": "Ann", "updates": {"status": "contacted"}},
+        {"at": "2026-10-19T10:02:00+00:00", "actor_email": "b@x.com", "actor_name": "Bob", "note": "Called back"},
+        {"at": "2026-10-19T10:03:00+00:00", "actor_email": "b@x.com", "actor_name": "Bob", "updates": {"status": "won"}},
+    ]
+    subject, body = render(entries)
+    assert subject.endswith("3 changes")
+    assert "  - status: won" in body
+    assert "[2026-10-19 10:00] Ann: status: contacted" in body and "Called back" in body
+
+    # a lone edit renders exactly like the old per-change email
+    assert render(entries[:1]) == notifier.T.referral_updated("R-1", "Acme", {"status": "contacted"}, "a@x.com", "Ann")
+
+
+def test_claim_dead_letters_rows_whose_last_lease_expired():
+    class Result:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def mappings(self):
+            return self
+
+        def all(self):
+            return self.rows
+
+    class RecordingDB:
+        def __init__(self):
+            self.calls = []
+
+        def execute(self, sql, params):
+            self.calls.append((str(sql), params))
+            return Result([{"kind": "user_created"}] if len(self.calls) == 1 else [])
+
+        def commit(self):
+            pass
+
+    db = RecordingDB()
+    assert outbox.claim(db, 10) == []
+    (expire, p1), (lease, p2) = db.calls
+    assert "'dead'" in expire and "attempts >= :max" in expire
+    assert "attempts < :max" in lease
+    assert p1["max"] == p2["max"] == outbox.OUTBOX_MAX_ATTEMPTS
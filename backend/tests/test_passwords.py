@@ -0,0 +1,71 @@
+# backend/tests/test_passwords.py
+import pytest
+from fastapi import HTTPException
+
+from app.security import passwords
+
+
+def test_hash_and_verify_inline():
+    pool = passwords.HashPool(workers=0, max_queue=1, queue_wait_ms=10)
+    hashed = pool.run("hash", passwords._hashpw, b"correct horse battery", 4)
+    assert pool.run("verify", passwords._checkpw, b"correct horse battery", hashed)
+    assert not pool.run("verify", passwords._checkpw, b"wrong", hashed)
+
+
+def test_pool_rejects_when_queue_full():
+    pool = passwords.HashPool(workers=1, max_queue=0, queue_wait_ms=10)
+    with pytest.raises(HTTPException) as ei:
+        pool.run("verify", passwords._checkpw, b"x", b"y")
+    assert ei.value.status_code == 503
+    assert ei.value.headers["Retry-After"]
+
+
+def test_pool_times_out_waiting_for_worker():
+    pool = passwords.HashPool(workers=1, max_queue=4, queue_wait_ms=20)
+    pool._slots.acquire()  # simulate a long-running hash holding the only worker
+    try:
+        with pytest.raises(HTTPException) as ei:
+            pool.run("verify", passwords._checkpw, b"x", b"y")
+        assert ei.value.status_code == 503
+    finally:
+        pool._slots.release()
+    assert pool._waiting == 0
+
+
+def test_pool_runs_in_worker_process():
+    pool = passwords.HashPool(workers=1, max_queue=4, queue_wait_ms=5000)
+    try:
+        hashed = pool.run("hash", passwords._hashpw, b"pw", 4)
+        assert pool.run("verify", passwords._checkpw, b"pw", hashed)
+    finally:
+        pool.shutdown()
+
+
+def test_needs_rehash(monkeypatch):
+    monkeypatch.setattr(passwords, "BCRYPT_COST", 6)
+    weak = passwords._hashpw(b"pw", 4).decode()
+    current = passwords._hashpw(b"pw", 6).decode()
+    assert passwords.needs_rehash(weak)
+    assert not passwords.needs_rehash(current)
+    assert passwords.needs_rehash("$argon2id$v=19$m=65536,t=3,p=4$abc$def")
+    assert not passwords.needs_rehash(None)
+
+
+def test_calibrate_respects_bounds(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_COST", None)
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_MIN_COST", 4)
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_MAX_COST", 8)
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_TARGET_MS", 100000)
+    assert passwords.calibrate() == 8
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_TARGET_MS", 0)
+    monkeypatch.setattr(passwords, "BCRYPT_COST", 12)
+    assert passwords.calibrate() == 4
+    assert passwords.BCRYPT_COST == 4
+
+
+def test_pinned_cost_skips_the_probes(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_COST", "11")
+    monkeypatch.setattr(passwords, "BCRYPT_COST", 12)
+    monkeypatch.setattr(passwords, "_hashpw", lambda *a: pytest.fail("probed a pinned cost"))
+    assert passwords.calibrate() == 11
+    assert passwords.BCRYPT_COST == 11
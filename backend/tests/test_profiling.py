@@ -0,0 +1,31 @@
+import json
+import time
+
+from app import profiling
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_session_samples_and_writes_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    session = profiling.start(requests=2, seconds=5, interval_ms=1)
+    try:
+        _busy(0.1)
+        session.request_done()
+        assert profiling.active is session
+        session.request_done()  # second request ends the session
+        session._thread.join(timeout=5)
+    finally:
+        profiling.stop()
+
+    assert profiling.active is None and profiling.last is session
+    assert session.samples > 0
+    folded = (tmp_path / session.files[0]).read_text()
+    assert "_busy (test_profiling.py" in folded
+    scope = json.loads((tmp_path / session.files[1]).read_text())
+    assert scope["profiles"][0]["type"] == "sampled" and scope["shared"]["frames"]
+    assert profiling.output_path(session.files[0]) and profiling.output_path("../etc/passwd") is None
@@ -0,0 +1,251 @@
+# backend/tests/test_ratelimit.py
+import pytest
+from fastapi import HTTPException
+
+from app.security import ratelimit
+from app.security.ratelimit import MemoryLimiter
+
+
+class Clock:
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def test_sliding_window_limits_and_recovers():
+    clock = Clock(960.0)  # start of a 60 s window
+    rl = MemoryLimiter(clock=clock)
+    assert all(rl.hit("k", 5, 60).allowed for _ in range(5))
+    d = rl.hit("k", 5, 60)
+    assert not d.allowed and d.retry_after > 0
+
+    # half way into the next window, prev (5) weighs 0.5 -> 2.5 used, 2 more fit
+    clock.t += 60 + 30
+    assert rl.hit("k", 5, 60).allowed
+    assert rl.hit("k", 5, 60).allowed
+    assert not rl.hit("k", 5, 60).allowed
+
+
+def test_key_store_is_bounded_and_expires():
+    clock = Clock()
+    rl = MemoryLimiter(max_keys=100, clock=clock)
+    for i in range(1000):
+        rl.hit(f"scan-{i}", 5, 60)
+    assert len(rl) == 100
+
+    clock.t += 1000  # everything expired; next hit sweeps the cold end
+    rl.hit("fresh", 5, 60)
+    assert len(rl) == 1
+
+
+def test_negative_cost_refunds_but_never_below_zero():
+    lim = MemoryLimiter(clock=Clock(960.0))
+    lim.hit("k", 3, 60, 3)
+    assert not lim.hit("k", 3, 60).allowed
+    assert lim.hit("k", 3, 60, -1).allowed
+    assert lim.hit("k", 3, 60).allowed
+    lim.hit("k", 3, 60, -10)
+    assert lim.hit("k", 3, 60, 3).remaining == 0
+
+
+def test_check_raises_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ratelimit, "limiter", MemoryLimiter())
+    ratelimit.check("login:1.2.3.4", window_seconds=60, limit=1)
+    with pytest.raises(HTTPException) as ei:
+        ratelimit.check("login:1.2.3.4", window_seconds=60, limit=1)
+    assert ei.value.status_code == 429
+    assert int(ei.value.headers["Retry-After"]) >= 1
+
+
+def _limited_app(monkeypatch, user_budget, ip_budget, cors=False):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.middleware import rate_limit
+
+    monkeypatch.setattr(rate_limit, "USER_BUDGET", user_budget)
+    monkeypatch.setattr(rate_limit, "IP_BUDGET", ip_budget)
+    monkeypatch.setattr(rate_limit.ratelimit, "from_env", lambda *a: None)
+    app = FastAPI()
+
+    @app.get("/cheap")
+    def cheap():
+        return {"ok": True}
+
+    @app.post("/upload")
+    @ratelimit.cost(5)
+    def upload():
+        return {"ok": True}
+
+    app.add_middleware(rate_limit.RateLimitMiddleware)
+    if cors:
+        # same order as app.main: CORS wraps the limiter
+        from fastapi.middleware.cors import CORSMiddleware
+
+        app.add_middleware(CORSMiddleware, allow_origins=["http://front"], allow_methods=["*"],
+                           allow_headers=["*"], expose_headers=["Retry-After", "RateLimit-Remaining"])
+    return TestClient(app)
+
+
+def _bearer(sub):
+    import jwt
+
+    from app.config import settings
+
+    return {"Authorization": "Bearer " + jwt.encode({"sub": sub}, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)}
+
+
+def test_route_cost_and_headers(monkeypatch):
+    client = _limited_app(monkeypatch, user_budget=10, ip_budget=100)
+    r = client.post("/upload", headers=_bearer("alice"))
+    assert r.status_code == 200
+    assert r.headers["ratelimit-limit"] == "10"
+    assert r.headers["ratelimit-remaining"] == "5"
+    assert client.post("/upload", headers=_bearer("alice")).status_code == 200
+    r = client.get("/cheap", headers=_bearer("alice"))
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+
+
+def test_users_behind_one_ip_get_their_own_budget(monkeypatch):
+    client = _limited_app(monkeypatch, user_budget=3, ip_budget=100)
+    for _ in range(3):
+        assert client.get("/cheap", headers=_bearer("alice")).status_code == 200
+    assert client.get("/cheap", headers=_bearer("alice")).status_code == 429
+    assert client.get("/cheap", headers=_bearer("bob")).status_code == 200
+    # forged tokens fall back to the anonymous per-IP budget
+    assert client.get("/cheap", headers={"Authorization": "Bearer not-a-jwt"}).status_code == 200
+
+
+def test_throttled_user_does_not_use_up_the_ip_budget(monkeypatch):
+    client = _limited_app(monkeypatch, user_budget=2, ip_budget=5)
+    codes = [client.get("/cheap", headers=_bearer("alice")).status_code for _ in range(10)]
+    assert codes == [200] * 2 + [429] * 8
+    codes = [client.get("/cheap", headers=_bearer("bob")).status_code for _ in range(4)]
+    # alice's refused requests were refunded, so bob still finds IP budget
+    assert codes == [200] * 2 + [429] * 2
+
+
+def test_shared_ip_budget_caps_everyone(monkeypatch):
+    client = _limited_app(monkeypatch, user_budget=100, ip_budget=4)
+    codes = [client.get("/cheap", headers=_bearer(f"user{i}")).status_code for i in range(6)]
+    assert codes == [200] * 4 + [429] * 2
+
+
+def test_preflights_are_free_and_429s_are_readable_cross_origin(monkeypatch):
+    client = _limited_app(monkeypatch, user_budget=1, ip_budget=100, cors=True)
+    preflight = {"Origin": "http://front", "Access-Control-Request-Method": "GET"}
+    for _ in range(3):
+        assert client.options("/cheap", headers=preflight).status_code == 200
+    assert client.get("/cheap", headers={"Origin": "http://front"}).status_code == 200
+    r = client.get("/cheap", headers={"Origin": "http://front"})
+    assert r.status_code == 429
+    assert r.headers["access-control-allow-origin"] == "http://front"
+    assert "retry-after" in r.headers["access-control-expose-headers"].lower()
+
+
+class FakeRedisLimiter(ratelimit.HybridLimiter):
+    """HybridLimiter whose Redis is a dict shared between instances (one per 'pod')."""
+
+    def __init__(self, shared, **kw):
+        super().__init__(**kw)
+        self._r = shared  # truthy: enables sync()
+        self.shared = shared
+        self.round_trips = 0
+        self.down = False
+
+    async def _remote(self, items):
+        self.round_trips += 1
+        if self.down:
+            raise ConnectionError("redis down")
+        out = []
+        for key, ws, amount, window in items:
+            self.shared[(key, ws)] = self.shared.get((key, ws), 0) + amount
+            out.append((self.shared.get((key, ws - window), 0), self.shared[(key, ws)]))
+        return out
+
+
+def test_hybrid_overshoot_stays_within_drift_bound():
+    import asyncio
+
+    shared = {"_": 0}
+    clock = Clock(960.0)
+    pods = [FakeRedisLimiter(shared, sync_ms=10_000, max_drift=0.05, clock=clock) for _ in range(3)]
+
+    async def run():
+        allowed = 0
+        for i in range(600):
+            allowed += (await pods[i % 3].hit("k", 100, 60)).allowed
+            await asyncio.sleep(0)  # let background flushes run, as between real requests
+        return allowed
+
+    allowed = asyncio.run(run())
+    assert 100 <= allowed <= 100 + 3 * 5
+    assert sum(p.round_trips for p in pods) < 600 / 3  # far fewer than one per request
+
+
+def test_costly_request_does_not_wait_for_redis():
+    import asyncio
+
+    pod = FakeRedisLimiter({"_": 0}, sync_ms=10_000, max_drift=0.05, clock=Clock(960.0))
+
+    async def run():
+        d = await pod.hit("k", 120, 60, cost=10)  # cost 10 > drift bound of 6
+        inline = pod.round_trips
+        await asyncio.sleep(0)
+        return d, inline, pod.round_trips
+
+    d, inline, after = asyncio.run(run())
+    assert d.allowed and inline == 0 and after == 1
+    assert pod.shared[("k", 960.0)] == 10
+
+
+def test_breaker_stops_calling_unhealthy_redis():
+    import asyncio
+
+    breaker_clock = Clock(0.0)
+    pod = FakeRedisLimiter(
+        {"_": 0}, sync_ms=10_000, max_drift=0.01, clock=Clock(960.0),
+        breaker=ratelimit.CircuitBreaker(failures=3, reset_secs=30, clock=breaker_clock),
+    )
+    pod.down = True
+
+    async def hits(n):
+        out = []
+        for _ in range(n):
+            out.append((await pod.hit("k", 100, 60)).allowed)
+            await asyncio.sleep(0)
+        return out
+
+    assert all(asyncio.run(hits(50)))  # still limiting locally
+    assert pod.round_trips == 3 and pod.breaker.is_open
+
+    pod.down = False
+    breaker_clock.t += 31  # back-off elapsed: next sync is the trial
+    asyncio.run(hits(1))
+    assert not pod.breaker.is_open
+    assert pod.shared[("k", 960.0)] == 51  # nothing charged while down was lost
+
+
+def test_carry_stays_bounded_while_breaker_is_open():
+    import asyncio
+
+    clock = Clock(960.0)
+    pod = FakeRedisLimiter(
+        {"_": 0}, sync_ms=10_000, max_drift=1.0, clock=clock, max_keys=10, max_carry=50,
+        breaker=ratelimit.CircuitBreaker(failures=1, reset_secs=3600, clock=Clock(0.0)),
+    )
+    pod.down = True
+
+    async def spray():
+        for i in range(2000):
+            clock.t += 0.5
+            await pod.hit(f"ip:{i}", 100, 60)
+            assert len(pod._carry) <= 50
+
+    asyncio.run(spray())
+    assert pod.breaker.is_open
+    # nothing older than the previous window is kept for the eventual push
+    assert all(ws >= clock.t - 120 for _k, ws, _a, _w in pod._carry)
@@ -0,0 +1,50 @@
+# backend/tests/test_recovery_codes.py
+import json
+
+import bcrypt
+import pytest
+
+from app.security import passwords, recovery_codes
+
+
+@pytest.fixture(autouse=True)
+def inline_hash_pool(monkeypatch):
+    monkeypatch.setattr(passwords, "pool", passwords.HashPool(workers=0, max_queue=1, queue_wait_ms=10))
+
+
+def test_digest_ignores_case_and_separators():
+    assert recovery_codes.digest("abcd-ef12") == recovery_codes.digest("ABCDEF12")
+    assert recovery_codes.digest(" ABCD EF12 ") == recovery_codes.digest("ABCD-EF12")
+    assert recovery_codes.digest("ABCD-EF12") != recovery_codes.digest("ABCD-EF13")
+
+
+def test_generate_format():
+    codes = recovery_codes.generate()
+    assert len(codes) == recovery_codes.RECOVERY_CODE_COUNT
+    assert all(len(c) == 9 and c[4] == "-" for c in codes)
+    assert len(set(codes)) == len(codes)
+
+
+def test_consume_legacy_bcrypt_code():
+    codes = ["AAAA-1111", "BBBB-2222", "CCCC-3333"]
+    hashes = [bcrypt.hashpw(c.encode(), bcrypt.gensalt(4)).decode() for c in codes]
+
+    remaining = recovery_codes.consume_legacy("bbbb2222", json.dumps(hashes))
+    assert remaining == [hashes[0], hashes[2]]
+    assert recovery_codes.consume_legacy("DDDD-4444", hashes) is None
+    assert recovery_codes.consume_legacy("AAAA-1111", []) is None
+
+
+def test_consume_legacy_checks_one_candidate_per_hash(monkeypatch):
+    hashes = [bcrypt.hashpw(c.encode(), bcrypt.gensalt(4)).decode() for c in ("AAAA-1111", "BBBB-2222")]
+    calls = []
+    real = recovery_codes.verify_password
+    monkeypatch.setattr(recovery_codes, "verify_password", lambda p, h: calls.append(p) or real(p, h))
+
+    assert recovery_codes.consume_legacy(" dddd 4444 ", hashes) is None
+    assert calls == ["DDDD-4444", "DDDD-4444"]
+    calls.clear()
+    assert recovery_codes.consume_legacy("not-a-code!", hashes) is None
+    assert calls == []  # malformed input never reaches bcrypt
+    assert recovery_codes.consume_legacy("aaaa-1111", hashes) == [hashes[1]]
+    assert calls == ["AAAA-1111"]  # stops at the first match
@@ -0,0 +1,34 @@
+import json
+import uuid
+from typing import List
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas import ReferralRow
+from app.serialization import Serializer
+from app.services import referral_fields
+
+
+def test_columns_for_views_and_fields():
+    assert referral_fields.columns() == referral_fields.COLUMNS
+    assert referral_fields.columns(view="summary") == ("id", "ref_no", "company", "status", "created_at")
+    # id always comes back, table order is kept, blanks are ignored
+    assert referral_fields.columns("status, company,,") == ("id", "company", "status")
+    assert referral_fields.select_list(("id", "status")) == "id, status"
+
+
+def test_unknown_names_never_reach_sql():
+    with pytest.raises(HTTPException) as ex:
+        referral_fields.columns("company,password_hash")
+    assert ex.value.status_code == 422 and "password_hash" in ex.value.detail
+    with pytest.raises(HTTPException):
+        referral_fields.columns("id; DROP TABLE referrals")
+    with pytest.raises(HTTPException):
+        referral_fields.columns(view="everything")
+
+
+def test_sparse_rows_serialize_only_selected_keys():
+    rid = uuid.uuid4()
+    body = json.loads(Serializer(List[ReferralRow]).dump([{"id": rid, "company": "Acme", "status": "New"}]))
+    assert body == [{"id": str(rid), "company": "Acme", "status": "New"}]
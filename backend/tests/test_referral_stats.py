@@ -0,0 +1,57 @@
+from app.services import referral_stats
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def mappings(self):
+        return self
+
+    def one(self):
+        return self._row
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, sql, params):
+        self.calls.append(params)
+        row = {"total": 5, "projected": 1200.5, "delta_total": 2, "delta_won": 1, "paid_ytd": 300}
+        row.update({f"s{i}": 0 for i in range(len(referral_stats.STATUSES))})
+        row["s0"], row["s4"] = 3, 2  # New, Won
+        return _Result(row)
+
+
+def test_overview_is_one_query_and_cached_per_scope():
+    referral_stats._cache.clear()
+    db = FakeDB()
+    data = referral_stats.overview(db, "agent-1")
+    assert data["total_referrals"] == 5 and data["won_deals"] == 2
+    assert data["status_counts"]["New"] == 3 and data["paid_commissions_ytd"] == 300.0
+    assert len(db.calls) == 1 and db.calls[0]["agent"] == "agent-1"
+
+    referral_stats.overview(db, "agent-1")
+    assert len(db.calls) == 1  # served from cache
+
+    referral_stats.overview(db, None)
+    assert len(db.calls) == 2 and db.calls[1]["agent"] is None
+
+    referral_stats.invalidate("agent-1")
+    referral_stats.overview(db, "agent-1")
+    referral_stats.overview(db, None)
+    assert len(db.calls) == 4
+
+
+def test_drift_returns_mismatched_rows():
+    class DriftDB:
+        def execute(self, sql, params=None):
+            sql = str(sql)
+            assert "FULL JOIN daily_direct d USING (agent_id, day)" in sql
+            assert "commission_paid_on" in sql  # paid amounts compared on the day they are booked
+            row = {"kind": "daily", "agent_id": "a1", "status": None, "day": "2026-01-05",
+                   "total_n": 3, "direct_n": 3, "total_amount": 500, "direct_amount": 200}
+            return type("R", (), {"mappings": lambda s: s, "all": lambda s: [row]})()
+
+    assert referral_stats.drift(DriftDB())[0]["direct_amount"] == 200
@@ -0,0 +1,86 @@
+# backend/tests/test_revocation.py
+from datetime import datetime, timedelta, timezone
+
+from app.security.revocation import BloomFilter, RevocationStore
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+
+class FakeDB:
+    """Just enough of a Session for RevocationStore: rows is a list of (id, jti)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.lookups = 0
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if sql.startswith("SELECT id, jti"):
+            return _Result([r for r in self.rows if r[0] > params["since"]])
+        if sql.startswith("SELECT 1"):
+            self.lookups += 1
+            return _Result([(1,)] if any(j == params["j"] for _, j in self.rows) else [])
+        if sql.startswith("INSERT"):
+            self.rows.append((len(self.rows) + 1, params["j"]))
+        return _Result([])
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_bloom_filter_membership_and_error_rate():
+    bf = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bf.add(f"jti-{i}")
+    assert all(f"jti-{i}" in bf for i in range(1000))
+    fp = sum(f"other-{i}" in bf for i in range(10000))
+    assert fp < 300  # ~1% expected
+
+
+def test_store_skips_db_for_unrevoked_tokens():
+    db = FakeDB([(1, "revoked-a"), (2, "revoked-b")])
+    store = RevocationStore(session_factory=lambda: db, capacity=100, error_rate=0.001)
+    assert store.sync() == 2
+
+    assert store.is_revoked("revoked-a")
+    assert db.lookups == 1
+    for i in range(200):
+        assert not store.is_revoked(f"live-{i}")
+    assert db.lookups < 5  # only filter false positives reach the DB
+
+
+def test_revoke_applies_locally_and_sync_picks_up_others():
+    db = FakeDB([])
+    store = RevocationStore(session_factory=lambda: db, capacity=100, error_rate=0.001)
+    store.sync()
+    store.revoke(db, "mine", None, datetime.now(timezone.utc) + timedelta(hours=1))
+    assert store.is_revoked("mine")
+
+    db.rows.append((99, "from-other-pod"))
+    assert not store.is_revoked("from-other-pod")  # not synced yet
+    store.sync()
+    assert store.is_revoked("from-other-pod")
+
+
+def test_checks_go_to_the_table_until_the_first_sync():
+    db = FakeDB([(1, "revoked-a")])
+    store = RevocationStore(session_factory=lambda: db, capacity=100, error_rate=0.001)
+    assert store.is_revoked("revoked-a")
+    assert not store.is_revoked("live")
+    assert db.lookups == 2
+
+    store.sync()
+    assert not store.is_revoked("live")
+    assert db.lookups == 2
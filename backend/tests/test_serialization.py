@@ -0,0 +1,43 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas import AdminUserPage, ReferralRow
+from app.serialization import FastJSONResponse, Serializer
+
+
+def _referral(**kw):
+    row = {"id": uuid.uuid4(), "ref_no": "AZR-2025-0001", "company": "Acme", "status": "New",
+           "created_at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "contact_name": None,
+           "contact_email": "not-an-email", "contact_phone": None, "notes": None, "agent_id": uuid.uuid4(),
+           "opportunity_types": ["Managed IT"], "locations": ["Austin, TX"],
+           "environment": {"users": 5, "workstations": {"mac": 1}}, "reason": None}
+    row.update(kw)
+    return row
+
+
+def test_matches_jsonable_encoder_output():
+    rows = [_referral(), _referral(environment='{"legacy": "text column"}')]
+    fast = json.loads(Serializer(List[ReferralRow]).dump(rows))
+    default = jsonable_encoder(rows)
+    for r in default:
+        r["created_at"] = r["created_at"].replace("+00:00", "Z")
+    assert fast == default
+
+
+def test_coerces_text_uuids_and_wraps_pages():
+    uid = uuid.uuid4()
+    page = {"items": [{"id": str(uid), "email": "a@b.c", "mfa_enabled": True}], "next": None}
+    resp = Serializer(AdminUserPage).response(page)
+    assert isinstance(resp, FastJSONResponse)
+    assert resp.media_type == "application/json"
+    body = json.loads(resp.body)
+    assert body["items"][0]["id"] == str(uid) and body["next"] is None
+
+
+def test_fast_response_renders_plain_content():
+    uid = uuid.uuid4()
+    assert json.loads(FastJSONResponse({"id": uid}).body) == {"id": str(uid)}
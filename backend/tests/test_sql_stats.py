@@ -0,0 +1,37 @@
+import logging
+
+from sqlalchemy import create_engine, text
+
+from app import sql_stats
+
+
+def test_request_stats_and_n_plus_one_warning(monkeypatch, caplog):
+    monkeypatch.setattr(sql_stats, "SQL_N_PLUS_ONE_WARN", True)
+    monkeypatch.setattr(sql_stats, "SQL_N_PLUS_ONE_THRESHOLD", 3)
+    engine = create_engine("sqlite://")
+    sql_stats.install(engine)
+    sql_stats.install(engine)  # idempotent
+
+    token = sql_stats.begin("/feedback/send")
+    with caplog.at_level(logging.WARNING, logger="app.sql"), engine.connect() as conn:
+        for i in range(5):
+            conn.execute(text("SELECT :i + 1"), {"i": i})
+        conn.execute(text("SELECT 'x', 42"))
+    stats = sql_stats.end(token)
+
+    assert stats.count == 6
+    assert stats.by_fingerprint["SELECT ? + ?"] == 5
+    assert "SELECT ?, ?" in stats.by_fingerprint
+    assert stats.as_log()["db_queries"] == 6 and stats.as_log()["db_slowest"]
+    warnings = [r for r in caplog.records if "N+1" in r.getMessage()]
+    assert len(warnings) == 1 and "/feedback/send" in warnings[0].getMessage()
+
+    # outside a request nothing is collected
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert sql_stats.current() is None
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert sql_stats.fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'o''k'") == \
+        "SELECT * FROM t WHERE id IN (?...) AND name = ?"
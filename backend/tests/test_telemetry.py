@@ -0,0 +1,39 @@
+from app import telemetry
+
+
+def test_exposition_format_and_collectors():
+    c = telemetry.counter("test_expo_events", "Events", ["kind"])
+    h = telemetry.histogram("test_expo_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    g = telemetry.gauge("test_expo_pool", "Pool")
+    c.inc(kind='a"b')
+    h.observe(0.5, route="/referrals/{referral_id}")
+    telemetry.collector(lambda: g.set(7))
+
+    text = telemetry.exposition()
+    assert "# TYPE test_expo_events counter" in text
+    assert 'test_expo_events_total{kind="a\\"b"} 1' in text
+    assert 'test_expo_seconds_bucket{route="/referrals/{referral_id}",le="0.1"} 0' in text
+    assert 'test_expo_seconds_bucket{route="/referrals/{referral_id}",le="+Inf"} 1' in text
+    assert "test_expo_seconds_sum{route=\"/referrals/{referral_id}\"} 0.5" in text
+    assert "test_expo_pool 7" in text
+
+
+def test_metrics_endpoint_requires_token_unless_public(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import metrics
+
+    app = FastAPI()
+    app.include_router(metrics.router)
+    client = TestClient(app)
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "")
+    monkeypatch.setattr(metrics, "METRICS_PUBLIC", False)
+    assert client.get("/metrics").status_code == 403
+    monkeypatch.setattr(metrics, "METRICS_PUBLIC", True)
+    assert client.get("/metrics").status_code == 200
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200